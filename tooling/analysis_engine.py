@@ -0,0 +1,182 @@
+"""
+Runs several log analyses in a single pass over the activity log.
+
+Each analysis used to be a `LogScanner` of its own, so running N of them
+read and JSON-decoded every log entry N times. An `Analyzer` instead
+declares what it does with one decoded entry, and `AnalysisEngine` decodes
+each entry exactly once and hands it to every analyzer:
+
+- `start()` returns the analyzer's empty state (e.g. a `Counter`).
+- `on_entry(state, entry)` updates the state with one decoded entry.
+- `merge(states)` combines the states of consecutive parts of the log, so
+  that the engine can run in parallel shards (see `log_scan.py`).
+- `finalize(state)` turns the merged state into the analyzer's result, and
+  `report(result)` formats that result for the command line.
+
+Analyzers are registered with the `register_analyzer` decorator and looked
+up by name in `ANALYZERS`. The engine measures the CPU time spent decoding
+and in each analyzer (summed over worker processes), so that a slow
+analyzer shows up in the output of `self_improvement_cli.py`.
+"""
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from tooling.log_scan import LogScanner, scan_log_segments
+
+# Registered analyzer classes, by name.
+ANALYZERS = {}
+
+# Lines decoded before they are handed to the analyzers. Each analyzer then
+# runs over the whole chunk, so that its CPU time is measured per chunk
+# rather than per entry.
+CHUNK_SIZE = 10000
+
+
+def register_analyzer(cls):
+    """Class decorator adding an `Analyzer` subclass to `ANALYZERS`."""
+    if not cls.name:
+        raise ValueError(f"Analyzer {cls.__name__} has no name.")
+    ANALYZERS[cls.name] = cls
+    return cls
+
+
+class Analyzer:
+    """
+    One analysis of the log's entries. Subclasses must be picklable (defined
+    at module level), and so must their states.
+    """
+
+    name = ""
+    title = ""
+    # Optionally, a method `query(conn, since=None, until=None)` returning the
+    # same result from the SQLite log index (see `log_db.py`).
+    query = None
+
+    def start(self) -> Any:
+        """Returns an empty state."""
+        raise NotImplementedError
+
+    def on_entry(self, state: Any, entry: dict):
+        """Updates `state` with one decoded log entry."""
+        raise NotImplementedError
+
+    def merge(self, states: List[Any]) -> Any:
+        """Combines the states of consecutive parts of the log, given in log order."""
+        raise NotImplementedError
+
+    def finalize(self, state: Any) -> Any:
+        """Returns the result of the analysis from its merged state."""
+        return state
+
+    def report(self, result: Any) -> List[str]:
+        """Returns lines describing the result, for the command line."""
+        return [f"  - Result: {result}"]
+
+
+def decode_entries(lines: Iterable[bytes], malformed: Optional[List[int]] = None) -> Iterator[dict]:
+    """
+    Yields the JSON object of each log line. Blank lines are skipped; lines
+    that are not JSON objects are skipped and counted in `malformed[0]`.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            entry = None
+        if isinstance(entry, dict):
+            yield entry
+        elif malformed is not None:
+            malformed[0] += 1
+
+
+class AnalyzerScanner(LogScanner):
+    """Runs a single analyzer as a `LogScanner` whose result is the analyzer's merged state."""
+
+    def __init__(self, analyzer: Analyzer):
+        self.analyzer = analyzer
+
+    def scan_lines(self, lines):
+        state = self.analyzer.start()
+        for entry in decode_entries(lines):
+            self.analyzer.on_entry(state, entry)
+        return state
+
+    def merge(self, partials):
+        return self.analyzer.merge(partials)
+
+
+class AnalysisEngine(LogScanner):
+    """
+    Runs several analyzers over each decoded entry. Its result is a dict with
+    the merged `states` (by analyzer name), the number of `entries` and
+    `malformed` lines, and the `cpu` seconds spent decoding and per analyzer.
+    """
+
+    def __init__(self, analyzers: Iterable[Analyzer]):
+        self.analyzers = list(analyzers)
+
+    def _empty(self):
+        return {
+            "states": {a.name: a.start() for a in self.analyzers},
+            "entries": 0,
+            "malformed": 0,
+            "cpu": dict.fromkeys(["decode"] + [a.name for a in self.analyzers], 0.0),
+        }
+
+    def scan_lines(self, lines):
+        result = self._empty()
+        states, cpu = result["states"], result["cpu"]
+        malformed = [0]
+        lines = iter(lines)
+        while True:
+            start = time.process_time()
+            chunk = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) == CHUNK_SIZE:
+                    break
+            if not chunk:
+                break
+            entries = list(decode_entries(chunk, malformed))
+            cpu["decode"] += time.process_time() - start
+            result["entries"] += len(entries)
+            for analyzer in self.analyzers:
+                start = time.process_time()
+                state, on_entry = states[analyzer.name], analyzer.on_entry
+                for entry in entries:
+                    on_entry(state, entry)
+                cpu[analyzer.name] += time.process_time() - start
+        result["malformed"] = malformed[0]
+        return result
+
+    def merge(self, partials):
+        if not partials:
+            return self._empty()
+        merged = {
+            "states": {a.name: a.merge([p["states"][a.name] for p in partials]) for a in self.analyzers},
+            "entries": sum(p["entries"] for p in partials),
+            "malformed": sum(p["malformed"] for p in partials),
+            "cpu": {},
+        }
+        for partial in partials:
+            for key, seconds in partial["cpu"].items():
+                merged["cpu"][key] = merged["cpu"].get(key, 0.0) + seconds
+        return merged
+
+
+def run_analyzers(log_file: str, analyzers: Iterable[Analyzer], since: Optional[str] = None,
+                  until: Optional[str] = None, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Runs analyzers over a log (and its rotated segments) in one pass. Returns
+    the engine's merged result with each state replaced by the analyzer's
+    finalized result, under `results`. Raises FileNotFoundError if the log
+    does not exist.
+    """
+    engine = AnalysisEngine(analyzers)
+    merged = scan_log_segments(log_file, engine, since=since, until=until, max_workers=max_workers)
+    states = merged.pop("states")
+    merged["results"] = {a.name: a.finalize(states[a.name]) for a in engine.analyzers}
+    return merged
@@ -0,0 +1,601 @@
+"""
+Micro-benchmarks for the performance-sensitive parts of the toolchain.
+
+Each subcommand generates a synthetic workload, times the current
+implementation (and, where one exists, the implementation it replaced) and
+prints a small results table. The benchmarks are not part of the test suite;
+run them on demand, e.g.:
+
+    python3 -m tooling.benchmarks plan-parser --commands 100000
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List
+
+from tooling import state_codec
+from tooling.compiled_plan import compile_plan, load_compiled_plan
+from tooling import log_db
+from tooling.analysis_engine import ANALYZERS, AnalyzerScanner, run_analyzers
+from tooling.log_scan import scan_log
+from tooling.plan_parser import CommandTable, parse_plan
+from tooling.protocol_auditor import ToolUsageScanner, get_used_tools_from_log
+from tooling.protocol_compiler import CONTEXT_FILE, DEFAULT_PROTOCOLS_DIR
+from tooling.protocol_triples import ContextMapping, emit_triples, to_ntriples, write_turtle
+from tooling.triple_index import TripleIndex, write_triple_index
+from tooling.state import AgentState, PlanContext
+from utils.log_append import PIPE_BUF, append_record
+from utils.logger import CompiledSchema, Logger
+
+
+def _time_best(func, repeat):
+    """Returns the best wall-clock time of `repeat` calls to `func`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _retained_bytes(func):
+    """Returns the bytes still allocated by the result of `func()`."""
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained
+
+
+def _print_table(title, rows):
+    """Prints benchmark rows of `(label, seconds, ops)` with throughput."""
+    print(f"--- {title} ---")
+    for label, seconds, ops in rows:
+        rate = ops / seconds if seconds else float("inf")
+        print(f"  {label:<32} {seconds * 1000:10.2f} ms  {rate:14,.0f} ops/s")
+
+
+# --- Plan Parser ---
+
+
+def _split_parse_plan(plan_content):
+    """The original split-based plan parser, kept as the benchmark baseline."""
+    commands = []
+    for block in plan_content.strip().split("\n\n"):
+        block = block.strip()
+        if not block or block.startswith("#"):
+            continue
+        lines = [line for line in block.split("\n") if not line.strip().startswith("#")]
+        if not lines:
+            continue
+        commands.append((lines[0].strip(), "\n".join(lines[1:]).strip()))
+    return commands
+
+
+def generate_plan(num_commands, args_lines=3):
+    """Generates a plan with `num_commands` multi-line commands and comments."""
+    blocks = []
+    for i in range(num_commands):
+        body = "\n".join(f"  argument line {j} for step {i}" for j in range(args_lines))
+        if i % 10 == 0:
+            blocks.append(f"# Section {i}\n")
+        blocks.append(f"run_in_bash_session\n{body}\n")
+    return "\n".join(blocks)
+
+
+def bench_plan_parser(args):
+    """Compares the single-pass parser against the split-based baseline."""
+    plan = generate_plan(args.commands, args.args_lines)
+    plan_bytes = plan.encode("utf-8")
+    n = args.commands
+    rows = [
+        ("split-based (baseline)", _time_best(lambda: _split_parse_plan(plan), args.repeat), n),
+        ("single-pass, str, lazy args", _time_best(lambda: parse_plan(plan), args.repeat), n),
+        ("single-pass, bytes, lazy args", _time_best(lambda: parse_plan(plan_bytes), args.repeat), n),
+        (
+            "single-pass, str, all args read",
+            _time_best(lambda: [c.args_text for c in parse_plan(plan)], args.repeat),
+            n,
+        ),
+    ]
+    _print_table(f"plan parser ({n} commands, {len(plan_bytes) / 1e6:.1f} MB)", rows)
+
+    print("--- retained memory of the parsed plan ---")
+    for label, func in (
+        ("split-based (baseline)", lambda: _split_parse_plan(plan)),
+        ("single-pass, str, lazy args", lambda: parse_plan(plan)),
+    ):
+        print(f"  {label:<32} {_retained_bytes(func) / 1e6:10.2f} MB")
+
+
+@dataclass
+class _DictCommand:
+    """The original `__dict__`-backed `Command` dataclass, for comparison."""
+
+    tool_name: str
+    args_text: str
+
+
+@dataclass
+class _DictPlanContext:
+    """The original `__dict__`-backed `PlanContext` dataclass, for comparison."""
+
+    plan_path: str
+    commands: List[_DictCommand]
+    current_step: int = 0
+    plan_content: List[str] = field(default_factory=list)
+
+
+def bench_plan_memory(args):
+    """Measures the memory retained by a parsed plan held on many plan stacks."""
+    plan = generate_plan(args.commands, args.args_lines)
+
+    def dict_contexts():
+        commands = [_DictCommand(tool, text) for tool, text in _split_parse_plan(plan)]
+        return [_DictPlanContext(f"plan_{i}.txt", commands) for i in range(args.tasks)]
+
+    def slotted_contexts():
+        commands = parse_plan(plan)
+        return [PlanContext(f"plan_{i}.txt", commands) for i in range(args.tasks)]
+
+    def table_contexts():
+        commands = CommandTable.from_source(plan)
+        return [PlanContext(f"plan_{i}.txt", commands) for i in range(args.tasks)]
+
+    def agent_states():
+        return [AgentState(task=f"task-{i}") for i in range(args.tasks)]
+
+    print(f"--- retained memory ({args.commands} commands, {args.tasks} plan contexts) ---")
+    for label, func in (
+        ("dict dataclasses (before)", dict_contexts),
+        ("slotted lazy Commands", slotted_contexts),
+        ("array-backed CommandTable", table_contexts),
+    ):
+        print(f"  {label:<32} {_retained_bytes(func) / 1e6:10.2f} MB")
+    print(f"  {f'{args.tasks} slotted AgentStates':<32} {_retained_bytes(agent_states) / 1e6:10.2f} MB")
+
+
+def bench_compiled_plan(args):
+    """Compares parsing a plan file from text against loading its `.planc`."""
+    plan = generate_plan(args.commands, args.args_lines)
+    n = args.commands
+    with tempfile.TemporaryDirectory() as tmp:
+        plan_path = os.path.join(tmp, "plan.txt")
+        with open(plan_path, "w") as f:
+            f.write(plan)
+
+        def parse_from_text():
+            with open(plan_path, "r") as f:
+                return parse_plan(f.read())
+
+        rows = [
+            ("parse from text", _time_best(parse_from_text, args.repeat), n),
+            ("compile to .planc", _time_best(lambda: compile_plan(plan_path), args.repeat), n),
+            ("load fresh .planc", _time_best(lambda: load_compiled_plan(plan_path), args.repeat), n),
+        ]
+    _print_table(f"compiled plans ({n} commands)", rows)
+
+
+def bench_state_codec(args):
+    """Times full and delta AgentState snapshots against `to_json`."""
+    plan = generate_plan(args.commands, args.args_lines)
+    state = AgentState(task="benchmark")
+    for depth in range(args.depth):
+        state.plan_stack.append(
+            PlanContext(plan_path=f"plan_{depth}.txt", commands=parse_plan(plan), plan_content=plan.splitlines())
+        )
+    state.messages = [{"role": "assistant", "content": f"message {i}"} for i in range(args.messages)]
+
+    full = state_codec.dumps(state)
+    encoder, decoder = state_codec.StateEncoder(), state_codec.StateDecoder()
+    decoder.decode(encoder.encode(state))
+
+    def step():
+        state.messages.append({"role": "assistant", "content": "step"})
+        state.plan_stack[-1].current_step += 1
+        return encoder.encode(state)
+
+    delta = step()
+    decoder.decode(delta)
+    codec_name = state_codec.CODECS[state_codec.DEFAULT_CODEC_ID][0]
+    n = args.commands * args.depth
+    rows = [
+        ("to_json (lossy, json.dumps)", _time_best(lambda: json.dumps(state.to_json()), args.repeat), n),
+        (f"dumps full ({codec_name})", _time_best(lambda: state_codec.dumps(state), args.repeat), n),
+        (f"loads full ({codec_name})", _time_best(lambda: state_codec.loads(full), args.repeat), n),
+        ("encode delta", _time_best(step, args.repeat), 1),
+        ("decode delta", _time_best(lambda: decoder.decode(delta), args.repeat), 1),
+    ]
+    _print_table(f"AgentState snapshots ({n} commands, {args.messages} messages)", rows)
+    print(f"  full snapshot: {len(full):,} bytes, delta snapshot: {len(delta):,} bytes")
+
+
+def bench_protocol_triples(args):
+    """Compares rdflib JSON-LD parsing against the direct triple emitter."""
+    from rdflib import Graph
+
+    protocols = []
+    for path in sorted(glob.glob(os.path.join(DEFAULT_PROTOCOLS_DIR, "*.protocol.json"))):
+        with open(path) as f:
+            protocols.append(json.load(f))
+    protocols *= args.copies
+    base_uri = "file://" + DEFAULT_PROTOCOLS_DIR + "/"
+    context_path = os.path.relpath(CONTEXT_FILE, DEFAULT_PROTOCOLS_DIR)
+
+    def rdflib_turtle():
+        g = Graph()
+        for data in protocols:
+            g.parse(data=json.dumps(dict(data, **{"@context": context_path})), format="json-ld", publicID=base_uri)
+        return g.serialize(format="turtle")
+
+    def emitter_ntriples():
+        mapping = ContextMapping.from_file(CONTEXT_FILE)
+        return [to_ntriples(emit_triples(data, mapping, base_uri, f"p{i}_")) for i, data in enumerate(protocols)]
+
+    def emitter_turtle():
+        mapping = ContextMapping.from_file(CONTEXT_FILE)
+        out = io.StringIO()
+        triples = (t for i, data in enumerate(protocols) for t in emit_triples(data, mapping, base_uri, f"p{i}_"))
+        write_turtle(triples, out, mapping.prefixes)
+        return out.getvalue()
+
+    n = len(protocols)
+    rows = [
+        ("rdflib JSON-LD -> Turtle", _time_best(rdflib_turtle, args.repeat), n),
+        ("emitter -> N-Triples", _time_best(emitter_ntriples, args.repeat), n),
+        ("emitter -> Turtle (streamed)", _time_best(emitter_turtle, args.repeat), n),
+    ]
+    _print_table(f"protocol triples ({n} protocols)", rows)
+
+
+def bench_triple_index(args):
+    """Compares load-and-query time of a Turtle graph and its `.kgi` index."""
+    from rdflib import Graph, URIRef
+
+    mapping = ContextMapping.from_file(CONTEXT_FILE)
+    protocols = []
+    for path in sorted(glob.glob(os.path.join(DEFAULT_PROTOCOLS_DIR, "*.protocol.json"))):
+        with open(path) as f:
+            protocols.append(json.load(f))
+    triples = [
+        triple
+        for copy in range(args.copies)
+        for i, data in enumerate(protocols)
+        for triple in emit_triples(data, mapping, f"file:///copy{copy}/", f"c{copy}_{i}_")
+    ]
+    predicate = "<https://factory.ai/ns/protocol/associatedTool>"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ttl_path = os.path.join(tmp, "protocols.ttl")
+        kgi_path = os.path.join(tmp, "protocols.kgi")
+        with open(ttl_path, "w") as f:
+            write_turtle(triples, f, mapping.prefixes)
+        write_triple_index(triples, kgi_path, source_path=ttl_path)
+
+        def turtle_query():
+            graph = Graph().parse(ttl_path, format="turtle")
+            return len(set(graph.objects(None, URIRef(predicate[1:-1]))))
+
+        def index_query():
+            with TripleIndex(kgi_path) as index:
+                return len(set(index.objects(predicate=predicate)))
+
+        assert turtle_query() == index_query()
+        n = len(set(triples))
+        rows = [
+            ("Turtle parse + query", _time_best(turtle_query, args.repeat), n),
+            (".kgi mmap + query", _time_best(index_query, args.repeat), n),
+        ]
+        _print_table(f"knowledge graph load and query ({n} triples)", rows)
+        print(f"  Turtle: {os.path.getsize(ttl_path):,} bytes, index: {os.path.getsize(kgi_path):,} bytes")
+
+
+# --- Log Scan ---
+
+
+def generate_activity_log(path, size_mb):
+    """Writes a synthetic activity log of roughly `size_mb` megabytes."""
+    lines = []
+    for i in range(1000):
+        lines.append(json.dumps({
+            "log_id": f"log-{i}",
+            "session_id": "bench-session",
+            "timestamp": "2025-10-06T04:10:00+00:00",
+            "phase": "Phase 3",
+            "task": {"id": f"task-{i % 50}", "plan_step": i % 7},
+            "action": {"type": "TOOL_EXEC", "details": {"tool_name": f"tool_{i % 40}", "parameters": {"n": i}}},
+            "outcome": {"status": "SUCCESS"},
+        }))
+    block = ("\n".join(lines) + "\n").encode("utf-8")
+    with open(path, "wb") as f:
+        for _ in range(max(1, size_mb * 1024 * 1024 // len(block))):
+            f.write(block)
+
+
+def bench_log_scan(args):
+    """Times a full tool-usage scan of a synthetic log with increasing worker counts."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "activity.log.jsonl")
+        generate_activity_log(log_path, args.size_mb)
+        size = os.path.getsize(log_path)
+        lines = sum(1 for _ in open(log_path, "rb"))
+
+        expected = scan_log(log_path, ToolUsageScanner(), max_workers=1)
+        rows = [("line-by-line raw_decode", _time_best(lambda: get_used_tools_from_log(log_path), args.repeat), lines)]
+        workers = 1
+        while workers <= args.max_workers:
+            def scan(workers=workers):
+                assert scan_log(log_path, ToolUsageScanner(), max_workers=workers) == expected
+            rows.append((f"sharded scan, {workers} worker(s)", _time_best(scan, args.repeat), lines))
+            workers *= 2
+        _print_table(f"log scan ({size / 1024 / 1024:.0f} MB, {lines:,} lines)", rows)
+        base = rows[1][1]
+        for label, seconds, _ in rows[1:]:
+            print(f"  {label:<32} speedup {base / seconds:5.2f}x")
+
+
+def bench_log_db(args):
+    """Compares scanning the log with ingesting it into SQLite and querying the index."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "activity.log.jsonl")
+        db_path = os.path.join(tmp, "activity.sqlite3")
+        generate_activity_log(log_path, args.size_mb)
+        lines = sum(1 for _ in open(log_path, "rb"))
+
+        start = time.perf_counter()
+        log_db.ingest(log_path, db_path)
+        ingest_seconds = time.perf_counter() - start
+
+        expected = scan_log(log_path, ToolUsageScanner(), max_workers=1)["total"]
+        with contextlib.closing(log_db.connect(db_path)) as conn:
+            assert log_db.tool_usage(conn) == expected
+            timings = [
+                ("incremental ingestion, no change", lambda: log_db.ingest(log_path, db_path)),
+                ("tool usage: full scan", lambda: scan_log(log_path, ToolUsageScanner(), max_workers=1)),
+                ("tool usage: indexed query", lambda: log_db.tool_usage(conn)),
+                ("one task's entries: indexed query", lambda: log_db.select_entries(conn, {"task_id": "task-7"})),
+            ]
+            rows = [("initial ingestion", ingest_seconds, lines)]
+            rows += [(label, _time_best(func, args.repeat), lines) for label, func in timings]
+        _print_table(f"log database ({args.size_mb} MB, {lines:,} lines; ops/s = log lines/s)", rows)
+
+
+def bench_analysis_engine(args):
+    """Compares one scan per self-improvement analysis with a single pass running all of them."""
+    import tooling.self_improvement_cli  # noqa: F401 - registers the analyzers.
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "activity.log.jsonl")
+        generate_activity_log(log_path, args.size_mb)
+        lines = sum(1 for _ in open(log_path, "rb"))
+        analyzers = [cls() for cls in ANALYZERS.values()]
+
+        def separate_scans():
+            return [scan_log(log_path, AnalyzerScanner(analyzer), max_workers=1) for analyzer in analyzers]
+
+        def single_pass():
+            return run_analyzers(log_path, analyzers, max_workers=1)
+
+        rows = [
+            ("one scan per analysis", _time_best(separate_scans, args.repeat), lines),
+            (f"single pass, {len(analyzers)} analyzers", _time_best(single_pass, args.repeat), lines),
+        ]
+        _print_table(f"log analyses ({args.size_mb} MB, {lines:,} lines; ops/s = log lines/s)", rows)
+        for name, seconds in single_pass()["cpu"].items():
+            print(f"  {name:<32} {seconds:8.3f} s CPU")
+
+
+# --- Logger ---
+
+
+class _LegacyValidation:
+    """Validates like the logger used to: `jsonschema.validate` per entry."""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+    def validate(self, instance):
+        import jsonschema
+
+        jsonschema.validate(instance=instance, schema=self.schema)
+
+
+def bench_logger(args):
+    """Compares per-entry `jsonschema.validate` with the cached, fast-path validation, and sync with async logging."""
+    logger = Logger(log_path=os.devnull)
+    schema = logger.schema
+    entry = {
+        "log_id": "0b5e8a4c-6c0e-4f1b-9d43-0f3f6a1d2b7e",
+        "session_id": logger.session_id,
+        "timestamp": "2025-10-06T04:10:00+00:00",
+        "phase": "Phase 5",
+        "task": {"id": "bench-task", "plan_step": 1},
+        "action": {"type": "TOOL_EXEC", "details": {"tool_name": "run_in_bash_session"}},
+        "outcome": {"status": "SUCCESS", "message": ""},
+        "evidence_citation": "",
+    }
+    n = args.entries
+    legacy = _LegacyValidation(schema)
+    compiled = CompiledSchema(schema)
+    no_fast_path = CompiledSchema(schema)
+    no_fast_path.fast_validate = None
+
+    def validate_all(validator):
+        for _ in range(n):
+            validator.validate(entry)
+
+    def log_all(validation):
+        logger._compiled_schema = validation
+        for i in range(n):
+            logger.log("Phase 5", "bench-task", i, "TOOL_EXEC", {"tool_name": "ls"}, "SUCCESS")
+
+    def log_all_async():
+        with Logger(log_path=logger.log_path, async_mode=True) as async_logger:
+            for i in range(n):
+                async_logger.log("Phase 5", "bench-task", i, "TOOL_EXEC", {"tool_name": "ls"}, "SUCCESS")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logger.log_path = os.path.join(tmp, "logs", "activity.log.jsonl")
+        rows = [
+            ("validate: jsonschema.validate", _time_best(lambda: validate_all(legacy), args.repeat), n),
+            ("validate: cached validator", _time_best(lambda: validate_all(no_fast_path), args.repeat), n),
+            ("validate: fast path", _time_best(lambda: validate_all(compiled), args.repeat), n),
+            ("Logger.log, before", _time_best(lambda: log_all(legacy), args.repeat), n),
+            ("Logger.log, after", _time_best(lambda: log_all(compiled), args.repeat), n),
+            ("Logger.log, async (incl. close)", _time_best(log_all_async, args.repeat), n),
+        ]
+    _print_table(f"logger ({n} entries; ops/s = entries/s)", rows)
+
+
+# --- Log Appends ---
+
+
+def _append_records(log_path, writer, records, large_size, mode):
+    """A writer process of the append stress test: every tenth record is large."""
+    for seq in range(records):
+        padding = "x" * (large_size if seq % 10 == 0 else 100)
+        data = (json.dumps({"writer": writer, "seq": seq, "padding": padding}) + "\n").encode("utf-8")
+        if mode == "LogAppender":
+            append_record(log_path, data)
+        elif mode == "buffered open/write":
+            with open(log_path, "ab") as f:
+                f.write(data)
+        else:  # Unlocked writes of PIPE_BUF-sized chunks, which tear large records.
+            fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                for start in range(0, len(data), PIPE_BUF):
+                    os.write(fd, data[start:start + PIPE_BUF])
+            finally:
+                os.close(fd)
+
+
+def _append_records_args(args):
+    _append_records(*args)
+
+
+def _count_torn_lines(log_path, writers, records):
+    """Returns the number of lines that are not one whole record, plus records that are missing."""
+    torn = 0
+    seen = set()
+    with open(log_path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                seen.add((record["writer"], record["seq"]))
+            except (ValueError, KeyError, TypeError):
+                torn += 1
+    return torn + writers * records - len(seen)
+
+
+def bench_log_append(args):
+    """Runs concurrent writer processes against one log and checks that no line is torn."""
+    rows = []
+    torn = {}
+    n = args.writers * args.records
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("LogAppender", "buffered open/write", "unlocked chunked writes"):
+            log_path = os.path.join(tmp, mode.replace(" ", "_").replace("/", "_") + ".jsonl")
+
+            def run(log_path=log_path, mode=mode):
+                if os.path.exists(log_path):
+                    os.remove(log_path)
+                jobs = [(log_path, writer, args.records, args.large_size, mode) for writer in range(args.writers)]
+                with ProcessPoolExecutor(max_workers=args.writers) as executor:
+                    list(executor.map(_append_records_args, jobs))
+
+            rows.append((mode, _time_best(run, args.repeat), n))
+            torn[mode] = _count_torn_lines(log_path, args.writers, args.records)
+    _print_table(
+        f"log appends ({args.writers} processes x {args.records} records, 1 in 10 of "
+        f"{args.large_size:,} bytes; PIPE_BUF = {PIPE_BUF}; ops/s = records/s)",
+        rows,
+    )
+    for mode, count in torn.items():
+        print(f"  {mode:<32} torn or missing records: {count}")
+
+
+def main():
+    """Parses arguments and runs the selected benchmark."""
+    parser = argparse.ArgumentParser(description="Runs toolchain micro-benchmarks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser_cmd = subparsers.add_parser("plan-parser", help="Benchmark plan parsing.")
+    plan_parser_cmd.add_argument("--commands", type=int, default=100000)
+    plan_parser_cmd.add_argument("--args-lines", type=int, default=3)
+    plan_parser_cmd.add_argument("--repeat", type=int, default=3)
+    plan_parser_cmd.set_defaults(func=bench_plan_parser)
+
+    plan_memory_cmd = subparsers.add_parser("plan-memory", help="Measure plan representation memory.")
+    plan_memory_cmd.add_argument("--commands", type=int, default=100000)
+    plan_memory_cmd.add_argument("--args-lines", type=int, default=3)
+    plan_memory_cmd.add_argument("--tasks", type=int, default=1000)
+    plan_memory_cmd.set_defaults(func=bench_plan_memory)
+
+    compiled_plan_cmd = subparsers.add_parser("compiled-plan", help="Benchmark .planc loading.")
+    compiled_plan_cmd.add_argument("--commands", type=int, default=100000)
+    compiled_plan_cmd.add_argument("--args-lines", type=int, default=3)
+    compiled_plan_cmd.add_argument("--repeat", type=int, default=3)
+    compiled_plan_cmd.set_defaults(func=bench_compiled_plan)
+
+    state_codec_cmd = subparsers.add_parser("state-codec", help="Benchmark AgentState snapshots.")
+    state_codec_cmd.add_argument("--commands", type=int, default=20000)
+    state_codec_cmd.add_argument("--args-lines", type=int, default=3)
+    state_codec_cmd.add_argument("--depth", type=int, default=3)
+    state_codec_cmd.add_argument("--messages", type=int, default=10000)
+    state_codec_cmd.add_argument("--repeat", type=int, default=3)
+    state_codec_cmd.set_defaults(func=bench_state_codec)
+
+    protocol_triples_cmd = subparsers.add_parser("protocol-triples", help="Benchmark protocol triple emission.")
+    protocol_triples_cmd.add_argument("--copies", type=int, default=10)
+    protocol_triples_cmd.add_argument("--repeat", type=int, default=3)
+    protocol_triples_cmd.set_defaults(func=bench_protocol_triples)
+
+    triple_index_cmd = subparsers.add_parser("triple-index", help="Benchmark the .kgi triple index.")
+    triple_index_cmd.add_argument("--copies", type=int, default=20)
+    triple_index_cmd.add_argument("--repeat", type=int, default=3)
+    triple_index_cmd.set_defaults(func=bench_triple_index)
+
+    log_scan_cmd = subparsers.add_parser("log-scan", help="Benchmark the sharded activity log scan.")
+    log_scan_cmd.add_argument("--size-mb", type=int, default=200)
+    log_scan_cmd.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    log_scan_cmd.add_argument("--repeat", type=int, default=2)
+    log_scan_cmd.set_defaults(func=bench_log_scan)
+
+    log_db_cmd = subparsers.add_parser("log-db", help="Benchmark the SQLite log index.")
+    log_db_cmd.add_argument("--size-mb", type=int, default=20)
+    log_db_cmd.add_argument("--repeat", type=int, default=3)
+    log_db_cmd.set_defaults(func=bench_log_db)
+
+    analysis_cmd = subparsers.add_parser("analysis-engine", help="Benchmark the single-pass log analyses.")
+    analysis_cmd.add_argument("--size-mb", type=int, default=20)
+    analysis_cmd.add_argument("--repeat", type=int, default=3)
+    analysis_cmd.set_defaults(func=bench_analysis_engine)
+
+    logger_cmd = subparsers.add_parser("logger", help="Benchmark log entry validation.")
+    logger_cmd.add_argument("--entries", type=int, default=1000)
+    logger_cmd.add_argument("--repeat", type=int, default=1)
+    logger_cmd.set_defaults(func=bench_logger)
+
+    log_append_cmd = subparsers.add_parser("log-append", help="Stress concurrent log appends.")
+    log_append_cmd.add_argument("--writers", type=int, default=8)
+    log_append_cmd.add_argument("--records", type=int, default=2000)
+    log_append_cmd.add_argument("--large-size", type=int, default=64 * 1024)
+    log_append_cmd.add_argument("--repeat", type=int, default=1)
+    log_append_cmd.set_defaults(func=bench_log_append)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
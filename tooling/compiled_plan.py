@@ -0,0 +1,204 @@
+"""
+Reads and writes compiled plan artifacts (`.planc`) cached beside plan files.
+
+Parsing a plan from text on every validation and every `call_plan` is wasted
+work for registry plans that rarely change. This module stores the result of
+`plan_parser.parse_plan` in a compact binary file next to the plan source
+(`<plan>.planc`) and reuses it for as long as the SHA-256 of the source still
+matches the hash recorded in the artifact.
+
+An artifact contains:
+- **Interned tool names:** each distinct tool name is stored once, and every
+  command refers to it by index.
+- **Argument offsets:** the byte span of every command and the byte ranges of
+  its argument lines. Argument text itself is not duplicated; it is sliced
+  lazily out of the plan source when a command's `args_text` is read.
+- **Source hash:** the SHA-256 and size of the plan source it was built from.
+- **FSM summary:** optionally, the result of the last successful `fdc_cli`
+  validation, so that unchanged plans need not be re-validated.
+
+The arrays in an artifact are the arrays of a `plan_parser.CommandTable`, so
+loading one is a handful of bulk copies rather than a per-command rebuild.
+Artifacts are little-endian regardless of the host and are written atomically.
+They are caches: a missing, stale or unreadable artifact is silently rebuilt.
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from tooling.plan_parser import CommandTable
+
+COMPILED_PLAN_SUFFIX = ".planc"
+FORMAT_VERSION = 1
+MAGIC = b"PLANC"
+
+# magic, version, source size, source sha256, tool table length, command
+# count, argument range count, FSM summary length
+_HEADER = struct.Struct("<5sHQ32sIIII")
+
+
+@dataclass
+class CompiledPlan:
+    """
+    The in-memory form of a `.planc` artifact.
+
+    Attributes:
+        source_sha256: The hex SHA-256 of the plan source the artifact matches.
+        commands: The parsed commands as an array-backed `CommandTable`,
+            with argument text sliced from the source on demand.
+        fsm_summary: The recorded result of the last successful validation,
+            or `None` if the plan has not been validated since it changed.
+        saved: Whether the artifact is on disk. `compile_plan` sets it to
+            False when the best-effort write failed.
+    """
+
+    source_sha256: str
+    commands: CommandTable
+    fsm_summary: Optional[Dict[str, Any]] = field(default=None)
+    saved: bool = field(default=True, compare=False)
+
+    @property
+    def tool_names(self) -> List[str]:
+        """The interned table of distinct tool names."""
+        return self.commands.tool_names
+
+
+def compiled_plan_path(plan_path: str) -> str:
+    """Returns the path of the compiled artifact for a plan file."""
+    return plan_path + COMPILED_PLAN_SUFFIX
+
+
+def file_sha256(path: str) -> str:
+    """Returns the hex SHA-256 of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _encode(table: CommandTable, source_size: int, digest: bytes, fsm_summary) -> bytes:
+    """Serializes a command table into the `.planc` binary layout."""
+    tools_blob = "\n".join(table.tool_names).encode("utf-8")
+    summary_blob = json.dumps(fsm_summary).encode("utf-8") if fsm_summary else b""
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        source_size,
+        digest,
+        len(tools_blob),
+        len(table),
+        len(table.ranges) // 2,
+        len(summary_blob),
+    )
+    parts = [header, tools_blob]
+    for arr in (table.tool_ids, table.spans, table.range_index, table.ranges):
+        if sys.byteorder == "big":
+            arr = array(arr.typecode, arr)
+            arr.byteswap()
+        parts.append(arr.tobytes())
+    parts.append(summary_blob)
+    return b"".join(parts)
+
+
+def _read_array(typecode: str, data: bytes, offset: int, count: int):
+    """Reads `count` items of `typecode` from `data`, returning the new offset."""
+    arr = array(typecode)
+    end = offset + count * arr.itemsize
+    arr.frombytes(data[offset:end])
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr, end
+
+
+def _decode(data: bytes, source: bytes) -> Optional[CompiledPlan]:
+    """Rebuilds a `CompiledPlan` from artifact bytes, or `None` if they don't match `source`."""
+    if len(data) < _HEADER.size:
+        return None
+    (magic, version, source_size, digest, tools_len, n_commands, n_ranges, summary_len) = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION or source_size != len(source):
+        return None
+    if digest != hashlib.sha256(source).digest():
+        return None
+
+    offset = _HEADER.size
+    tools_blob = data[offset:offset + tools_len].decode("utf-8")
+    tool_names = [sys.intern(name) for name in tools_blob.split("\n")] if n_commands else []
+    offset += tools_len
+    tool_ids, offset = _read_array("I", data, offset, n_commands)
+    spans, offset = _read_array("Q", data, offset, 4 * n_commands)
+    range_index, offset = _read_array("I", data, offset, n_commands + 1)
+    ranges, offset = _read_array("Q", data, offset, 2 * n_ranges)
+    if len(ranges) != 2 * n_ranges or offset + summary_len != len(data):
+        return None
+    summary_blob = data[offset:offset + summary_len]
+    fsm_summary = json.loads(summary_blob) if summary_len else None
+
+    return CompiledPlan(
+        source_sha256=digest.hex(),
+        commands=CommandTable(source, tool_names, tool_ids, spans, range_index, ranges),
+        fsm_summary=fsm_summary,
+    )
+
+
+def _write_atomic(path: str, data: bytes) -> bool:
+    """Writes `data` to `path` via a temporary file; returns False on failure."""
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return True
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+def compile_plan(plan_path: str, fsm_summary: Optional[Dict[str, Any]] = None) -> CompiledPlan:
+    """
+    Parses a plan file and writes its `.planc` artifact beside it.
+
+    The artifact is best-effort: if it cannot be written (e.g. a read-only
+    directory), the parsed plan is still returned, with `saved` False.
+    """
+    with open(plan_path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).digest()
+    table = CommandTable.from_source(source)
+    saved = _write_atomic(compiled_plan_path(plan_path), _encode(table, len(source), digest, fsm_summary))
+    return CompiledPlan(source_sha256=digest.hex(), commands=table, fsm_summary=fsm_summary, saved=saved)
+
+
+def load_compiled_plan(plan_path: str) -> Optional[CompiledPlan]:
+    """
+    Loads the `.planc` artifact for a plan file if it exists and still
+    matches the plan source. Returns `None` otherwise.
+    """
+    artifact_path = compiled_plan_path(plan_path)
+    try:
+        with open(artifact_path, "rb") as f:
+            data = f.read()
+        with open(plan_path, "rb") as f:
+            source = f.read()
+    except OSError:
+        return None
+    try:
+        return _decode(data, source)
+    except (struct.error, ValueError, UnicodeDecodeError, IndexError):
+        return None
+
+
+def load_plan(plan_path: str) -> CompiledPlan:
+    """
+    Returns the compiled form of a plan, reusing a fresh `.planc` artifact
+    when one exists and compiling (and caching) the plan otherwise.
+    """
+    return load_compiled_plan(plan_path) or compile_plan(plan_path)
+
+
+def record_validation(plan_path: str, fsm_summary: Dict[str, Any]) -> CompiledPlan:
+    """Recompiles a plan, storing the summary of a successful validation."""
+    return compile_plan(plan_path, fsm_summary=fsm_summary)
@@ -15,10 +15,19 @@ The script is configured via top-level constants:
 
 It uses Python's `ast` module to reliably parse source files without
 importing them, which avoids issues with dependencies or script side-effects.
+
+With `--watch`, the script stays resident, watches `SCAN_DIRECTORIES` (see
+`file_watcher.py`) and regenerates the documentation after each debounced
+burst of edits, re-parsing only the files that changed.
 """
+import argparse
 import ast
 import os
-from typing import List, Dict, Optional, Any, Union
+import sys
+from typing import List, Dict, Optional, Any, Tuple, Union
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling.file_watcher import watch
 
 # Directories to scan for Python source files.
 SCAN_DIRECTORIES = ["tooling/", "utils/"]
@@ -259,14 +268,31 @@ def find_python_files(directories: List[str]) -> List[str]:
                     py_files.append(os.path.join(root, file))
     return sorted(py_files)
 
-def main():
-    """Main function to find files, parse them, and write documentation."""
+def _parse_cached(filepath: str, cache: Dict[str, Tuple[Tuple[int, int], Optional[ModuleDoc]]]) -> Optional[ModuleDoc]:
+    """Parses a file unless the cache holds a result for its current mtime and size."""
+    st = os.stat(filepath)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = cache.get(filepath)
+    if cached and cached[0] == key:
+        return cached[1]
+    doc = parse_file_for_docs(filepath)
+    cache[filepath] = (key, doc)
+    return doc
+
+def build_documentation(cache: Optional[Dict] = None):
+    """
+    Finds, parses and documents every Python file, then writes OUTPUT_FILE.
+    With a `cache` dict (kept across calls), unchanged files are not re-parsed.
+    """
+    cache = {} if cache is None else cache
     print("--> Finding Python files...")
     python_files = find_python_files(SCAN_DIRECTORIES)
     print(f"--> Found {len(python_files)} Python files to document.")
+    for stale in set(cache) - set(python_files):
+        del cache[stale]
 
     print("--> Parsing files and extracting docstrings...")
-    all_docs = [parse_file_for_docs(f) for f in python_files]
+    all_docs = [_parse_cached(f, cache) for f in python_files]
     all_docs_filtered = [doc for doc in all_docs if doc]
 
     if not all_docs_filtered:
@@ -290,5 +316,24 @@ def main():
     except IOError as e:
         print(f"Error writing to file {OUTPUT_FILE}: {e}")
 
+def main():
+    """Main function to find files, parse them, and write documentation."""
+    parser = argparse.ArgumentParser(description="Generates system documentation from Python source files.")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Stay resident and regenerate the documentation whenever a source file changes."
+    )
+    args = parser.parse_args()
+
+    cache = {}
+    build_documentation(cache)
+    if args.watch:
+        def relevant(path):
+            name = os.path.basename(path)
+            return name.endswith(".py") and not name.startswith("test_")
+
+        watch(SCAN_DIRECTORIES, lambda changed: build_documentation(cache), relevant=relevant)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -68,17 +68,11 @@ def _load_plan_registry():
 
 
 def _log_event(log_entry):
-    """Appends a new log entry to the activity log, ensuring it's on a new line."""
-    content_to_write = json.dumps(log_entry) + "\n"
-    with open(LOG_FILE_PATH, "a+") as f:
-        # Check if the file is not empty
-        f.seek(0, os.SEEK_END)
-        if f.tell() > 0:
-            # Check if the last character is a newline
-            f.seek(f.tell() - 1)
-            if f.read(1) != "\n":
-                f.write("\n")
-        f.write(content_to_write)
+    """
+    Appends a new log entry to the activity log as one atomic record, so
+    that it never interleaves with entries written by other processes.
+    """
+    append_record(LOG_FILE_PATH, (json.dumps(log_entry) + "\n").encode("utf-8"))
 
 
 def _create_log_entry(task_id, action_type, details):
@@ -122,7 +116,9 @@ def close_task(task_id):
     # of this tool is the signal for the MasterControlGraph to proceed.
 
 
-from tooling.plan_parser import parse_plan, Command
+from tooling.plan_parser import Command, plan_line_commands
+from tooling.compiled_plan import file_sha256, load_compiled_plan, record_validation
+from utils.log_append import append_record
 
 # ... (other imports remain the same)
 
@@ -145,20 +141,24 @@ ACTION_TYPE_MAP = {
 
 
 def _validate_command(command: Command, state, fsm, fs):
-    """Validates a single Command object against the FSM and filesystem state."""
+    """
+    Validates a single Command object against the FSM and filesystem state.
+    Errors are reported against the command's source line when it is known.
+    """
     tool_name = command.tool_name
-    args_text = command.args_text
+    line = command.line
+    location = f" on line {line}" if line else ""
 
     action_type = ACTION_TYPE_MAP.get(tool_name)
     if not action_type:
-        print(f"Error: Unknown command '{tool_name}'.", file=sys.stderr)
+        print(f"Error{location}: Unknown command '{tool_name}'.", file=sys.stderr)
         sys.exit(1)
 
     # Syntactic check
     transitions = fsm["transitions"].get(state)
     if action_type not in (transitions or {}):
         print(
-            f"Error: Invalid FSM transition. Cannot perform '{action_type}' from state '{state}'.",
+            f"Error{location}: Invalid FSM transition. Cannot perform '{action_type}' from state '{state}'.",
             file=sys.stderr,
         )
         sys.exit(1)
@@ -176,6 +176,66 @@ def _validate_command(command: Command, state, fsm, fs):
     return next_state, fs
 
 
+def _validate_action(command, state, fsm, fs, placeholders):
+    """Validates a single plan line, substituting any active loop placeholders."""
+    if placeholders:
+        args_text = command.args_text
+        for placeholder, value in placeholders.items():
+            args_text = args_text.replace(placeholder, value)
+        command = Command(command.tool_name, args_text, command._span)
+    return _validate_command(command, state, fsm, fs)
+
+
+def _fsm_directive(command):
+    """Returns the FSM path of a `# FSM: <path>` line, or None for any other line."""
+    if command.tool_name == "#" and command.args_text.startswith("FSM:"):
+        return command.args_text.split(":", 1)[1].strip()
+    return None
+
+
+def _resolve_fsm_path(lines):
+    """Returns the FSM a plan is validated against: its `# FSM:` directive or the default."""
+    fsm_path = _fsm_directive(lines[0][1]) if lines else None
+    return os.path.join(ROOT_DIR, fsm_path) if fsm_path else FSM_DEF_PATH
+
+
+def _file_digest(path):
+    """Returns the SHA-256 of a file, or None if it does not exist."""
+    try:
+        return file_sha256(path)
+    except OSError:
+        return None
+
+
+def _record_dependency(dependencies, path):
+    """Records the current hash of a file a validation read, keyed relative to the repo root."""
+    if dependencies is not None:
+        dependencies[os.path.relpath(os.path.abspath(path), ROOT_DIR)] = _file_digest(path)
+
+
+def _cached_validation(plan_filepath):
+    """
+    Returns the FSM summary recorded in a plan's compiled artifact if the plan
+    source, the FSM it was validated against and every file the validation
+    read (transitively called sub-plans, their FSMs and the plan registry)
+    are all unchanged.
+    """
+    compiled = load_compiled_plan(plan_filepath)
+    summary = compiled.fsm_summary if compiled else None
+    if not summary or not summary.get("accepted"):
+        return None
+    fsm_path = os.path.join(ROOT_DIR, summary["fsm_path"])
+    if _file_digest(fsm_path) != summary["fsm_sha256"]:
+        return None
+    dependencies = summary.get("dependencies")
+    if not isinstance(dependencies, dict):
+        return None  # Recorded before dependencies were tracked.
+    for path, digest in dependencies.items():
+        if _file_digest(os.path.join(ROOT_DIR, path)) != digest:
+            return None
+    return summary
+
+
 def _validate_plan_recursive(
     lines,
     start_index,
@@ -185,9 +245,13 @@ def _validate_plan_recursive(
     placeholders,
     fsm,
     recursion_depth,
+    dependencies=None,
 ):
     """
     Recursively validates a block of a plan, now with recursion detection and FSM-switching.
+
+    The hash of every file read along the way (sub-plans, their FSMs and the
+    plan registry) is recorded in `dependencies`, if given.
     """
     if recursion_depth > MAX_RECURSION_DEPTH:
         print(f"Error: Max recursion depth ({MAX_RECURSION_DEPTH}) exceeded.", file=sys.stderr)
@@ -199,11 +263,11 @@ def _validate_plan_recursive(
     current_fsm = fsm
     # An FSM directive is only valid as the first non-empty line of a plan file.
     if start_index == 0 and lines:
-        first_line_content = lines[0][1].strip()
-        if first_line_content.startswith("# FSM:"):
-            fsm_path = first_line_content.split(":", 1)[1].strip()
+        fsm_path = _fsm_directive(lines[0][1])
+        if fsm_path:
             # The path in the directive is relative to the repo root.
             full_fsm_path = os.path.join(ROOT_DIR, fsm_path)
+            _record_dependency(dependencies, full_fsm_path)
             try:
                 with open(full_fsm_path, "r") as f:
                     current_fsm = json.load(f)
@@ -218,40 +282,36 @@ def _validate_plan_recursive(
                 sys.exit(1)
 
     while i < len(lines):
-        line_num, line_content = lines[i]
-        current_indent = len(line_content) - len(line_content.lstrip(" "))
+        current_indent, command = lines[i]
 
         if current_indent < indent_level:
             return state, fs, i, current_fsm  # End of current block
 
         if current_indent > indent_level:
             print(
-                f"Error on line {line_num+1}: Unexpected indentation.", file=sys.stderr
+                f"Error on line {command.line}: Unexpected indentation.", file=sys.stderr
             )
             sys.exit(1)
 
-        line_content = line_content.strip()
-        if line_content.startswith("# FSM:"):  # Ignore directive during validation
+        if _fsm_directive(command):  # Ignore directive during validation
             i += 1
             continue
 
-        command = line_content.split()[0]
-        args = line_content.split()[1:]
-
-        if command == "call_plan":
-            plan_name_or_path = args[0]
+        if command.tool_name == "call_plan":
+            plan_name_or_path = command.args_text.split()[0]
             registry = _load_plan_registry()
             sub_plan_path = registry.get(plan_name_or_path, plan_name_or_path)
+            _record_dependency(dependencies, PLAN_REGISTRY_PATH)
+            _record_dependency(dependencies, sub_plan_path)
 
             try:
                 with open(sub_plan_path, "r") as f:
-                    sub_plan_content = f.read()
-                sub_commands = parse_plan(sub_plan_content)
+                    sub_plan_lines = plan_line_commands(f.read())
             except FileNotFoundError:
                 print(f"Error: Sub-plan file not found at '{sub_plan_path}'.", file=sys.stderr)
                 sys.exit(1)
 
-            print(f"  Line {line_num+1}: Validating sub-plan '{sub_plan_path}'...")
+            print(f"  Line {command.line}: Validating sub-plan '{sub_plan_path}'...")
             sub_final_state, _, _, sub_fsm = _validate_plan_recursive(
                 sub_plan_lines,
                 0,
@@ -261,6 +321,7 @@ def _validate_plan_recursive(
                 {},
                 current_fsm,
                 recursion_depth + 1,
+                dependencies,
             )
 
             if sub_final_state not in sub_fsm["accept_states"]:
@@ -271,17 +332,14 @@ def _validate_plan_recursive(
                 sys.exit(1)
             print(f"  Sub-plan '{sub_plan_path}' is valid. Resuming parent plan.")
             i += 1
-        elif command == "for_each_file":
+        elif command.tool_name == "for_each_file":
             loop_depth = len(placeholders) + 1
             placeholder_key = f"{{file{loop_depth}}}"
             dummy_file = f"dummy_file_for_loop_{loop_depth}"
 
             loop_body_start = i + 1
             j = loop_body_start
-            while (
-                j < len(lines)
-                and (len(lines[j][1]) - len(lines[j][1].lstrip(" "))) > indent_level
-            ):
+            while j < len(lines) and lines[j][0] > indent_level:
                 j += 1
 
             loop_fs = fs.copy()
@@ -298,13 +356,14 @@ def _validate_plan_recursive(
                 new_placeholders,
                 current_fsm,
                 recursion_depth,
+                dependencies,
             )
 
             fs.update(loop_fs)
             i = j
         else:
             state, fs = _validate_action(
-                line_num, line_content, state, current_fsm, fs, placeholders
+                command, state, current_fsm, fs, placeholders
             )
             i += 1
 
@@ -312,7 +371,23 @@ def _validate_plan_recursive(
 
 
 def validate_plan(plan_filepath):
-    """Validates a plan using the centralized parser."""
+    """
+    Validates a plan using the centralized parser.
+
+    A successful validation is recorded in the plan's compiled `.planc`
+    artifact, with the hashes of the sub-plans, FSMs and plan registry it
+    read; re-validating when none of them changed is answered from that
+    record.
+    """
+    cached = _cached_validation(plan_filepath)
+    if cached:
+        print(
+            f"Plan is unchanged since its last successful validation against "
+            f"'{cached['fsm_path']}' (final state '{cached['final_state']}')."
+        )
+        print("\nValidation successful! Plan is syntactically and semantically valid.")
+        return
+
     try:
         # Load the default FSM. The recursive validator will switch if a directive is found.
         with open(FSM_DEF_PATH, "r") as f:
@@ -323,7 +398,7 @@ def validate_plan(plan_filepath):
         print(f"Error: Could not find file {e.filename}", file=sys.stderr)
         sys.exit(1)
 
-    commands = parse_plan(plan_content)
+    lines = plan_line_commands(plan_content)
 
     simulated_fs = set()
     for root, dirs, files in os.walk("."):
@@ -333,11 +408,23 @@ def validate_plan(plan_filepath):
             simulated_fs.add(os.path.join(root, name).replace("./", ""))
 
     print(f"Starting validation with {len(simulated_fs)} files pre-loaded...")
+    dependencies = {}
     final_state, _, _, final_fsm = _validate_plan_recursive(
-        lines, 0, 0, default_fsm["start_state"], simulated_fs, {}, default_fsm, 0
+        lines, 0, 0, default_fsm["start_state"], simulated_fs, {}, default_fsm, 0, dependencies
     )
 
     if final_state in final_fsm["accept_states"]:
+        fsm_path = _resolve_fsm_path(lines)
+        record_validation(
+            plan_filepath,
+            {
+                "fsm_path": os.path.relpath(fsm_path, ROOT_DIR),
+                "fsm_sha256": file_sha256(fsm_path),
+                "final_state": final_state,
+                "accepted": True,
+                "dependencies": dependencies,
+            },
+        )
         print("\nValidation successful! Plan is syntactically and semantically valid.")
     else:
         print(f"\nValidation failed. Plan ends in non-accepted state: '{final_state}'", file=sys.stderr)
@@ -0,0 +1,211 @@
+"""
+Watches source directories and reruns a build when files change.
+
+This module backs the `--watch` mode of `protocol_compiler.py` and
+`doc_generator.py`. It keeps the process resident, so that imports, loaded
+schemas and per-file caches survive between rebuilds.
+
+- **Change detection:** on Linux, directories are watched with inotify
+  (through `ctypes`, so no extra dependency is needed). Elsewhere, or if
+  inotify is unavailable, directories are polled by comparing file
+  modification times and sizes.
+- **Debouncing:** editors and `git checkout` produce bursts of events. After
+  the first change, events are collected until the directories have been
+  quiet for the debounce interval, and the build runs once for the whole
+  burst.
+- **Latency logging:** each rebuild logs the time from the first change in
+  the burst to the end of the rebuild, and the time the rebuild itself took.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+# inotify event masks (from <sys/inotify.h>).
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc():
+    """Returns libc if it provides inotify, else None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not (hasattr(libc, "inotify_init1") and hasattr(libc, "inotify_add_watch")):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """
+    Reports paths that changed under a set of directories.
+
+    Directories are watched recursively. `wait` blocks until at least one
+    change is seen (or the timeout expires) and returns the changed paths.
+    """
+
+    def __init__(self, directories: Iterable[str], poll_interval: float = 0.5, force_polling: bool = False):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.poll_interval = poll_interval
+        self._libc = None if force_polling else _load_libc()
+        self._fd = None
+        self._watches: Dict[int, str] = {}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                for directory in self.directories:
+                    self._add_tree(directory)
+        if self._fd is None:
+            self._snapshot = self._scan()
+
+    @property
+    def backend(self) -> str:
+        """`"inotify"` or `"polling"`."""
+        return "inotify" if self._fd is not None else "polling"
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- inotify ---
+
+    def _add_tree(self, directory: str):
+        for root, _, _ in os.walk(directory):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), _WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = root
+
+    def _read_events(self, timeout: Optional[float]) -> Set[str]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(path)
+            changed.add(path)
+        return changed
+
+    # --- polling ---
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for directory in self.directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _poll(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            wait = self.poll_interval if deadline is None else min(self.poll_interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(wait)
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Returns the paths that changed, waiting up to `timeout` seconds (forever if None)."""
+        if self._fd is not None:
+            return self._read_events(timeout)
+        return self._poll(timeout)
+
+
+def watch(
+    directories: Iterable[str],
+    rebuild: Callable[[Set[str]], None],
+    relevant: Callable[[str], bool] = lambda path: True,
+    debounce: float = 0.2,
+    poll_interval: float = 0.5,
+    max_rebuilds: Optional[int] = None,
+):
+    """
+    Calls `rebuild(changed_paths)` after every debounced burst of changes to
+    relevant files under `directories`, logging each rebuild's latency.
+    Runs until interrupted (or until `max_rebuilds` rebuilds have run).
+    """
+    rebuilds = 0
+    with FileWatcher(directories, poll_interval=poll_interval) as watcher:
+        print(f"[watch] Watching {', '.join(watcher.directories)} ({watcher.backend}). Press Ctrl+C to stop.")
+        try:
+            while max_rebuilds is None or rebuilds < max_rebuilds:
+                changed = {path for path in watcher.wait() if relevant(path)}
+                if not changed:
+                    continue
+                first_change = time.perf_counter()
+                # Debounce: keep collecting until the directories are quiet.
+                while True:
+                    more = watcher.wait(timeout=debounce)
+                    if not more:
+                        break
+                    changed.update(path for path in more if relevant(path))
+
+                start = time.perf_counter()
+                names = ", ".join(sorted(os.path.basename(path) for path in changed))
+                print(f"[watch] {len(changed)} changed file(s): {names}")
+                try:
+                    rebuild(changed)
+                except Exception as e:
+                    print(f"[watch] Rebuild failed: {e}")
+                end = time.perf_counter()
+                print(
+                    f"[watch] Rebuilt in {(end - start) * 1000:.1f} ms "
+                    f"({(end - first_change) * 1000:.1f} ms after the first change)."
+                )
+                rebuilds += 1
+        except KeyboardInterrupt:
+            print("\n[watch] Stopped.")
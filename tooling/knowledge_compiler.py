@@ -13,17 +13,63 @@ appended to the `knowledge_core/lessons.jsonl` file, which serves as the
 agent's persistent memory of what has worked, what has failed, and what can be
 improved in future tasks.
 
-The script is executed via the command line, taking the path to a completed
-post-mortem file as its primary argument.
+The script is executed via the command line, taking the paths of completed
+post-mortem files as arguments, or `--all` to compile every post-mortem in
+`postmortems/`. Compilation can be re-run safely:
+
+- Lessons are deduplicated by a hash of their normalized content, checked
+  against an index of the lessons already in `lessons.jsonl`
+  (`knowledge_core/lessons.index.json`).
+- A manifest (`knowledge_core/postmortems.manifest.json`) records each
+  post-mortem's size, modification time and content hash, so unchanged
+  post-mortems are skipped without being parsed.
+- Large batches are parsed across a process pool.
 """
 import argparse
+import glob
+import hashlib
 import re
 import os
 import json
 import uuid
 import datetime
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling import lesson_journal
+from utils.log_append import exclusive_lock
 
 KNOWLEDGE_CORE_PATH = "knowledge_core/lessons.jsonl"
+POSTMORTEMS_DIR = "postmortems"
+# Kept beside the lessons file (see `lessons_index_path` and `manifest_path`).
+LESSONS_INDEX_FILE = "lessons.index.json"
+MANIFEST_FILE = "postmortems.manifest.json"
+INDEX_VERSION = 1
+MANIFEST_VERSION = 1
+# Batches smaller than this are parsed in-process: starting workers costs more.
+PARALLEL_COMPILE_THRESHOLD = 16
+
+# Patterns are compiled once, not per post-mortem or per action.
+_LESSONS_SECTION = re.compile(
+    r"## (?:3\.\s+Corrective Actions & Lessons Learned|5\.\s+Proposed Corrective Actions)\n(.+?)(?:\n---|\Z)",
+    re.DOTALL,
+)
+# Captures each numbered list item.
+_LIST_ITEM = re.compile(r"^\d\.\s+(.*?)(?=\n^\d\.\s+|\Z)", re.DOTALL | re.MULTILINE)
+_ACTION = re.compile(r"\*\*Action:\*\*(.*)", re.DOTALL)
+_LESSON = re.compile(r"\*\*Lesson:\*\*(.*)", re.DOTALL)
+_TASK_ID = re.compile(r"\*\*Task ID:\*\*\s*`(.+?)`")
+_COMPLETION_DATE = re.compile(r"\*\*Completion Date:\*\*\s*`(.+?)`")
+# Pattern: "Add tool '...' to protocol '...'"
+_ADD_TOOL = re.compile(r"add tool\s+'([^']*)'\s+to protocol\s+'([^']*)'", re.IGNORECASE)
+# Pattern: "Update rule '...' in protocol '...' to '...'"
+_UPDATE_RULE = re.compile(
+    r"update rule\s+'([^']*)'\s+in protocol\s+'([^']*)'\s+to\s+'([^']*)'", re.IGNORECASE
+)
+# Pattern: "Deprecate tool '...' from protocol '...'"
+_DEPRECATE_TOOL = re.compile(r"deprecate tool\s+'([^']*)'\s+from protocol\s+'([^']*)'", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
 
 
 def extract_lessons_from_postmortem(postmortem_content: str) -> list:
@@ -31,35 +77,27 @@ def extract_lessons_from_postmortem(postmortem_content: str) -> list:
     Parses a post-mortem report to extract lessons learned.
     Handles multiple possible section headers and formats.
     """
-    lessons_section_match = re.search(
-        r"## (?:3\.\s+Corrective Actions & Lessons Learned|5\.\s+Proposed Corrective Actions)\n(.+?)(?:\n---|\Z)",
-        postmortem_content,
-        re.DOTALL,
-    )
+    lessons_section_match = _LESSONS_SECTION.search(postmortem_content)
     if not lessons_section_match:
         return []
 
     lessons_section = lessons_section_match.group(1)
 
-    # Pattern to capture each numbered list item
-    item_pattern = re.compile(
-        r"^\d\.\s+(.*?)(?=\n^\d\.\s+|\Z)", re.DOTALL | re.MULTILINE
-    )
-    items = item_pattern.findall(lessons_section)
+    items = _LIST_ITEM.findall(lessons_section)
 
     cleaned_lessons = []
     for item in items:
         lesson = ""
         action = ""
 
-        action_match = re.search(r"\*\*Action:\*\*(.*)", item, re.DOTALL)
+        action_match = _ACTION.search(item)
 
         if action_match:
             action = action_match.group(1).strip()
             # The lesson is whatever comes before "**Action:**"
             lesson = item[:action_match.start()].strip()
             # If there's an explicit **Lesson:**, prefer that.
-            lesson_explicit_match = re.search(r"\*\*Lesson:\*\*(.*)", lesson, re.DOTALL)
+            lesson_explicit_match = _LESSON.search(lesson)
             if lesson_explicit_match:
                 lesson = lesson_explicit_match.group(1).strip()
         else:
@@ -83,8 +121,8 @@ def extract_metadata_from_postmortem(postmortem_content: str) -> dict:
     """
     Parses a post-mortem report to extract metadata like Task ID and Date.
     """
-    task_id_match = re.search(r"\*\*Task ID:\*\*\s*`(.+?)`", postmortem_content)
-    date_match = re.search(r"\*\*Completion Date:\*\*\s*`(.+?)`", postmortem_content)
+    task_id_match = _TASK_ID.search(postmortem_content)
+    date_match = _COMPLETION_DATE.search(postmortem_content)
     return {
         "task_id": task_id_match.group(1) if task_id_match else "Unknown",
         "date": date_match.group(1) if date_match else str(datetime.date.today()),
@@ -98,11 +136,7 @@ def parse_action_to_command(action_text: str) -> dict:
     This is the core of translating insights into automated actions. It uses
     pattern matching to identify specific, supported commands.
     """
-    # Pattern: "Add tool '...' to protocol '...'"
-    add_tool_pattern = re.compile(
-        r"add tool\s+'([^']*)'\s+to protocol\s+'([^']*)'", re.IGNORECASE
-    )
-    match = add_tool_pattern.search(action_text)
+    match = _ADD_TOOL.search(action_text)
     if match:
         tool_name, protocol_id = match.groups()
         return {
@@ -114,11 +148,7 @@ def parse_action_to_command(action_text: str) -> dict:
             },
         }
 
-    # Pattern: "Update rule '...' in protocol '...' to '...'"
-    update_rule_pattern = re.compile(
-        r"update rule\s+'([^']*)'\s+in protocol\s+'([^']*)'\s+to\s+'([^']*)'", re.IGNORECASE
-    )
-    match = update_rule_pattern.search(action_text)
+    match = _UPDATE_RULE.search(action_text)
     if match:
         rule_id, protocol_id, description = match.groups()
         return {
@@ -131,11 +161,7 @@ def parse_action_to_command(action_text: str) -> dict:
             },
         }
 
-    # Pattern: "Deprecate tool '...' from protocol '...'"
-    deprecate_tool_pattern = re.compile(
-        r"deprecate tool\s+'([^']*)'\s+from protocol\s+'([^']*)'", re.IGNORECASE
-    )
-    match = deprecate_tool_pattern.search(action_text)
+    match = _DEPRECATE_TOOL.search(action_text)
     if match:
         tool_name, protocol_id = match.groups()
         return {
@@ -171,38 +197,249 @@ def format_lesson_entry(metadata: dict, lesson_data: dict) -> dict:
     }
 
 
+def lesson_hash(entry: dict) -> str:
+    """
+    Returns the hash of a lesson's normalized content: its insight and
+    action, ignoring case, whitespace, its id, task, date and status.
+    """
+    def normalize(text):
+        return _WHITESPACE.sub(" ", str(text)).strip().casefold()
+
+    action = entry.get("action") or {}
+    content = {
+        "insight": normalize(entry.get("insight", "")),
+        "command": action.get("command"),
+        "parameters": {key: normalize(value) for key, value in (action.get("parameters") or {}).items()},
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def lessons_index_path(lessons_path: str) -> str:
+    """Returns the path of the content-hash index kept beside a lessons file."""
+    return os.path.join(os.path.dirname(lessons_path), LESSONS_INDEX_FILE)
+
+
+def manifest_path(lessons_path: str) -> str:
+    """Returns the path of the post-mortem manifest kept beside a lessons file."""
+    return os.path.join(os.path.dirname(lessons_path), MANIFEST_FILE)
+
+
+def _load_json(path, version):
+    """Loads a versioned JSON file, returning None if it is missing, stale or corrupt."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) and data.get("version") == version else None
+
+
+def _write_json(path, data):
+    """Writes a JSON file atomically. Failures only cost a rebuild next time."""
+    temp_file = path + ".tmp"
+    try:
+        with open(temp_file, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(temp_file, path)
+    except OSError as e:
+        print(f"Warning: Could not write {path}: {e}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def load_lessons_index(lessons_path: str) -> set:
+    """
+    Returns the content hashes (see `lesson_hash`) of the lessons in a
+    lessons file. They are read from the index beside it while the index
+    matches the file's size and modification time, and are otherwise
+    recomputed from the file and the index rewritten.
+    """
+    stamp = _file_stamp(lessons_path)
+    if stamp is None:
+        return set()
+    index = _load_json(lessons_index_path(lessons_path), INDEX_VERSION)
+    if index is not None and index.get("lessons_file") == stamp:
+        return set(index.get("hashes", []))
+
+    hashes = set()
+    with open(lessons_path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict):
+                hashes.add(lesson_hash(entry))
+    write_lessons_index(lessons_path, hashes, stamp)
+    return hashes
+
+
+def write_lessons_index(lessons_path: str, hashes: set, stamp: dict = None):
+    """Records the content hashes of the lessons file as it is now."""
+    stamp = stamp or _file_stamp(lessons_path)
+    _write_json(lessons_index_path(lessons_path), {
+        "version": INDEX_VERSION,
+        "lessons_file": stamp,
+        "hashes": sorted(hashes),
+    })
+
+
+def _compile_postmortem(path, known_sha256=None):
+    """
+    Parses one post-mortem. Returns its path, its manifest record and its
+    formatted lessons, or None for the lessons if its content still hashes
+    to `known_sha256`.
+    """
+    stamp = _file_stamp(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    record = dict(stamp, sha256=hashlib.sha256(data).hexdigest())
+    if record["sha256"] == known_sha256:
+        return path, record, None
+    content = data.decode("utf-8")
+    metadata = extract_metadata_from_postmortem(content)
+    lessons = [format_lesson_entry(metadata, lesson) for lesson in extract_lessons_from_postmortem(content)]
+    return path, record, lessons
+
+
+def _compile_postmortem_args(args):
+    return _compile_postmortem(*args)
+
+
+def compile_postmortems(postmortem_paths, lessons_path=None, max_workers=None, use_manifest=True) -> dict:
+    """
+    Compiles the lessons of several post-mortems into the lessons file.
+
+    Post-mortems whose size and modification time (or, failing that, content
+    hash) match the manifest, and whose lessons are all still in the lessons
+    file, are skipped. The others are parsed, across a process pool for
+    batches of at least `PARALLEL_COMPILE_THRESHOLD` files. A lesson whose
+    normalized content is already in the lessons file (or earlier in the
+    batch) is not added again.
+
+    Returns a summary with the number of post-mortems `compiled` and
+    `skipped`, of lessons `added` and of `duplicates` ignored.
+    """
+    lessons_path = lessons_path or KNOWLEDGE_CORE_PATH
+    manifest_file = manifest_path(lessons_path)
+    manifest = (_load_json(manifest_file, MANIFEST_VERSION) if use_manifest else None) or {
+        "version": MANIFEST_VERSION, "postmortems": {}}
+    known = load_lessons_index(lessons_path)
+    summary = {"compiled": 0, "skipped": 0, "added": 0, "duplicates": 0}
+
+    jobs = []
+    for path in dict.fromkeys(os.path.normpath(path) for path in postmortem_paths):
+        record = manifest["postmortems"].get(path)
+        if record is None or not known.issuperset(record.get("lessons", [])):
+            jobs.append((path, None))
+        elif _file_stamp(path) == {"mtime_ns": record.get("mtime_ns"), "size": record.get("size")}:
+            summary["skipped"] += 1
+        else:
+            jobs.append((path, record.get("sha256")))
+
+    if len(jobs) < PARALLEL_COMPILE_THRESHOLD or max_workers == 1:
+        results = [_compile_postmortem(*job) for job in jobs]
+    else:
+        max_workers = max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+            results = list(pool.map(_compile_postmortem_args, jobs, chunksize=max(1, len(jobs) // (4 * max_workers))))
+
+    new_lessons = []
+    for path, record, lessons in results:
+        previous = manifest["postmortems"].get(path, {})
+        if lessons is None:
+            summary["skipped"] += 1
+            record["lessons"] = previous.get("lessons", [])
+            manifest["postmortems"][path] = record
+            continue
+        summary["compiled"] += 1
+        hashes = []
+        for lesson in lessons:
+            content_hash = lesson_hash(lesson)
+            hashes.append(content_hash)
+            if content_hash in known:
+                summary["duplicates"] += 1
+                continue
+            known.add(content_hash)
+            new_lessons.append(lesson)
+        record["lessons"] = hashes
+        manifest["postmortems"][path] = record
+
+    if new_lessons:
+        os.makedirs(os.path.dirname(lessons_path) or ".", exist_ok=True)
+        # Under the lock the lesson journal takes to compact the lessons file.
+        with exclusive_lock(lesson_journal.lock_path(lessons_path)):
+            with open(lessons_path, "a") as f:
+                f.write("".join(json.dumps(lesson) + "\n" for lesson in new_lessons))
+        write_lessons_index(lessons_path, known)
+    summary["added"] = len(new_lessons)
+    if results:
+        _write_json(manifest_file, manifest)
+    return summary
+
+
 def main():
     parser = argparse.ArgumentParser(
-        description="Parses a post-mortem report and compiles the lessons learned into a structured JSONL file."
+        description="Parses post-mortem reports and compiles the lessons learned into a structured JSONL file."
+    )
+    parser.add_argument(
+        "postmortem_paths", nargs="*", help="The paths to completed post-mortem markdown files."
     )
     parser.add_argument(
-        "postmortem_path", help="The path to the completed post-mortem markdown file."
+        "--all",
+        action="store_true",
+        help="Compile every post-mortem in the post-mortems directory.",
+    )
+    parser.add_argument(
+        "--postmortems-dir",
+        default=POSTMORTEMS_DIR,
+        help=f"The directory compiled by --all. Defaults to {POSTMORTEMS_DIR}",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes used to parse large batches. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-parse unchanged post-mortems. Lessons already compiled are still not duplicated.",
     )
     args = parser.parse_args()
 
-    if not os.path.exists(args.postmortem_path):
-        print(f"Error: Post-mortem file not found at '{args.postmortem_path}'")
-        return
+    paths = list(args.postmortem_paths)
+    if args.all:
+        paths += sorted(glob.glob(os.path.join(args.postmortems_dir, "*.md")))
+    if not paths:
+        parser.error("Give the path of a post-mortem, or --all.")
 
-    with open(args.postmortem_path, "r") as f:
-        content = f.read()
-
-    metadata = extract_metadata_from_postmortem(content)
-    lessons = extract_lessons_from_postmortem(content)
-
-    if not lessons:
-        print("No lessons found in the specified post-mortem file.")
+    missing = [path for path in paths if not os.path.exists(path)]
+    for path in missing:
+        print(f"Error: Post-mortem file not found at '{path}'")
+    if missing:
         return
 
-    print(f"Found {len(lessons)} new lesson(s) in '{args.postmortem_path}'.")
+    summary = compile_postmortems(
+        paths, lessons_path=KNOWLEDGE_CORE_PATH, max_workers=args.jobs, use_manifest=not args.force
+    )
 
-    with open(KNOWLEDGE_CORE_PATH, "a") as f:
-        for lesson in lessons:
-            formatted_entry = format_lesson_entry(metadata, lesson)
-            f.write(json.dumps(formatted_entry) + "\n")
+    if not summary["added"] and not summary["duplicates"] and not summary["skipped"]:
+        print("No lessons found in the specified post-mortem file(s).")
+        return
 
     print(
-        f"Successfully compiled {len(lessons)} lesson(s) into '{KNOWLEDGE_CORE_PATH}'."
+        f"Successfully compiled {summary['added']} new lesson(s) from {summary['compiled']} post-mortem(s) "
+        f"into '{KNOWLEDGE_CORE_PATH}'. Skipped {summary['skipped']} unchanged post-mortem(s) and "
+        f"{summary['duplicates']} duplicate lesson(s)."
     )
 
 
@@ -4,15 +4,26 @@ Enriches the local knowledge graph with data from external sources like DBPedia.
 This script loads the RDF graph generated from the project's protocols,
 identifies key concepts (like tools and rules), queries the DBPedia SPARQL
 endpoint to find related information, and merges the external data into a new,
-enriched knowledge graph.
+enriched knowledge graph, together with its memory-mappable triple index.
+
+Concepts are looked up in the local graph's triple index (see
+`triple_index.py`) rather than in a parsed copy of the graph; the Turtle file
+is only parsed when external triples have to be merged into it.
 """
 
 import os
+import shutil
+import sys
 import requests
 from rdflib import Graph
+from rdflib.util import from_n3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling.triple_index import TripleIndex, open_triple_index, triple_index_path, write_graph_index
 
 # DBPedia SPARQL endpoint
 DBPEDIA_SPARQL_ENDPOINT = "http://dbpedia.org/sparql"
+ASSOCIATED_TOOL = "http://example.org/ontology/associated_tool"
 
 def load_local_graph(graph_file):
     """Loads the local RDF graph from a file."""
@@ -25,18 +36,24 @@ def load_local_graph(graph_file):
 def extract_concepts(graph):
     """
     Extracts key concepts (e.g., tools) from the local graph to query externally.
-    This version dynamically extracts tool names from the graph.
+    This version dynamically extracts tool names from the graph, which is
+    either an rdflib `Graph` or a `TripleIndex`.
     """
-    # This query finds the string values of any objects connected by the
-    # 'associated_tool' property.
-    query = """
-    SELECT DISTINCT ?toolName
-    WHERE {
-        ?s <http://example.org/ontology/associated_tool> ?toolName .
-    }
-    """
-    results = graph.query(query)
-    concepts = [row.toolName.toPython() for row in results]
+    if isinstance(graph, TripleIndex):
+        # A single pattern lookup in the index's POS permutation.
+        terms = graph.objects(predicate=f"<{ASSOCIATED_TOOL}>")
+        concepts = [from_n3(term).toPython() for term in terms]
+    else:
+        # This query finds the string values of any objects connected by the
+        # 'associated_tool' property.
+        query = f"""
+        SELECT DISTINCT ?toolName
+        WHERE {{
+            ?s <{ASSOCIATED_TOOL}> ?toolName .
+        }}
+        """
+        results = graph.query(query)
+        concepts = [row.toolName.toPython() for row in results]
     # Clean up concepts - they might be paths or have other noise
     cleaned_concepts = []
     for concept in concepts:
@@ -99,37 +116,47 @@ def run_knowledge_integration(input_graph_path, output_graph_path):
     """
     messages = []
 
-    # 1. Load local graph
-    local_graph, msg = load_local_graph(input_graph_path)
-    messages.append(msg)
-    if not local_graph:
-        return "\n".join(messages)
-
-    initial_triple_count = len(local_graph)
+    # 1. Open the local graph's triple index
+    if not os.path.exists(input_graph_path):
+        return f"Error: Local graph file not found at {input_graph_path}"
+    with open_triple_index(input_graph_path) as index:
+        initial_triple_count = len(index)
+        messages.append(f"Successfully loaded local graph with {initial_triple_count} triples.")
 
-    # 2. Extract concepts
-    concepts_to_query, msg = extract_concepts(local_graph)
+        # 2. Extract concepts
+        concepts_to_query, msg = extract_concepts(index)
     messages.append(msg)
     if not concepts_to_query:
         messages.append("No concepts found to enrich. Exiting.")
         return "\n".join(messages)
 
-    # 3. Query DBPedia and merge results
-    total_added_triples = 0
+    # 3. Query DBPedia
+    external_graphs = []
     for concept in concepts_to_query:
         external_graph, msg = query_dbpedia(concept)
         messages.append(f"  - {msg}")
         if external_graph:
-            total_added_triples += len(external_graph)
-            local_graph += external_graph
+            external_graphs.append(external_graph)
+    total_added_triples = sum(len(external_graph) for external_graph in external_graphs)
 
-    # 4. Save the enriched graph
-    local_graph.serialize(destination=output_graph_path, format="turtle")
-    final_triple_count = len(local_graph)
+    # 4. Save the enriched graph, parsing the local one only to merge into it
+    if total_added_triples:
+        local_graph, msg = load_local_graph(input_graph_path)
+        for external_graph in external_graphs:
+            local_graph += external_graph
+        local_graph.serialize(destination=output_graph_path, format="turtle")
+        write_graph_index(local_graph, output_graph_path)
+        final_triple_count = len(local_graph)
+    else:
+        # Nothing to merge: the enriched graph is the local one, and so is its index.
+        if os.path.abspath(input_graph_path) != os.path.abspath(output_graph_path):
+            shutil.copyfile(input_graph_path, output_graph_path)
+            shutil.copyfile(triple_index_path(input_graph_path), triple_index_path(output_graph_path))
+        final_triple_count = initial_triple_count
     messages.append(
         f"\nSuccessfully saved enriched knowledge graph to {output_graph_path}.\n"
         f"Initial triples: {initial_triple_count}, Added: {total_added_triples}, "
         f"Final triples: {final_triple_count}."
     )
 
-    return "\n".join(messages)
\ No newline at end of file
+    return "\n".join(messages)
@@ -0,0 +1,276 @@
+"""
+Records lesson status changes in an append-only journal.
+
+`knowledge_core/lessons.jsonl` (the base file) holds every lesson ever
+compiled. The self-correction orchestrator only changes the `status` of a
+few of them per cycle, so instead of rewriting the base file it appends one
+line per change to `lessons.journal.jsonl`:
+
+    {"lesson_id": "...", "status": "applied", "timestamp": "..."}
+
+A lesson's status is the last one journaled for it, or else the one in the
+base file. Two more files sit beside the base file:
+
+- `lessons.pending.json`, a cache mapping each pending lesson to the byte
+  offset of its line in the base file, with how much of the base file and
+  of the journal it covers. Lessons appended to the base file (by
+  `knowledge_compiler.py`) and entries appended to the journal since are
+  read from those offsets, so `load_pending_lessons` reads O(pending) lines
+  rather than the whole history. If the base file was rewritten, the cache
+  is rebuilt from scratch.
+- `lessons.jsonl.lock`, locked while the base file or journal is written.
+
+`compact_lessons` folds the journal back into the base file (written
+atomically) and removes the journal; `compact_if_due` does so once the
+journal holds `COMPACTION_THRESHOLD` entries.
+"""
+import hashlib
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from utils.log_append import append_record, exclusive_lock
+
+INDEX_VERSION = 1
+# Journal entries accumulated before `compact_if_due` compacts.
+COMPACTION_THRESHOLD = 500
+# Bytes at the end of the covered part of the base file whose hash tells an
+# append from a rewrite.
+_TAIL_BYTES = 256
+
+
+def journal_path(lessons_path: str) -> str:
+    """Returns the path of the status journal kept beside a lessons file."""
+    return os.path.splitext(lessons_path)[0] + ".journal.jsonl"
+
+
+def pending_index_path(lessons_path: str) -> str:
+    """Returns the path of the pending-lesson index kept beside a lessons file."""
+    return os.path.splitext(lessons_path)[0] + ".pending.json"
+
+
+def lock_path(lessons_path: str) -> str:
+    """Returns the path of the lock file held while a lessons file or its journal is written."""
+    return lessons_path + ".lock"
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _tail_sha256(f, size):
+    start = max(0, size - _TAIL_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(size - start)).hexdigest()
+
+
+def _complete_lines(f, start):
+    """Yields the offset and content of each complete line of a file from `start` on."""
+    f.seek(start)
+    offset = start
+    for line in f:
+        if not line.endswith(b"\n"):
+            return  # Still being written.
+        yield offset, line
+        offset += len(line)
+
+
+def _decode(line):
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    return entry if isinstance(entry, dict) else None
+
+
+def _load_index(lessons_path):
+    try:
+        with open(pending_index_path(lessons_path), "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if isinstance(index, dict) and index.get("version") == INDEX_VERSION else None
+
+
+def _write_index(lessons_path, index):
+    """Writes the index atomically. Failures only cost a rebuild next time."""
+    path = pending_index_path(lessons_path)
+    temp_file = path + ".tmp"
+    try:
+        with open(temp_file, "w") as f:
+            json.dump(index, f, sort_keys=True)
+        os.replace(temp_file, path)
+    except OSError as e:
+        print(f"Warning: Could not write {path}: {e}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def _build_index(lessons_path, index):
+    """
+    Brings an index up to date with the base file and journal, starting
+    from scratch if `index` is None or the base file no longer extends the
+    part it covers. Returns the index and whether it changed.
+    """
+    base_size = _file_size(lessons_path)
+    journal_size = _file_size(journal_path(lessons_path))
+    if index is not None and (base_size < index["base"]["size"] or journal_size < index["journal"]["size"]):
+        index = None
+    with open(lessons_path, "rb") if os.path.exists(lessons_path) else io.BytesIO() as base:
+        if index is not None and _tail_sha256(base, index["base"]["size"]) != index["base"]["tail_sha256"]:
+            index = None
+        incremental = index is not None
+        if not incremental:
+            index = {
+                "version": INDEX_VERSION,
+                "base": {"size": 0, "tail_sha256": _tail_sha256(base, 0)},
+                "journal": {"size": 0, "entries": 0},
+                "pending": {},
+            }
+        pending = index["pending"]
+        # A full rebuild keeps every lesson's offset, for lessons journaled back to pending.
+        offsets = None if incremental else {}
+
+        end = index["base"]["size"]
+        for offset, line in _complete_lines(base, end):
+            end = offset + len(line)
+            lesson = _decode(line)
+            if lesson is None or "lesson_id" not in lesson:
+                continue
+            if offsets is not None:
+                offsets[lesson["lesson_id"]] = offset
+            if lesson.get("status") == "pending":
+                pending[lesson["lesson_id"]] = offset
+            else:
+                pending.pop(lesson["lesson_id"], None)
+        changed = not incremental or end != index["base"]["size"]
+        index["base"] = {"size": end, "tail_sha256": _tail_sha256(base, end)}
+
+    journal_end = index["journal"]["size"]
+    if journal_size > journal_end:
+        with open(journal_path(lessons_path), "rb") as journal:
+            for offset, line in _complete_lines(journal, journal_end):
+                journal_end = offset + len(line)
+                entry = _decode(line)
+                if entry is None or "lesson_id" not in entry:
+                    continue
+                index["journal"]["entries"] += 1
+                lesson_id = entry["lesson_id"]
+                if entry.get("status") != "pending":
+                    pending.pop(lesson_id, None)
+                elif lesson_id not in pending:
+                    if offsets is None:
+                        return _build_index(lessons_path, None)
+                    if lesson_id in offsets:
+                        pending[lesson_id] = offsets[lesson_id]
+        changed = changed or journal_end != index["journal"]["size"]
+        index["journal"]["size"] = journal_end
+    return index, changed
+
+
+def load_pending_index(lessons_path: str) -> dict:
+    """Returns the pending-lesson index, updated with what was appended since it was written."""
+    index, changed = _build_index(lessons_path, _load_index(lessons_path))
+    if changed:
+        _write_index(lessons_path, index)
+    return index
+
+
+def load_pending_lessons(lessons_path: str) -> List[dict]:
+    """Returns the pending lessons, in file order, reading only their lines of the base file."""
+    if not os.path.exists(lessons_path):
+        return []
+    offsets = sorted(load_pending_index(lessons_path)["pending"].values())
+    lessons = []
+    with open(lessons_path, "rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            lesson = json.loads(f.readline())
+            lesson["status"] = "pending"  # Its line may say otherwise if it was journaled back.
+            lessons.append(lesson)
+    return lessons
+
+
+def _read_journal(lessons_path):
+    statuses = {}
+    try:
+        with open(journal_path(lessons_path), "rb") as journal:
+            for _, line in _complete_lines(journal, 0):
+                entry = _decode(line)
+                if entry is not None and "lesson_id" in entry:
+                    statuses[entry["lesson_id"]] = entry.get("status")
+    except FileNotFoundError:
+        pass
+    return statuses
+
+
+def load_lessons(lessons_path: str) -> List[dict]:
+    """Returns every lesson of the base file, with its journaled status."""
+    if not os.path.exists(lessons_path):
+        return []
+    statuses = _read_journal(lessons_path)
+    lessons = []
+    with open(lessons_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            lesson = json.loads(line)
+            if lesson.get("lesson_id") in statuses:
+                lesson["status"] = statuses[lesson["lesson_id"]]
+            lessons.append(lesson)
+    return lessons
+
+
+def record_statuses(lessons_path: str, statuses: Dict[str, str]):
+    """Journals new statuses for lessons, by lesson id, and updates the pending index."""
+    if not statuses:
+        return
+    timestamp = datetime.now(timezone.utc).isoformat()
+    data = "".join(
+        json.dumps({"lesson_id": lesson_id, "status": status, "timestamp": timestamp}) + "\n"
+        for lesson_id, status in statuses.items()
+    ).encode("utf-8")
+    with exclusive_lock(lock_path(lessons_path)):
+        append_record(journal_path(lessons_path), data)
+        load_pending_index(lessons_path)
+
+
+def _replace_lessons(lessons_path, lessons):
+    """Writes the base file atomically, drops the journal and rebuilds the index. Call under the lock."""
+    temp_file = lessons_path + ".tmp"
+    with open(temp_file, "w") as f:
+        for lesson in lessons:
+            f.write(json.dumps(lesson) + "\n")
+    os.replace(temp_file, lessons_path)
+    if os.path.exists(journal_path(lessons_path)):
+        os.remove(journal_path(lessons_path))
+    index, _ = _build_index(lessons_path, None)
+    _write_index(lessons_path, index)
+
+
+def save_lessons(lessons_path: str, lessons: List[dict]):
+    """Replaces all lessons, statuses included, with `lessons`."""
+    with exclusive_lock(lock_path(lessons_path)):
+        _replace_lessons(lessons_path, lessons)
+
+
+def compact_lessons(lessons_path: str):
+    """Folds the journaled statuses back into the base file."""
+    with exclusive_lock(lock_path(lessons_path)):
+        _replace_lessons(lessons_path, load_lessons(lessons_path))
+
+
+def compact_if_due(lessons_path: str, threshold: Optional[int] = None) -> bool:
+    """Compacts once the journal holds `threshold` entries. Returns True if it compacted."""
+    threshold = COMPACTION_THRESHOLD if threshold is None else threshold
+    if not os.path.exists(lessons_path):
+        return False
+    if load_pending_index(lessons_path)["journal"]["entries"] < threshold:
+        return False
+    compact_lessons(lessons_path)
+    return True
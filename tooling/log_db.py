@@ -0,0 +1,322 @@
+"""
+Loads the activity log into a SQLite database for indexed queries.
+
+Every analysis of `logs/activity.log.jsonl` used to decode the whole log.
+This module keeps `logs/activity.sqlite3` in step with it instead: `ingest`
+inserts only the entries appended (or rotated into segments, see
+`utils/log_segments.py`) since its previous run, and the analyses become
+indexed SQL queries.
+
+Each entry becomes a row of `entries` with typed, indexed columns:
+
+    timestamp    TEXT     UTC, ISO 8601 without offset (sorts chronologically)
+    session_id   TEXT
+    task_id      TEXT
+    plan_step    INTEGER
+    phase        TEXT
+    action_type  TEXT
+    tool_name    TEXT     `action.details.tool_name`
+    command      TEXT     `action.details.command`
+    status       TEXT     `outcome.status`
+    details      TEXT     `action.details` as JSON, for `json_extract`
+
+Ingestion is incremental like the protocol auditor's scan: the byte offset
+reached in the active file, a hash of the last line read and the last
+segment read are stored in `ingest_state`, in the same transaction as the
+rows. If the log was truncated or replaced, the table is rebuilt. Run it
+directly to update the database:
+
+    python3 -m tooling.log_db [--log-file PATH] [--db PATH]
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling.log_scan import last_complete_line
+from utils.log_segments import load_segment_index, read_segment, split_lines, utc_timestamp
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LOG_FILE = os.path.join(ROOT_DIR, "logs", "activity.log.jsonl")
+DB_FILE = os.path.join(ROOT_DIR, "logs", "activity.sqlite3")
+DB_SCHEMA_VERSION = 1
+INSERT_BATCH = 10000
+
+COLUMNS = (
+    "timestamp", "session_id", "task_id", "plan_step", "phase",
+    "action_type", "tool_name", "command", "status", "details",
+)
+INDEXED_COLUMNS = ("timestamp", "session_id", "task_id", "phase", "action_type", "tool_name", "status")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT,
+    session_id TEXT,
+    task_id TEXT,
+    plan_step INTEGER,
+    phase TEXT,
+    action_type TEXT,
+    tool_name TEXT,
+    command TEXT,
+    status TEXT,
+    details TEXT
+);
+CREATE TABLE IF NOT EXISTS ingest_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    state TEXT NOT NULL
+);
+""" + "".join(
+    f"CREATE INDEX IF NOT EXISTS entries_{column} ON entries ({column});\n" for column in INDEXED_COLUMNS
+)
+
+
+def connect(db_path=DB_FILE):
+    """Opens the database, creating (or, after a schema change, recreating) its tables."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != DB_SCHEMA_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS ingest_state;")
+        conn.execute(f"PRAGMA user_version = {DB_SCHEMA_VERSION}")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# --- Ingestion ---
+
+
+def _text(value):
+    return value if isinstance(value, str) else None
+
+
+def entry_row(entry):
+    """Returns the column values of a log entry, or None if it is not an object."""
+    if not isinstance(entry, dict):
+        return None
+    task = entry.get("task") if isinstance(entry.get("task"), dict) else {}
+    action = entry.get("action") if isinstance(entry.get("action"), dict) else {}
+    details = action.get("details") if isinstance(action.get("details"), dict) else {}
+    outcome = entry.get("outcome") if isinstance(entry.get("outcome"), dict) else {}
+    plan_step = task.get("plan_step")
+    return (
+        utc_timestamp(entry.get("timestamp")),
+        _text(entry.get("session_id")),
+        _text(task.get("id")),
+        plan_step if isinstance(plan_step, int) and not isinstance(plan_step, bool) else None,
+        _text(entry.get("phase")),
+        _text(action.get("type")),
+        _text(details.get("tool_name")),
+        _text(details.get("command")),
+        _text(outcome.get("status")),
+        json.dumps(details, sort_keys=True),
+    )
+
+
+def _rows(lines):
+    """Yields the rows of the entries in some lines, including several entries on one line."""
+    decoder = json.JSONDecoder()
+    for line in lines:
+        text = line.decode("utf-8", "replace")
+        pos = 0
+        while pos < len(text):
+            while pos < len(text) and text[pos].isspace():
+                pos += 1
+            if pos == len(text):
+                break
+            try:
+                entry, pos = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                break  # The rest of the line is not JSON.
+            row = entry_row(entry)
+            if row is not None:
+                yield row
+
+
+def _empty_state():
+    return {"device": None, "inode": None, "offset": 0, "last_line_start": 0, "last_line_sha256": None,
+            "segment_sequence": 0}
+
+
+def _load_state(conn):
+    row = conn.execute("SELECT state FROM ingest_state WHERE id = 1").fetchone()
+    return json.loads(row[0]) if row else _empty_state()
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _plan_reads(log_path, state):
+    """
+    Returns `(reads, state, rebuild)`: the line batches to ingest, as
+    ("segment", segment, start) and ("active", start, end) reads, the state
+    after them, and whether the table must be emptied first because the
+    saved state does not continue in the current log.
+    """
+    state = dict(state)
+    reads = []
+    segments = [s for s in load_segment_index(log_path)["segments"] if s["sequence"] > state["segment_sequence"]]
+    start = 0
+    if segments and state["offset"]:
+        first = segments[0]
+        data = read_segment(log_path, first)
+        if ((first["source"]["device"], first["source"]["inode"]) != (state["device"], state["inode"])
+                or _sha256(data[state["last_line_start"]:state["offset"]]) != state["last_line_sha256"]):
+            reads, state, _ = _plan_reads(log_path, _empty_state())
+            return reads, state, True
+        start = state["offset"]
+    for segment in segments:
+        reads.append(("segment", segment, start))
+        start = 0
+    if segments:
+        state.update(_empty_state(), segment_sequence=segments[-1]["sequence"])
+
+    try:
+        with open(log_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if state["offset"]:
+                f.seek(state["last_line_start"])
+                if ((st.st_dev, st.st_ino) != (state["device"], state["inode"]) or st.st_size < state["offset"]
+                        or _sha256(f.read(state["offset"] - state["last_line_start"])) != state["last_line_sha256"]):
+                    reads, state, _ = _plan_reads(log_path, _empty_state())
+                    return reads, state, True
+            last_line = last_complete_line(log_path, state["offset"])
+            if last_line:
+                line_start, end = last_line
+                reads.append(("active", state["offset"], end))
+                f.seek(line_start)
+                state.update(last_line_start=line_start, last_line_sha256=_sha256(f.read(end - line_start)),
+                             offset=end)
+            state.update(device=st.st_dev, inode=st.st_ino)
+    except FileNotFoundError:
+        pass
+    return reads, state, False
+
+
+def _read_lines(log_path, read):
+    if read[0] == "segment":
+        return split_lines(read_segment(log_path, read[1])[read[2]:])
+    with open(log_path, "rb") as f:
+        f.seek(read[1])
+        return split_lines(f.read(read[2] - read[1]))
+
+
+def ingest(log_path=LOG_FILE, db_path=DB_FILE):
+    """
+    Inserts the entries added to the log since the previous ingestion and
+    returns how many were inserted. A trailing line without a newline is
+    left for the next run.
+    """
+    with contextlib.closing(connect(db_path)) as conn:
+        with conn:
+            reads, state, rebuild = _plan_reads(log_path, _load_state(conn))
+            if rebuild:
+                print("Activity log does not continue the ingested one; rebuilding the database.", file=sys.stderr)
+                conn.execute("DELETE FROM entries")
+            inserted = 0
+            insert = f"INSERT INTO entries ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+            for read in reads:
+                rows = list(_rows(_read_lines(log_path, read)))
+                for start in range(0, len(rows), INSERT_BATCH):
+                    conn.executemany(insert, rows[start:start + INSERT_BATCH])
+                inserted += len(rows)
+            conn.execute("INSERT OR REPLACE INTO ingest_state (id, state) VALUES (1, ?)", (json.dumps(state),))
+    return inserted
+
+
+# --- Queries ---
+
+
+def where_clause(filters=None, since=None, until=None):
+    """
+    Returns an SQL `WHERE` clause and its parameters for equality filters on
+    `COLUMNS` and an optional, inclusive time window.
+    """
+    conditions, params = [], []
+    for column, value in (filters or {}).items():
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column '{column}'; expected one of {', '.join(COLUMNS)}.")
+        conditions.append(f"{column} = ?")
+        params.append(value)
+    if since:
+        conditions.append("timestamp >= ?")
+        params.append(utc_timestamp(since))
+    if until:
+        conditions.append("timestamp <= ?")
+        params.append(utc_timestamp(until))
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def _and(where, condition):
+    return f"{where} AND ({condition})" if where else f" WHERE ({condition})"
+
+
+def count_by(conn, group_by, filters=None, since=None, until=None):
+    """Returns `(group values..., count)` rows, most frequent first."""
+    for column in group_by:
+        if column not in COLUMNS:
+            raise ValueError(f"Unknown column '{column}'; expected one of {', '.join(COLUMNS)}.")
+    where, params = where_clause(filters, since, until)
+    columns = ", ".join(group_by)
+    return conn.execute(
+        f"SELECT {columns}, COUNT(*) FROM entries{where} GROUP BY {columns} ORDER BY COUNT(*) DESC, {columns}",
+        params,
+    ).fetchall()
+
+
+def select_entries(conn, filters=None, since=None, until=None, limit=None):
+    """Returns the matching entries as rows of `COLUMNS`, in log order."""
+    where, params = where_clause(filters, since, until)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM entries{where} ORDER BY id"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def tool_usage(conn, since=None, until=None):
+    """Returns a Counter of the tools of 'TOOL_EXEC' entries."""
+    where, params = where_clause({"action_type": "TOOL_EXEC"}, since, until)
+    where = _and(where, "tool_name IS NOT NULL AND tool_name != ''")
+    return Counter(dict(conn.execute(f"SELECT tool_name, COUNT(*) FROM entries{where} GROUP BY tool_name", params)))
+
+
+def plan_updates(conn, plan_tools=("set_plan",), since=None, until=None):
+    """Returns the number of plan updates ('PLAN_UPDATE' entries or `plan_tools` uses) per task."""
+    where, params = where_clause(None, since, until)
+    placeholders = ", ".join("?" * len(plan_tools))
+    where = _and(where, f"action_type = 'PLAN_UPDATE' OR tool_name IN ({placeholders})")
+    where = _and(where, "task_id IS NOT NULL AND task_id != ''")
+    return Counter(dict(conn.execute(
+        f"SELECT task_id, COUNT(*) FROM entries{where} GROUP BY task_id", params + list(plan_tools)
+    )))
+
+
+def reset_all_tasks(conn, since=None, until=None):
+    """Returns the tasks that used `reset_all`, as a failure or as a tool execution."""
+    where, params = where_clause(None, since, until)
+    where = _and(
+        where,
+        "(action_type = 'SYSTEM_FAILURE' AND tool_name = 'reset_all')"
+        " OR (action_type = 'TOOL_EXEC' AND instr(command, 'reset_all') > 0)",
+    )
+    where = _and(where, "task_id IS NOT NULL AND task_id != ''")
+    return {task for (task,) in conn.execute(f"SELECT DISTINCT task_id FROM entries{where}", params)}
+
+
+def main():
+    """Updates the database from the activity log."""
+    parser = argparse.ArgumentParser(description="Loads the activity log into a SQLite database.")
+    parser.add_argument("--log-file", default=LOG_FILE, help=f"Path to the log file. Defaults to {LOG_FILE}")
+    parser.add_argument("--db", default=DB_FILE, help=f"Path to the database. Defaults to {DB_FILE}")
+    args = parser.parse_args()
+    print(f"Ingested {ingest(args.log_file, args.db)} new log entries into {args.db}.")
+
+
+if __name__ == "__main__":
+    main()
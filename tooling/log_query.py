@@ -0,0 +1,99 @@
+"""
+Queries the activity log through its SQLite index.
+
+The database (see `log_db.py`) is brought up to date with the log first,
+which only reads the entries appended since the previous run; the query is
+then answered from indexed columns. Examples:
+
+    # Tool executions per tool in a session.
+    python3 -m tooling.log_query --session 3f0c... --action-type TOOL_EXEC --group-by tool_name
+
+    # Failures per task and phase since a given time.
+    python3 -m tooling.log_query --status FAILURE --since 2025-10-06T00:00:00Z --group-by task_id,phase
+
+    # The last entries of a task, as JSON lines.
+    python3 -m tooling.log_query --task improve-logging-01 --limit 20 --format json
+
+    # The self-improvement analyses, as indexed queries.
+    python3 -m tooling.log_query --report planning-efficiency
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling import log_db
+
+# Options that filter on a column, by option name.
+FILTER_OPTIONS = {
+    "session": "session_id",
+    "task": "task_id",
+    "phase": "phase",
+    "action_type": "action_type",
+    "tool": "tool_name",
+    "status": "status",
+}
+REPORTS = ("tool-usage", "planning-efficiency", "protocol-violations")
+
+
+def _print_rows(header, rows, output_format):
+    if output_format == "json":
+        for row in rows:
+            print(json.dumps(dict(zip(header, row))))
+        return
+    table = [[str(value) if value is not None else "-" for value in row] for row in rows]
+    widths = [max([len(name)] + [len(row[i]) for row in table]) for i, name in enumerate(header)]
+    print("  ".join(name.ljust(width) for name, width in zip(header, widths)))
+    for row in table:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def run_report(conn, report, since=None, until=None):
+    """Returns the header and rows of one of the `REPORTS`."""
+    if report == "tool-usage":
+        return ("tool_name", "count"), log_db.tool_usage(conn, since, until).most_common()
+    if report == "planning-efficiency":
+        updates = log_db.plan_updates(conn, since=since, until=until)
+        return ("task_id", "plan_updates"), [(task, n) for task, n in updates.most_common() if n > 1]
+    return ("task_id",), [(task,) for task in sorted(log_db.reset_all_tasks(conn, since, until))]
+
+
+def main(argv=None):
+    """Parses arguments, updates the database and prints the query results."""
+    parser = argparse.ArgumentParser(description="Queries the activity log through its SQLite index.")
+    parser.add_argument("--log-file", default=log_db.LOG_FILE, help="Path to the log file.")
+    parser.add_argument("--db", default=log_db.DB_FILE, help="Path to the database.")
+    parser.add_argument("--no-ingest", action="store_true", help="Query the database without updating it first.")
+    for option, column in FILTER_OPTIONS.items():
+        parser.add_argument(f"--{option.replace('_', '-')}", dest=option, help=f"Only entries with this {column}.")
+    parser.add_argument("--since", help="Only entries at or after this ISO 8601 timestamp.")
+    parser.add_argument("--until", help="Only entries at or before this ISO 8601 timestamp.")
+    parser.add_argument("--group-by", help=f"Comma-separated columns to count entries by: {', '.join(log_db.COLUMNS)}.")
+    parser.add_argument("--report", choices=REPORTS, help="Run one of the log analyses instead of a query.")
+    parser.add_argument("--limit", type=int, help="Maximum number of entries to list.")
+    parser.add_argument("--format", choices=("table", "json"), default="table", help="Output format.")
+    args = parser.parse_args(argv)
+
+    if not args.no_ingest:
+        log_db.ingest(args.log_file, args.db)
+    filters = {column: getattr(args, option) for option, column in FILTER_OPTIONS.items() if getattr(args, option)}
+    with contextlib.closing(log_db.connect(args.db)) as conn:
+        try:
+            if args.report:
+                header, rows = run_report(conn, args.report, args.since, args.until)
+            elif args.group_by:
+                group_by = [column.strip() for column in args.group_by.split(",") if column.strip()]
+                header = tuple(group_by) + ("count",)
+                rows = log_db.count_by(conn, group_by, filters, args.since, args.until)
+            else:
+                header = log_db.COLUMNS
+                rows = log_db.select_entries(conn, filters, args.since, args.until, args.limit)
+        except ValueError as e:
+            parser.error(str(e))
+    _print_rows(header, rows, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Scans large JSONL activity logs in parallel.
+
+`logs/activity.log.jsonl` grows without bound, and several tools (the
+protocol auditor, the self-improvement CLI) fold the whole file into a
+small aggregate. `scan_log` does this for any `LogScanner`:
+
+1. The file is memory-mapped and the requested byte range is split into
+   shards whose boundaries are moved forward to the next newline, so that
+   every line belongs to exactly one shard.
+2. Each shard is handed to a worker process, which maps the file itself,
+   splits its shard into lines and calls `LogScanner.scan_lines`.
+3. The partial results are passed, in file order, to `LogScanner.merge`.
+
+Because shards cover the range in order and merging sees them in order, a
+scanner whose `merge` is correct returns exactly what a sequential scan of
+the same lines would. Small ranges are scanned in-process as one shard.
+
+A log rotated by the `Logger` also has compressed segments (see
+`utils/log_segments.py`). `scan_log_segments` scans the segments that
+overlap a time window, each in its own worker, followed by the active file,
+and merges all of their results.
+"""
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, List, Optional, Tuple
+
+from utils.log_segments import (
+    filter_lines,
+    load_segment_index,
+    read_segment,
+    segments_overlapping,
+    split_lines,
+)
+
+# Ranges smaller than this are scanned in-process: starting workers costs more.
+PARALLEL_SCAN_THRESHOLD = 8 * 1024 * 1024
+# Upper bound on a shard, which a worker copies out of the mapping at once.
+MAX_SHARD_SIZE = 32 * 1024 * 1024
+
+
+class LogScanner:
+    """
+    An aggregation over the lines of a log. Subclasses must be picklable
+    (defined at module level) so that they can be sent to worker processes.
+    """
+
+    def scan_lines(self, lines: Iterable[bytes]) -> Any:
+        """Returns the partial result of a run of lines (bytes, without their newlines)."""
+        raise NotImplementedError
+
+    def merge(self, partials: List[Any]) -> Any:
+        """
+        Combines partial results, given in file order, into the final result.
+        A merged result must itself be usable as a partial result.
+        """
+        raise NotImplementedError
+
+
+def _map(f) -> Optional[mmap.mmap]:
+    if os.fstat(f.fileno()).st_size == 0:
+        return None  # An empty file cannot be mapped.
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def last_complete_line(log_path: str, start: int = 0) -> Optional[Tuple[int, int]]:
+    """
+    Returns `(line_start, end)` for the last newline-terminated line of a log
+    that ends after `start`, or None if no line is complete after `start`.
+    Bytes after `end` belong to a line that is still being written.
+    """
+    with open(log_path, "rb") as f:
+        mm = _map(f)
+        if mm is None:
+            return None
+        with mm:
+            end = mm.rfind(b"\n", start) + 1
+            if end <= start:
+                return None
+            return mm.rfind(b"\n", 0, end - 1) + 1, end
+
+
+def shard_ranges(mm, start: int, end: int, shards: int) -> List[Tuple[int, int]]:
+    """Splits `[start, end)` into up to `shards` newline-aligned ranges."""
+    ranges = []
+    step = max(1, (end - start) // max(1, shards))
+    position = start
+    while position < end:
+        boundary = min(end, position + step)
+        if boundary < end:
+            newline = mm.find(b"\n", boundary - 1, end)
+            boundary = end if newline == -1 else newline + 1
+        ranges.append((position, boundary))
+        position = boundary
+    return ranges
+
+
+def _scan_shard(log_path: str, start: int, end: int, scanner: LogScanner):
+    with open(log_path, "rb") as f:
+        with _map(f) as mm:
+            return scanner.scan_lines(split_lines(mm[start:end]))
+
+
+def _scan_shard_args(args):
+    return _scan_shard(*args)
+
+
+def scan_log(log_path: str, scanner: LogScanner, start: int = 0, end: Optional[int] = None,
+             max_workers: Optional[int] = None) -> Any:
+    """
+    Runs `scanner` over the lines in bytes `[start, end)` of a log (to the end
+    of the file by default) and returns the merged result. `max_workers`
+    defaults to the number of CPUs; 1 scans sequentially in-process.
+    Raises FileNotFoundError if the log does not exist.
+    """
+    with open(log_path, "rb") as f:
+        mm = _map(f)
+        if mm is None:
+            return scanner.merge([scanner.scan_lines([])])
+        with mm:
+            end = len(mm) if end is None else min(end, len(mm))
+            if end <= start:
+                return scanner.merge([scanner.scan_lines([])])
+            workers = max_workers or os.cpu_count() or 1
+            if workers == 1 or end - start < PARALLEL_SCAN_THRESHOLD:
+                return scanner.merge([scanner.scan_lines(split_lines(mm[start:end]))])
+            shards = max(workers, -(-(end - start) // MAX_SHARD_SIZE))
+            ranges = shard_ranges(mm, start, end, shards)
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        partials = list(executor.map(_scan_shard_args, [(log_path, a, b, scanner) for a, b in ranges]))
+    return scanner.merge(partials)
+
+
+def scan_segment(log_path: str, segment: dict, scanner: LogScanner, start: int = 0,
+                 since: Optional[str] = None, until: Optional[str] = None) -> Any:
+    """
+    Returns the partial result of a compressed segment from byte `start` of
+    its uncompressed contents, keeping only entries between `since` and `until`.
+    """
+    return scanner.scan_lines(filter_lines(split_lines(read_segment(log_path, segment)[start:]), since, until))
+
+
+def _scan_segment_args(args):
+    return scan_segment(*args)
+
+
+def scan_log_segments(log_path: str, scanner: LogScanner, since: Optional[str] = None,
+                      until: Optional[str] = None, max_workers: Optional[int] = None) -> Any:
+    """
+    Runs `scanner` over a log and its rotated segments, oldest first, and
+    returns the merged result. Only segments overlapping `since`..`until`
+    (ISO 8601 timestamps, optional and inclusive) are decompressed, and only
+    their entries in that window are scanned. Raises FileNotFoundError if
+    the log has neither an active file nor segments.
+    """
+    segments = segments_overlapping(load_segment_index(log_path), since, until)
+    workers = max_workers or os.cpu_count() or 1
+    jobs = [(log_path, segment, scanner, 0, since, until) for segment in segments]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            partials = list(executor.map(_scan_segment_args, jobs))
+    else:
+        partials = [_scan_segment_args(job) for job in jobs]
+
+    try:
+        if since or until:
+            with open(log_path, "rb") as f:
+                partials.append(scanner.scan_lines(filter_lines(split_lines(f.read()), since, until)))
+        else:
+            partials.append(scan_log(log_path, scanner, max_workers=max_workers))
+    except FileNotFoundError:
+        if not load_segment_index(log_path)["segments"]:
+            raise
+    return scanner.merge(partials)
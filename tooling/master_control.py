@@ -44,6 +44,8 @@ from fdc_cli import MAX_RECURSION_DEPTH
 from research import execute_research_protocol
 from research_planner import plan_deep_research
 from plan_parser import parse_plan, Command
+from compiled_plan import compiled_plan_path, load_plan
+from state_codec import StateEncoder, append_snapshot
 
 PLAN_REGISTRY_PATH = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "knowledge_core", "plan_registry.json")
@@ -186,11 +188,8 @@ class MasterControlGraph:
             print(f"[MasterControl] {error_message}")
             return self.get_trigger("PLANNING", "ERROR")
 
-        print("  - Plan validation successful. Parsing plan into commands...")
-        with open(plan_file, "r") as f:
-            raw_plan_content = f.read()
-
-        parsed_commands = parse_plan(raw_plan_content)
+        print("  - Plan validation successful. Loading compiled plan...")
+        parsed_commands = load_plan(plan_file).commands
 
         agent_state.plan_stack.append(
             PlanContext(plan_path=plan_file, commands=parsed_commands)
@@ -269,9 +268,7 @@ class MasterControlGraph:
             f"  - Calling sub-plan: {sub_plan_path} (resolved from '{plan_name_or_path}')"
         )
         try:
-            with open(sub_plan_path, "r") as f:
-                raw_sub_plan_content = f.read()
-            parsed_sub_commands = parse_plan(raw_sub_plan_content)
+            parsed_sub_commands = load_plan(sub_plan_path).commands
         except FileNotFoundError:
             agent_state.error = f"Sub-plan file not found: {sub_plan_path}"
             print(f"[MasterControl] Error: {agent_state.error}")
@@ -299,6 +296,9 @@ class MasterControlGraph:
             # Clean up the root plan files now that execution is fully complete
             if agent_state.plan_path and os.path.exists(agent_state.plan_path):
                 os.remove(agent_state.plan_path)
+                compiled_path = compiled_plan_path(agent_state.plan_path)
+                if os.path.exists(compiled_path):
+                    os.remove(compiled_path)
             # Only remove the research plan if it was actually created.
             research_plan_path = "research_plan.txt"
             if os.path.exists(research_plan_path):
@@ -426,11 +426,21 @@ class MasterControlGraph:
             return self.get_trigger("FINALIZING", "finalization_failed")
 
 
-    def run(self, initial_agent_state: AgentState):
-        """Runs the agent's workflow through the FSM."""
+    def run(self, initial_agent_state: AgentState, snapshot_journal: str = None):
+        """
+        Runs the agent's workflow through the FSM.
+
+        If `snapshot_journal` is given, the full agent state is appended to it
+        after every transition (as a delta against the previous snapshot), so
+        that it can be restored with `state_codec.read_snapshot_journal`.
+        """
         agent_state = initial_agent_state
+        encoder = StateEncoder() if snapshot_journal else None
 
         while self.current_state not in self.fsm["final_states"]:
+            if encoder:
+                append_snapshot(snapshot_journal, encoder.encode(agent_state))
+
             if self.current_state == "START":
                 self.current_state = "ORIENTING"
                 continue
@@ -465,6 +475,8 @@ class MasterControlGraph:
                 agent_state.error = f"No transition found for state {self.current_state} with trigger {trigger}"
                 self.current_state = "ERROR"
 
+        if encoder:
+            append_snapshot(snapshot_journal, encoder.encode(agent_state))
         print(f"[MasterControl] Workflow finished in state: {self.current_state}")
         if agent_state.error:
             print(f"  - Error: {agent_state.error}")
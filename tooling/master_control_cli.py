@@ -30,6 +30,12 @@ def main():
         type=str,
         help="The high-level task for the agent to accomplish.",
     )
+    parser.add_argument(
+        "--snapshot-journal",
+        type=str,
+        default=None,
+        help="Append a full-fidelity snapshot of the agent state to this file after every transition.",
+    )
     args = parser.parse_args()
 
     print("--- Initializing Master Control Graph ---")
@@ -39,7 +45,7 @@ def main():
 
     # 2. Initialize and run the master control graph
     graph = MasterControlGraph()
-    final_state = graph.run(initial_state)
+    final_state = graph.run(initial_state, snapshot_journal=args.snapshot_journal)
 
     # 3. Print the final report
     print("\n--- Final State ---")
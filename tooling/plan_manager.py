@@ -10,7 +10,8 @@ more reusable and the system more robust.
 
 This CLI provides three essential functions:
 - **register**: Associates a new logical name with a plan file path, adding it
-  to the central registry.
+  to the central registry, and precompiles the plan into a `.planc` artifact
+  so that validators and the orchestrator can load it without re-parsing.
 - **deregister**: Removes an existing logical name and its associated path from
   the registry.
 - **list**: Displays all current name-to-path mappings in the registry.
@@ -24,6 +25,9 @@ import json
 import os
 import sys
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling.compiled_plan import compile_plan, compiled_plan_path
+
 REGISTRY_PATH = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "knowledge_core", "plan_registry.json")
 )
@@ -71,6 +75,17 @@ def register_plan(name, path):
     registry[name] = path
     if save_registry(registry):
         print(f"Successfully registered '{name}' -> '{path}'")
+        compiled = compile_plan(path)
+        if compiled.saved:
+            print(
+                f"Precompiled {len(compiled.commands)} command(s) to '{compiled_plan_path(path)}'."
+            )
+        else:
+            print(
+                f"Warning: Could not write the compiled plan to '{compiled_plan_path(path)}'; "
+                "the plan will be parsed from source.",
+                file=sys.stderr,
+            )
 
 
 def deregister_plan(name):
@@ -5,47 +5,355 @@ This module provides the `parse_plan` function and the `Command` dataclass,
 which are central to the agent's ability to understand and execute plans.
 The parser correctly handles multi-line arguments and ignores comments,
 allowing for robust and readable plan files.
+
+The parser makes a single pass over the source buffer. Every `Command` records
+the span it was parsed from (offsets into the buffer and 1-based line numbers),
+so callers can report errors against the original file without re-splitting
+it. Argument text is held as a lazy slice over the source buffer and is only
+materialized when `Command.args_text` is first read. `parse_plan_file` memory-
+maps large plan files so that their argument text is never copied until used.
+
+Tool names are interned, so the handful of distinct tools in a plan are each
+stored once. For plans with tens of thousands of commands, `CommandTable`
+stores the parse result as parallel arrays instead of per-command objects.
 """
-from dataclasses import dataclass
-from typing import List
+import mmap
+import os
+import re
+import sys
+from array import array
+from collections.abc import Sequence
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+# Plan files larger than this are memory-mapped instead of read into memory.
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+
+# A block is a maximal run of non-empty lines; blocks are separated by one or
+# more empty lines. This is the same grouping `split("\n\n")` produces.
+_BLOCK_RE = re.compile(r"[^\n]+(?:\n[^\n]+)*")
+_BLOCK_RE_BYTES = re.compile(rb"[^\n]+(?:\n[^\n]+)*")
+# Leading whitespace sends a block to the slow path. For `str` sources this
+# must agree with `str.isspace`, which is what `str.strip` removes.
+_STR_WHITESPACE = frozenset(chr(c) for c in range(0x3000 + 1) if chr(c).isspace())
+_BYTE_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+
+# A non-blank line: its indentation, first word and the rest of the line.
+_LINE_COMMAND_RE = re.compile(r"^( *)[^\S\n]*(\S+)[^\S\n]*([^\n]*)", re.MULTILINE)
+
+PlanSource = Union[str, bytes, bytearray, mmap.mmap]
+
+
+class SourceSpan(NamedTuple):
+    """
+    The location of a parsed command within its source buffer.
+
+    Offsets index into the buffer that was parsed: byte offsets for bytes and
+    memory-mapped sources, character offsets for `str` sources. `end` is
+    exclusive. Line numbers are 1-based and inclusive.
+    """
+
+    start: int
+    end: int
+    line: int
+    end_line: int
 
 
-@dataclass
 class Command:
     """
     Represents a single, parsed command from a plan.
     This structure correctly handles multi-line arguments for tools.
+
+    A `Command` produced by the parser keeps a reference to its source buffer
+    and the offsets of its argument lines; `args_text` is decoded and cached on
+    first access. Commands can also be constructed directly from strings.
+
+    `args_ranges` is either a tuple of `(start, end)` line ranges to join, or,
+    for the common case of one contiguous run of argument lines, the single
+    offset where that run starts (it always ends at the end of the span).
     """
 
-    tool_name: str
-    args_text: str
+    __slots__ = ("tool_name", "_span", "_args_text", "_source", "_args_ranges")
+
+    def __init__(
+        self,
+        tool_name: str,
+        args_text: Optional[str] = None,
+        span: Optional[Tuple[int, int, int, int]] = None,
+        source: Optional[PlanSource] = None,
+        args_ranges: Union[int, Tuple[Tuple[int, int], ...]] = (),
+    ):
+        self.tool_name = tool_name
+        self._span = span
+        self._args_text = args_text
+        self._source = source
+        self._args_ranges = args_ranges
+
+    @property
+    def args_text(self) -> str:
+        """The command's argument text, materialized from the source on demand."""
+        if self._args_text is None:
+            ranges = self._args_ranges
+            if isinstance(ranges, int):
+                ranges = ((ranges, self._span[1]),)
+            self._args_text = _materialize(self._source, ranges)
+            self._source = None
+            self._args_ranges = ()
+        return self._args_text
+
+    @args_text.setter
+    def args_text(self, value: str):
+        self._args_text = value
+        self._source = None
+        self._args_ranges = ()
 
+    @property
+    def span(self) -> Optional[SourceSpan]:
+        """Where the command was parsed from, or `None` if built directly."""
+        return None if self._span is None else SourceSpan(*self._span)
 
-def parse_plan(plan_content: str) -> List[Command]:
+    @property
+    def line(self) -> Optional[int]:
+        """The 1-based line number of the command's tool name, if known."""
+        return None if self._span is None else self._span[2]
+
+    def __eq__(self, other):
+        if not isinstance(other, Command):
+            return NotImplemented
+        return (self.tool_name, self.args_text) == (other.tool_name, other.args_text)
+
+    def __repr__(self):
+        return f"Command(tool_name={self.tool_name!r}, args_text={self.args_text!r})"
+
+
+def _decode(chunk) -> str:
+    """Decodes a slice of the source buffer into text."""
+    if isinstance(chunk, str):
+        return chunk
+    return bytes(chunk).decode("utf-8")
+
+
+def _materialize(source, ranges) -> str:
+    """Joins the argument line ranges of a command and strips the result."""
+    if not ranges:
+        return ""
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return _decode(source[start:end]).strip()
+    return "\n".join(_decode(source[start:end]) for start, end in ranges).strip()
+
+
+def _parse_block_slow(buf, start, end, line_no, hash_char, newline):
     """
-    Parses the raw text of a plan into a list of Command objects.
-    This parser correctly handles multi-line arguments and ignores comments.
-    Commands are expected to be separated by one or more blank lines.
+    Parses a block that contains comment characters or leading whitespace.
+
+    This mirrors the original semantics exactly: a block whose first
+    non-whitespace character is `#` is skipped entirely, and any line whose
+    first non-whitespace character is `#` is dropped from the block.
+    Returns `(tool_name, args_ranges, first_line, tool_start, last_end)` or
+    `None` if the block yields no command.
     """
-    commands = []
-    # Split by double newline to handle multi-line arguments correctly
-    command_blocks = plan_content.strip().split("\n\n")
+    lines = []
+    pos = start
+    current = line_no
+    while pos <= end:
+        nl = buf.find(newline, pos, end)
+        if nl == -1:
+            nl = end
+        lines.append((pos, nl, current))
+        pos = nl + 1
+        current += 1
+
+    # Drop leading whitespace-only lines, as `block.strip()` would.
+    first = 0
+    while first < len(lines) and not buf[lines[first][0]:lines[first][1]].strip():
+        first += 1
+    if first == len(lines):
+        return None
+    tool_start, tool_end, tool_line = lines[first]
+    if buf[tool_start:tool_end].lstrip().startswith(hash_char):
+        return None
 
-    for block in command_blocks:
-        block = block.strip()
-        if not block or block.startswith("#"):
+    ranges = []
+    last_end = tool_end
+    for line_start, line_end, _ in lines[first + 1:]:
+        if buf[line_start:line_end].lstrip().startswith(hash_char):
             continue
+        if ranges and ranges[-1][1] + 1 == line_start:
+            ranges[-1] = (ranges[-1][0], line_end)
+        else:
+            ranges.append((line_start, line_end))
+        last_end = line_end
 
-        lines = block.split("\n")
-        # Filter out comment lines within a block
-        non_comment_lines = [line for line in lines if not line.strip().startswith("#")]
+    tool_name = _decode(buf[tool_start:tool_end]).strip()
+    return tool_name, tuple(ranges), tool_line, tool_start, last_end
 
-        if not non_comment_lines:
+
+def _scan_buffer(buf):
+    """
+    Single-pass block scanner shared by the `str` and bytes-like entry points.
+
+    Yields `(tool_name, start, end, line, end_line, args_ranges)` for every
+    command in the buffer, with tool names interned.
+    """
+    if isinstance(buf, str):
+        block_re, hash_char, newline = _BLOCK_RE, "#", "\n"
+        whitespace = _STR_WHITESPACE
+        decode = str
+    else:
+        block_re, hash_char, newline = _BLOCK_RE_BYTES, b"#", b"\n"
+        whitespace = _BYTE_WHITESPACE
+        decode = _decode
+    find = buf.find
+    intern = sys.intern
+    # `mmap` has no `count`; counting a transient slice keeps the result exact.
+    count = getattr(buf, "count", None) or (lambda sub, s, e: buf[s:e].count(sub))
+
+    line_no = 1
+    line_pos = 0
+    for match in block_re.finditer(buf):
+        start, end = match.span()
+        line_no += count(newline, line_pos, start)
+        line_pos = start
+
+        if find(hash_char, start, end) == -1 and buf[start] not in whitespace:
+            # Fast path: no comments and no leading whitespace to strip.
+            nl = find(newline, start, end)
+            if nl == -1:
+                yield intern(decode(buf[start:end]).strip()), start, end, line_no, line_no, ()
+            else:
+                end_line = line_no + count(newline, start, end)
+                yield intern(decode(buf[start:nl]).strip()), start, end, line_no, end_line, nl + 1
             continue
 
-        tool_name = non_comment_lines[0].strip()
-        args_text = "\n".join(non_comment_lines[1:]).strip()
+        parsed = _parse_block_slow(buf, start, end, line_no, hash_char, newline)
+        if parsed is None:
+            continue
+        tool_name, ranges, first_line, tool_start, last_end = parsed
+        end_line = first_line + count(newline, tool_start, last_end)
+        yield intern(tool_name), tool_start, last_end, first_line, end_line, ranges
+
+
+class CommandTable(Sequence):
+    """
+    A compact, array-backed sequence of the commands in one plan.
+
+    Instead of one object per command, the table stores parallel arrays: a
+    tool id per command (indexing the interned `tool_names` list), four span
+    fields per command, and the argument line ranges of every command
+    (`range_index[i]:range_index[i + 1]` selects the ranges of command `i`).
+    Indexing the table builds a `Command` on demand, so it can be used
+    wherever a list of commands is expected. Those `Command` objects are
+    views: modifying one does not modify the table.
+    """
+
+    __slots__ = ("tool_names", "tool_ids", "spans", "range_index", "ranges", "source")
+
+    def __init__(self, source, tool_names, tool_ids, spans, range_index, ranges):
+        self.source = source
+        self.tool_names = tool_names
+        self.tool_ids = tool_ids
+        self.spans = spans
+        self.range_index = range_index
+        self.ranges = ranges
+
+    @classmethod
+    def from_source(cls, plan_content: PlanSource) -> "CommandTable":
+        """Parses a plan buffer straight into a table, without per-command objects."""
+        tool_table: Dict[str, int] = {}
+        tool_ids = array("I")
+        spans = array("Q")
+        range_index = array("I", [0])
+        ranges = array("Q")
+        for tool_name, start, end, line, end_line, args in _scan_buffer(plan_content):
+            tool_ids.append(tool_table.setdefault(tool_name, len(tool_table)))
+            spans.extend((start, end, line, end_line))
+            if isinstance(args, int):
+                ranges.extend((args, end))
+            else:
+                for range_start, range_end in args:
+                    ranges.extend((range_start, range_end))
+            range_index.append(len(ranges) // 2)
+        return cls(plan_content, list(tool_table), tool_ids, spans, range_index, ranges)
+
+    def __len__(self):
+        return len(self.tool_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self.tool_ids):
+            raise IndexError("command index out of range")
+        spans, ranges = self.spans, self.ranges
+        base = 4 * index
+        span = (spans[base], spans[base + 1], spans[base + 2], spans[base + 3])
+        first, last = self.range_index[index], self.range_index[index + 1]
+        if last - first == 1 and ranges[2 * first + 1] == span[1]:
+            args = ranges[2 * first]
+        else:
+            args = tuple((ranges[2 * j], ranges[2 * j + 1]) for j in range(first, last))
+        return Command(self.tool_names[self.tool_ids[index]], None, span, self.source, args)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
 
-        commands.append(Command(tool_name=tool_name, args_text=args_text))
+    def __repr__(self):
+        return f"CommandTable({len(self)} commands, {len(self.tool_names)} tools)"
 
-    return commands
\ No newline at end of file
+
+def parse_plan(plan_content: PlanSource) -> List[Command]:
+    """
+    Parses the raw text of a plan into a list of Command objects.
+    This parser correctly handles multi-line arguments and ignores comments.
+    Commands are expected to be separated by one or more blank lines.
+
+    `plan_content` may be a `str` or any bytes-like buffer that supports
+    `find`/`count` (e.g. `bytes` or an `mmap`). Argument text is not copied
+    out of the buffer until it is accessed. For very large plans, use
+    `CommandTable.from_source` for a compact array-backed result instead.
+    """
+    return [
+        Command(tool_name, None, (start, end, line, end_line), plan_content, args)
+        for tool_name, start, end, line, end_line, args in _scan_buffer(plan_content)
+    ]
+
+
+def parse_plan_file(plan_path: str) -> List[Command]:
+    """
+    Parses a plan file, memory-mapping it if it is larger than
+    `MMAP_THRESHOLD_BYTES`. The returned commands keep the mapping alive for
+    as long as any of them still has unmaterialized argument text.
+    """
+    size = os.path.getsize(plan_path)
+    if size < MMAP_THRESHOLD_BYTES:
+        with open(plan_path, "r") as f:
+            return parse_plan(f.read())
+    with open(plan_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return parse_plan(mapped)
+
+
+def plan_line_commands(plan_content: str) -> List[Tuple[int, Command]]:
+    """
+    Returns one `Command` per non-blank line of a plan, with its indentation
+    (in spaces), in a single pass. This is the line-oriented view used by
+    `fdc_cli`'s indentation-aware validator: a line's first word is the tool
+    name, the rest of the line is its (lazy) argument text, and its span
+    gives the line number errors are reported against.
+    """
+    commands = []
+    intern = sys.intern
+    line_no = 1
+    line_pos = 0
+    for match in _LINE_COMMAND_RE.finditer(plan_content):
+        start = match.start()
+        line_no += plan_content.count("\n", line_pos, start)
+        line_pos = start
+        args_start = match.start(3)
+        span = (match.start(2), match.end(), line_no, line_no)
+        args = args_start if args_start < match.end() else ()
+        commands.append((len(match.group(1)), Command(intern(match.group(2)), None, span, plan_content, args)))
+    return commands
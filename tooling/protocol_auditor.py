@@ -8,29 +8,87 @@ The final output is a detailed `audit_report.md` file.
 
 The auditor performs three main checks:
 1.  **`AGENTS.md` Source Check:** Verifies if the `AGENTS.md` build artifact is
-    potentially stale by comparing its modification time against the source
-    protocol files in the `protocols/` directory.
+    stale by comparing the source hashes the compiler recorded in
+    `AGENTS.index.json` with the current source files, rehashing only files
+    whose stat changed. Without an index, it compares modification times
+    against the source protocol files in the `protocols/` directory.
 2.  **Protocol Completeness:** It cross-references the tools used in the log
-    (`logs/activity.log.jsonl`) against the tools defined in `AGENTS.md` to find:
+    (`logs/activity.log.jsonl`) against the tools defined in `AGENTS.md` (read
+    from the compiler's `AGENTS.index.json` protocol index when present) to find:
     - Tools used but not associated with any formal protocol.
     - Tools defined in protocols but never used in the log.
 3.  **Tool Centrality:** It conducts a frequency analysis of tool usage to
     identify which tools are most critical to the agent's workflow.
+4.  **Usage Trends:** It shows tool usage per day, per hour, per session and
+    per task, from windowed aggregates kept up to date incrementally.
 
 The script parses all embedded JSON protocol blocks within `AGENTS.md` and reads
 from the standard `logs/activity.log.jsonl` log file, providing a reliable and
-accurate audit.
+accurate audit. The log only grows, so the auditor keeps its running tool
+counts, including the windowed aggregates, in
+`logs/protocol_auditor.state.json` and decodes only the entries appended
+since its previous run. When the logger rotates the log into compressed
+segments, the auditor reads only the segments rotated out since its previous
+run, continuing the one it was reading from where it stopped.
 """
+import hashlib
 import json
 import os
 import sys
 from collections import Counter
 import re
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling.log_scan import LogScanner, last_complete_line, scan_log, scan_segment
+from tooling.protocol_index import load_protocol_index, protocol_index_path, protocol_tools, stale_sources
+from tooling.usage_analytics import add_tool_use, merge_usage, new_usage, prune_usage, render_usage_trends
+from utils.log_segments import load_segment_index, read_segment
+
 # --- Configuration ---
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 LOG_FILE = os.path.join(ROOT_DIR, "logs", "activity.log.jsonl")
 AGENTS_FILE = os.path.join(ROOT_DIR, "AGENTS.md")
+PROTOCOL_INDEX_FILE = protocol_index_path(AGENTS_FILE)
+AUDIT_STATE_FILE = os.path.join(ROOT_DIR, "logs", "protocol_auditor.state.json")
+AUDIT_STATE_VERSION = 3
+SOURCE_CHECK_CACHE_FILE = os.path.join(ROOT_DIR, "logs", "protocol_auditor.sources.json")
+
+
+def _tool_execs_in_line(line, decoder):
+    """
+    Yields `(tool_name, log_entry)` for the 'TOOL_EXEC' entries in one log line.
+    This is robust against malformed lines with multiple JSON objects.
+    """
+    pos = 0
+    while pos < len(line):
+        try:
+            # Skip leading whitespace to find the start of the next potential object
+            while pos < len(line) and line[pos].isspace():
+                pos += 1
+            if pos == len(line):
+                break
+
+            log_entry, pos = decoder.raw_decode(line, pos)
+            action = log_entry.get("action", {})
+            if action.get("type") == "TOOL_EXEC":
+                details = action.get("details", {})
+                tool_name = details.get("tool_name")
+                if tool_name:
+                    # The modern schema provides the tool name directly.
+                    # No more parsing from a 'command' string is needed.
+                    yield tool_name, log_entry
+        except json.JSONDecodeError:
+            # If raw_decode fails, we assume the rest of the line is not valid JSON.
+            # We only print a warning if the line seemed to start with a JSON-like character.
+            if line[pos:].lstrip().startswith(('{', '[')):
+                print(f"Warning: Skipping malformed or unexpected entry in log: {line}", file=sys.stderr)
+            break  # Move to the next line
+
+
+def _tools_in_line(line, decoder):
+    """Yields the tool names of the 'TOOL_EXEC' entries in one log line."""
+    for tool_name, _ in _tool_execs_in_line(line, decoder):
+        yield tool_name
 
 
 def get_used_tools_from_log(log_path):
@@ -45,36 +103,201 @@ def get_used_tools_from_log(log_path):
     try:
         with open(log_path, "r") as f:
             for line in f:
-                line = line.strip()
-                pos = 0
-                while pos < len(line):
-                    try:
-                        # Skip leading whitespace to find the start of the next potential object
-                        while pos < len(line) and line[pos].isspace():
-                            pos += 1
-                        if pos == len(line):
-                            break
-
-                        log_entry, pos = decoder.raw_decode(line, pos)
-                        action = log_entry.get("action", {})
-                        if action.get("type") == "TOOL_EXEC":
-                            details = action.get("details", {})
-                            tool_name = details.get("tool_name")
-                            if tool_name:
-                                # The modern schema provides the tool name directly.
-                                # No more parsing from a 'command' string is needed.
-                                used_tools.append(tool_name)
-                    except json.JSONDecodeError:
-                        # If raw_decode fails, we assume the rest of the line is not valid JSON.
-                        # We only print a warning if the line seemed to start with a JSON-like character.
-                        if line[pos:].lstrip().startswith(('{', '[')):
-                            print(f"Warning: Skipping malformed or unexpected entry in log: {line}", file=sys.stderr)
-                        break  # Move to the next line
+                used_tools.extend(_tools_in_line(line.strip(), decoder))
     except FileNotFoundError:
         print(f"Error: Log file not found at {log_path}", file=sys.stderr)
     return used_tools
 
 
+class ToolUsageScanner(LogScanner):
+    """
+    Aggregates 'TOOL_EXEC' entries into all-time, windowed, per-session and
+    per-task tool counts (see `usage_analytics.py`); partial aggregates are merged.
+    """
+
+    def scan_lines(self, lines):
+        decoder = json.JSONDecoder()
+        usage = new_usage()
+        for line in lines:
+            for tool_name, log_entry in _tool_execs_in_line(line.decode("utf-8", "replace").strip(), decoder):
+                add_tool_use(usage, tool_name, log_entry)
+        return usage
+
+    def merge(self, partials):
+        usage = new_usage()
+        for partial in partials:
+            merge_usage(usage, partial)
+        return usage
+
+
+def _empty_audit_state():
+    return {
+        "version": AUDIT_STATE_VERSION,
+        "device": None,
+        "inode": None,
+        "offset": 0,
+        "last_line_start": 0,
+        "last_line_sha256": None,
+        "segment_sequence": 0,
+        "usage": new_usage(),
+    }
+
+
+def load_audit_state(state_path):
+    """Loads the persisted scan state, or an empty state if it is missing or unusable."""
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+        if state.get("version") == AUDIT_STATE_VERSION:
+            return state
+    except (OSError, ValueError, AttributeError):
+        pass
+    return _empty_audit_state()
+
+
+def _write_json_atomic(path, data, description):
+    """Writes a JSON file atomically, warning on failure."""
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w") as f:
+            json.dump(data, f, sort_keys=True)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write {description} {path}: {e}", file=sys.stderr)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def save_audit_state(state_path, state):
+    """Writes the scan state atomically. Failures only cost a full rescan next time."""
+    _write_json_atomic(state_path, state, "audit state")
+
+
+def _state_matches_log(state, f, st):
+    """
+    Checks that the log is still the file the state was built from: same
+    inode, not shorter than the saved offset, and with the same last line.
+    A mismatch means the log was truncated, rotated or rewritten.
+    """
+    if state["offset"] == 0:
+        return True
+    if (state["device"], state["inode"]) != (st.st_dev, st.st_ino) or st.st_size < state["offset"]:
+        return False
+    f.seek(state["last_line_start"])
+    last_line = f.read(state["offset"] - state["last_line_start"])
+    return hashlib.sha256(last_line).hexdigest() == state["last_line_sha256"]
+
+
+def _consume_segments(log_path, state):
+    """
+    Adds the segments rotated out of the log since the state was saved to
+    the state's aggregates. The first of them is normally the file the state
+    was reading, which is resumed at the saved offset. Returns False, leaving
+    the state unchanged, if that file is not the first new segment.
+    """
+    segments = [s for s in load_segment_index(log_path)["segments"] if s["sequence"] > state["segment_sequence"]]
+    if not segments:
+        return True
+    start = 0
+    if state["offset"]:
+        first = segments[0]
+        if (first["source"]["device"], first["source"]["inode"]) != (state["device"], state["inode"]):
+            return False
+        last_line = read_segment(log_path, first)[state["last_line_start"]:state["offset"]]
+        if hashlib.sha256(last_line).hexdigest() != state["last_line_sha256"]:
+            return False
+        start = state["offset"]
+    for segment in segments:
+        merge_usage(state["usage"], scan_segment(log_path, segment, ToolUsageScanner(), start=start))
+        start = 0
+    state.update(
+        segment_sequence=segments[-1]["sequence"],
+        device=None,
+        inode=None,
+        offset=0,
+        last_line_start=0,
+        last_line_sha256=None,
+    )
+    return True
+
+
+def _rescan_state(log_path):
+    """Returns a state rebuilt from all of the log's segments, ready to read the active file."""
+    state = _empty_audit_state()
+    _consume_segments(log_path, state)
+    return state
+
+
+def get_usage_analytics(log_path, state_path=None, max_workers=None):
+    """
+    Returns the tool usage aggregates of the log (see `usage_analytics.py`).
+
+    With a `state_path`, only the bytes appended since the previous run are
+    decoded: the byte offset reached, a hash of the last line read and the
+    running aggregates are persisted there. If the log was truncated or
+    rotated, the aggregates are rebuilt from the start of the file. A
+    trailing line without a newline is still being written and is left for
+    the next run. New bytes are scanned in parallel shards (see
+    `log_scan.py`), using up to `max_workers` processes. Segments rotated
+    out by the logger since the previous run are read first (see
+    `_consume_segments`). Without a `state_path`, all segments and the
+    whole log are scanned sequentially.
+    """
+    if state_path is None:
+        usage = new_usage()
+        segments = load_segment_index(log_path)["segments"]
+        for segment in segments:
+            merge_usage(usage, scan_segment(log_path, segment, ToolUsageScanner()))
+        try:
+            with open(log_path, "r") as f:
+                return merge_usage(usage, ToolUsageScanner().scan_lines(line.encode("utf-8") for line in f))
+        except FileNotFoundError:
+            if not segments:
+                print(f"Error: Log file not found at {log_path}", file=sys.stderr)
+            return usage
+
+    state = load_audit_state(state_path)
+    if not _consume_segments(log_path, state):
+        print("Activity log segments do not continue the previous scan; rescanning them.", file=sys.stderr)
+        state = _rescan_state(log_path)
+    try:
+        with open(log_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if not _state_matches_log(state, f, st):
+                print("Activity log was truncated or rotated; rescanning it from the start.", file=sys.stderr)
+                state = _rescan_state(log_path)
+            last_line = last_complete_line(log_path, state["offset"])
+            if last_line:
+                last_line_start, end = last_line
+                merge_usage(
+                    state["usage"],
+                    scan_log(log_path, ToolUsageScanner(), start=state["offset"], end=end, max_workers=max_workers),
+                )
+                f.seek(last_line_start)
+                state["last_line_start"] = last_line_start
+                state["last_line_sha256"] = hashlib.sha256(f.read(end - last_line_start)).hexdigest()
+                state["offset"] = end
+    except FileNotFoundError:
+        if state["segment_sequence"]:
+            # Every entry is in a segment until the logger writes again.
+            save_audit_state(state_path, dict(state, usage=prune_usage(state["usage"])))
+            return state["usage"]
+        print(f"Error: Log file not found at {log_path}", file=sys.stderr)
+        return new_usage()
+
+    state.update(device=st.st_dev, inode=st.st_ino, usage=prune_usage(state["usage"]))
+    save_audit_state(state_path, state)
+    return state["usage"]
+
+
+def get_tool_usage(log_path, state_path=None, max_workers=None):
+    """
+    Returns a Counter of the tools used in the log. With a `state_path`, the
+    log is scanned incrementally, as described in `get_usage_analytics`.
+    """
+    return Counter(get_usage_analytics(log_path, state_path, max_workers)["total"])
+
+
 def get_protocol_tools_from_agents_md(agents_md_path):
     """
     Parses AGENTS.md to get a set of all tools associated with protocols.
@@ -117,6 +340,18 @@ def get_protocol_tools_from_agents_md(agents_md_path):
         return set()
 
 
+def get_protocol_tools(agents_md_path, index_path=None):
+    """
+    Returns the set of all tools associated with protocols. The protocol
+    index written by the compiler is read if available; otherwise the JSON
+    blocks of AGENTS.md are parsed.
+    """
+    index = load_protocol_index(index_path)
+    if index is not None:
+        return protocol_tools(index)
+    return get_protocol_tools_from_agents_md(agents_md_path)
+
+
 def run_completeness_check(used_tools, protocol_tools):
     """Compares used tools with protocol-defined tools and returns the gaps."""
     used_tools_set = set(used_tools)
@@ -132,7 +367,58 @@ def run_centrality_analysis(used_tools):
     return Counter(used_tools)
 
 
+def load_source_check_cache(cache_path):
+    """Loads the source hashes recorded by earlier checks, keyed by path."""
+    try:
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+        if isinstance(cache, dict):
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
 def run_protocol_source_check():
+    """
+    Checks if AGENTS.md is out of date with respect to its source files.
+    Returns a dictionary with the check's status and relevant details.
+
+    If the compiler's protocol index is available, the check is exact: the
+    content hashes it recorded at build time are compared with the sources,
+    rehashing only files whose size or mtime changed since the build or the
+    last check (whose hashes are cached in `SOURCE_CHECK_CACHE_FILE`).
+    Otherwise, modification times are compared.
+    """
+    index = load_protocol_index(PROTOCOL_INDEX_FILE)
+    if index is None or not index["sources"]:
+        return _run_mtime_source_check()
+    if not os.path.exists(AGENTS_FILE):
+        return {"status": "error", "message": "AGENTS.md not found."}
+
+    try:
+        known = load_source_check_cache(SOURCE_CHECK_CACHE_FILE)
+        known_before = json.dumps(known, sort_keys=True)
+        stale = stale_sources(index, known)
+        if json.dumps(known, sort_keys=True) != known_before:
+            _write_json_atomic(SOURCE_CHECK_CACHE_FILE, known, "source check cache")
+    except Exception as e:
+        return {"status": "error", "message": f"Could not perform protocol source check: {e}"}
+
+    if stale:
+        changed = ", ".join(f"`{os.path.relpath(path, ROOT_DIR)}`" for path in stale)
+        return {
+            "status": "warning",
+            "message": "AGENTS.md is out of date.",
+            "details": f"Source files changed since it was compiled: {changed}."
+        }
+    return {
+        "status": "success",
+        "message": f"AGENTS.md is up-to-date with its {len(index['sources'])} source files."
+    }
+
+
+def _run_mtime_source_check():
     """
     Checks if AGENTS.md is older than its source files.
     Returns a dictionary with the check's status and relevant details.
@@ -170,7 +456,7 @@ def run_protocol_source_check():
         return {"status": "error", "message": f"Could not perform protocol source check: {e}"}
 
 
-def generate_markdown_report(source_check, unreferenced, unused, centrality):
+def generate_markdown_report(source_check, unreferenced, unused, centrality, usage=None):
     """Generates a Markdown-formatted string from the audit results."""
     report = ["# Protocol Audit Report"]
 
@@ -214,6 +500,11 @@ def generate_markdown_report(source_check, unreferenced, unused, centrality):
         for tool, count in centrality.most_common():
             report.append(f"| `{tool}` | {count} |")
 
+    # --- Usage Trends ---
+    if usage is not None:
+        report.append("\n## 4. Tool Usage Trends")
+        report.extend(render_usage_trends(usage))
+
     return "\n".join(report)
 
 
@@ -222,20 +513,22 @@ def main():
     print("--- Initializing Protocol Auditor ---", file=sys.stderr)
 
     # Get data from sources
-    used_tools_from_log = get_used_tools_from_log(LOG_FILE)
-    protocol_tools_from_agents = get_protocol_tools_from_agents_md(AGENTS_FILE)
+    usage = get_usage_analytics(LOG_FILE, AUDIT_STATE_FILE)
+    tool_usage = Counter(usage["total"])
+    protocol_tools_from_agents = get_protocol_tools(AGENTS_FILE, PROTOCOL_INDEX_FILE)
 
     # Run analyses
     source_check_result = run_protocol_source_check()
-    unreferenced_tools, unused_protocol_tools = run_completeness_check(used_tools_from_log, protocol_tools_from_agents)
-    centrality_analysis = run_centrality_analysis(used_tools_from_log)
+    unreferenced_tools, unused_protocol_tools = run_completeness_check(tool_usage, protocol_tools_from_agents)
+    centrality_analysis = run_centrality_analysis(tool_usage)
 
     # Generate report
     report_content = generate_markdown_report(
         source_check_result,
         unreferenced_tools,
         unused_protocol_tools,
-        centrality_analysis
+        centrality_analysis,
+        usage,
     )
 
     report_path = os.path.join(ROOT_DIR, "audit_report.md")
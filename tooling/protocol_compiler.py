@@ -17,18 +17,61 @@ Key Functions:
   `SYSTEM_DOCUMENTATION.md`, into the final output at specified locations.
 - **Knowledge Graph Generation:** Optionally, it can process the validated JSON
   protocols and serialize them into an RDF knowledge graph (in Turtle format),
-  creating a machine-queryable version of the agent's governing rules.
+  creating a machine-queryable version of the agent's governing rules. Triples
+  are emitted directly from the protocol dicts by `protocol_triples.py`, using
+  a mapping precompiled from `protocol.context.jsonld`, and streamed to Turtle.
+  A memory-mappable triple index (`.kgi`, see `triple_index.py`) is written
+  beside the Turtle file.
+- **Protocol Index:** Next to each output file, writes a JSON index of its
+  protocols, their rules and their associated tools (e.g. `AGENTS.index.json`,
+  see `protocol_index.py`), so that other tools need not parse the Markdown.
+  The index also records the content hash of every source file the output
+  was built from, which the auditor uses to detect a stale output exactly.
 
 This process ensures that `AGENTS.md` and other protocol documents are not edited
 manually but are instead generated from a validated, single source of truth,
 making the agent's protocols robust, verifiable, and maintainable.
+
+Builds are incremental. A build manifest (`<output-file>.manifest.json`) records,
+for every `.protocol.json` file, a hash of its content, of its companion
+markdown, of the schema, of the JSON-LD context and of its directory (the base
+of its IRIs), together with the rendered Markdown fragment and the protocol's
+triples (as N-Triples). On the next run, only protocols whose hash changed are re-validated, re-rendered and re-parsed
+into RDF; the output files are reassembled from the cached fragments. Use
+`--no-cache` to force a full rebuild.
+
+Validation uses a single validator built once from the schema. Large protocol
+sets are validated across a process pool, with errors aggregated per file.
+`--validate-only` runs just this step, without rendering or RDF work, and
+exits non-zero if any protocol is invalid; it is meant for pre-commit hooks.
+
+Several outputs can be built in one invocation with repeated `--target
+SOURCE_DIR OUTPUT_FILE [KG_FILE]` options (e.g. `AGENTS.md` and
+`SECURITY.md`). The schema and JSON-LD context are loaded once and shared by
+all targets, which are built in parallel worker processes.
+
+With `--watch`, the compiler stays resident after the first build. It
+watches the source directories, the schema and the context (see
+`file_watcher.py`) and, after each debounced burst of edits, rebuilds only
+the targets whose sources changed.
 """
 import os
+import re
+import sys
 import glob
+import hashlib
 import json
 import jsonschema
 import argparse
-from rdflib import Graph
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling.protocol_triples import ContextMapping, emit_triples, parse_ntriples, to_ntriples, write_turtle
+from tooling.triple_index import triple_index_path, write_triple_index
+from tooling.file_watcher import watch
+from tooling.protocol_index import SOURCE_PATTERNS, index_entry, protocol_index_path, write_protocol_index
 
 # --- Configuration ---
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -37,6 +80,12 @@ DEFAULT_SCHEMA_FILE = os.path.join(DEFAULT_PROTOCOLS_DIR, "protocol.schema.json"
 DEFAULT_TARGET_FILE = os.path.join(ROOT_DIR, "AGENTS.md")
 DEFAULT_KG_FILE = os.path.join(ROOT_DIR, "knowledge_core", "protocols.ttl")
 DEFAULT_AUTODOC_FILE = os.path.join(ROOT_DIR, "knowledge_core", "SYSTEM_DOCUMENTATION.md")
+CONTEXT_FILE = os.path.join(DEFAULT_PROTOCOLS_DIR, "protocol.context.jsonld")
+MANIFEST_SUFFIX = ".manifest.json"
+# Bump when the cached fragment or triple format changes.
+MANIFEST_VERSION = 3
+# Below this many files, validating in-process beats starting a process pool.
+PARALLEL_VALIDATION_THRESHOLD = 32
 
 
 DISCLAIMER_TEMPLATE = """\
@@ -64,11 +113,242 @@ def load_schema(schema_file):
         print(f"Error: Could not decode JSON from schema file at {schema_file}")
         return None
 
-def compile_protocols(source_dir, target_file, schema_file, knowledge_graph_file=None, autodoc_file=None):
+def build_validator(schema):
+    """
+    Checks the schema once and returns a reusable validator instance for it.
+    Raises `jsonschema.exceptions.SchemaError` if the schema itself is invalid.
+    """
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+def _protocol_errors(validator, protocol_data):
+    """Returns every schema violation in a protocol as a readable message."""
+    errors = sorted(validator.iter_errors(protocol_data), key=lambda e: list(e.absolute_path))
+    return [f"{'/'.join(str(p) for p in e.absolute_path) or '<root>'}: {e.message}" for e in errors]
+
+def _file_errors(validator, file_path):
+    """Loads and validates one protocol file, returning its error messages."""
+    try:
+        with open(file_path, "r") as f:
+            protocol_data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        return [f"<file>: {e}"]
+    return _protocol_errors(validator, protocol_data)
+
+# The validator of a pool worker, built once per process by the initializer.
+_worker_validator = None
+
+def _init_validation_worker(schema):
+    global _worker_validator
+    _worker_validator = build_validator(schema)
+
+def _worker_file_errors(file_path):
+    return file_path, _file_errors(_worker_validator, file_path)
+
+def validate_protocol_files(file_paths, schema, validator=None, max_workers=None):
+    """
+    Validates protocol files against the schema.
+
+    Returns a dict mapping each invalid file to its list of error messages;
+    valid files are omitted. Sets of at least `PARALLEL_VALIDATION_THRESHOLD`
+    files are validated across a process pool; smaller sets in-process.
+    """
+    file_paths = list(file_paths)
+    if len(file_paths) < PARALLEL_VALIDATION_THRESHOLD or max_workers == 1:
+        validator = validator or build_validator(schema)
+        results = ((path, _file_errors(validator, path)) for path in file_paths)
+        return {path: errors for path, errors in results if errors}
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(file_paths) // (4 * max_workers))
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_validation_worker, initargs=(schema,)
+    ) as pool:
+        results = pool.map(_worker_file_errors, file_paths, chunksize=chunksize)
+        return {path: errors for path, errors in results if errors}
+
+def validate_protocols(source_dir, schema_file, max_workers=None):
+    """
+    Validates every `.protocol.json` file in a directory without compiling.
+
+    Prints the errors of each invalid file and returns the number of
+    invalid files (or 1 if the schema cannot be loaded).
+    """
+    schema = load_schema(schema_file)
+    if not schema:
+        return 1
+    protocol_files = sorted(glob.glob(os.path.join(source_dir, "*.protocol.json")))
+    failures = validate_protocol_files(protocol_files, schema, max_workers=max_workers)
+    for file_path, errors in failures.items():
+        print(f"Error: {os.path.basename(file_path)} failed validation:")
+        for error in errors:
+            print(f"  - {error}")
+    print(f"Validated {len(protocol_files)} protocol files: {len(failures)} invalid.")
+    return len(failures)
+
+class BuildInputs:
+    """
+    The schema and JSON-LD context shared by every target of a build.
+
+    Attributes:
+        schema: The loaded protocol JSON schema.
+        schema_digest: The SHA-256 of the schema file, for build manifests.
+        context_digest: The SHA-256 of the JSON-LD context file.
+        mapping: The compiled `ContextMapping`, or None without a context file.
+
+    The validator is built on first use. It is not picklable, so it is
+    dropped when the inputs are sent to a worker process and rebuilt there.
+    """
+
+    def __init__(self, schema, schema_digest, context_digest, mapping):
+        self.schema = schema
+        self.schema_digest = schema_digest
+        self.context_digest = context_digest
+        self.mapping = mapping
+        self._validator = None
+
+    @property
+    def validator(self):
+        if self._validator is None:
+            self._validator = build_validator(self.schema)
+        return self._validator
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_validator"] = None
+        return state
+
+def load_build_inputs(schema_file):
+    """Loads the schema and the JSON-LD context once; returns None if the schema is unusable."""
+    schema = load_schema(schema_file)
+    if not schema:
+        return None
+    context_bytes = _read_bytes(CONTEXT_FILE)
+    mapping = ContextMapping(json.loads(context_bytes)["@context"]) if context_bytes else None
+    return BuildInputs(schema, _sha256(_read_bytes(schema_file)), _sha256(context_bytes), mapping)
+
+def build_manifest_path(target_file):
+    """Returns the path of the build manifest kept beside a compiled target."""
+    return target_file + MANIFEST_SUFFIX
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def _read_bytes(path):
+    """Returns a file's contents, or b"" if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return b""
+
+def _read_source(path, sources):
+    """
+    Reads a source file and records its hash and prior stat in `sources`.
+    The stat is taken first, so a concurrent edit makes the record look
+    changed rather than hiding the edit.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return b""
+    data = _read_bytes(path)
+    sources[path] = {"sha256": _sha256(data), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    return data
+
+def load_manifest(manifest_file):
+    """Loads a build manifest, returning an empty one if it is missing, stale or corrupt."""
+    empty = {"version": MANIFEST_VERSION, "protocols": {}}
+    try:
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return empty
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    manifest.setdefault("protocols", {})
+    return manifest
+
+def write_manifest(manifest_file, manifest):
+    """Writes a build manifest atomically. Failures only cost a full rebuild next time."""
+    temp_file = manifest_file + ".tmp"
+    try:
+        with open(temp_file, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_file, manifest_file)
+    except OSError as e:
+        print(f"Warning: Could not write build manifest {manifest_file}: {e}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def _base_uri(file_path):
+    """The base URI of a protocol's triples: its directory, to resolve relative IRIs."""
+    return "file://" + os.path.abspath(os.path.dirname(file_path)) + "/"
+
+def _protocol_triples(file_path, protocol_data, mapping):
+    """Emits one protocol's triples as N-Triples text, or None without a context."""
+    if mapping is None:
+        print(f"    - Warning: JSON-LD context file not found at {CONTEXT_FILE}")
+        return None
+    base_uri = _base_uri(file_path)
+    # Blank node labels are namespaced per file, so cached triples can be merged.
+    bnode_prefix = re.sub(r"\W", "_", os.path.basename(file_path).split(".")[0]) + "_"
+    return to_ntriples(emit_triples(protocol_data, mapping, base_uri, bnode_prefix=bnode_prefix))
+
+def _build_protocol_entry(file_path, protocol_bytes, matching_md, md_bytes, prefix, errors, mapping):
+    """
+    Validates and renders one protocol, returning its build manifest entry.
+
+    The entry holds the Markdown fragments to append to the target file and,
+    if a knowledge graph is requested (`mapping` is not False), the
+    protocol's triples. Entries for
+    protocols that fail validation (`errors`, as returned by
+    `validate_protocol_files`) are marked invalid and never cached.
+    """
+    base_name = os.path.basename(file_path)
+    entry = {"fragments": [], "triples": None, "index": None, "valid": False}
+    if matching_md:
+        print(f"    - Found corresponding markdown: {os.path.basename(matching_md)}")
+        entry["fragments"].append(md_bytes.decode("utf-8"))
+    else:
+        print(f"    - Warning: No corresponding markdown file found for prefix '{prefix}'.")
+
+    # --- Validate and append JSON protocol content ---
+    try:
+        if errors:
+            raise ValueError("; ".join(errors))
+        protocol_data = json.loads(protocol_bytes)
+        print(f"    - JSON validation successful.")
+
+        # --- Knowledge Graph Generation (Optional) ---
+        if mapping is not False:
+            entry["triples"] = _protocol_triples(file_path, protocol_data, mapping)
+            if entry["triples"] is not None:
+                print(f"    - Emitted {base_name} into knowledge graph.")
+
+        entry["index"] = dict(index_entry(protocol_data), protocol_id=protocol_data["protocol_id"])
+
+        # --- Markdown Generation ---
+        json_string = json.dumps(protocol_data, indent=2)
+        entry["fragments"].append(f"```json\n{json_string}\n```\n")
+        entry["valid"] = True
+    except Exception as e:
+        print(f"    - Error: Failed to process JSON for {base_name}: {e}")
+    return entry
+
+def compile_protocols(source_dir, target_file, schema_file, knowledge_graph_file=None, autodoc_file=None,
+                      manifest_file=None, use_cache=True, inputs=None):
     """
     Reads all .protocol.json and corresponding .protocol.md files from the
     source directory, validates them, and compiles them into a target markdown file.
     Optionally, it can also generate a machine-readable knowledge graph.
+
+    Protocols whose sources are unchanged since the last build (according to
+    the build manifest) are not re-validated, re-rendered or re-parsed; their
+    cached fragments and triples are reused. `inputs` are the `BuildInputs`
+    shared with other targets of the same build; they are loaded from
+    `schema_file` if not given.
     """
     output_filename = os.path.basename(target_file)
     print(f"--- Starting Protocol Compilation for {output_filename} ---")
@@ -78,14 +358,26 @@ def compile_protocols(source_dir, target_file, schema_file, knowledge_graph_file
         print(f"Target Knowledge Graph file: {knowledge_graph_file}")
 
 
-    schema = load_schema(schema_file)
-    if not schema:
+    inputs = inputs or load_build_inputs(schema_file)
+    if not inputs:
         return
 
+    manifest_file = manifest_file or build_manifest_path(target_file)
+    cached_protocols = load_manifest(manifest_file)["protocols"] if use_cache else {}
+    schema_digest = inputs.schema_digest
+    context_digest = inputs.context_digest
+    # False: no graph requested; None: requested, but there is no context.
+    mapping = inputs.mapping if knowledge_graph_file else False
+    manifest_protocols = {}
+    index_protocols = {}
+    sources = {}
+    rebuilt = 0
+
     # Find all source files of different types
-    protocol_files = sorted(glob.glob(os.path.join(source_dir, "*.protocol.json")))
-    md_files = glob.glob(os.path.join(source_dir, "*.protocol.md"))
-    autodoc_files = glob.glob(os.path.join(source_dir, "*.autodoc.md"))
+    protocol_json_pattern, protocol_md_pattern, autodoc_pattern = SOURCE_PATTERNS
+    protocol_files = sorted(glob.glob(os.path.join(source_dir, protocol_json_pattern)))
+    md_files = glob.glob(os.path.join(source_dir, protocol_md_pattern))
+    autodoc_files = glob.glob(os.path.join(source_dir, autodoc_pattern))
 
     # Combine all file types into a single list and sort them numerically
     all_files = sorted(protocol_files + autodoc_files)
@@ -95,13 +387,46 @@ def compile_protocols(source_dir, target_file, schema_file, knowledge_graph_file
         # Create an empty file with just the disclaimer
         with open(target_file, "w") as f:
             f.write(DISCLAIMER_TEMPLATE.format(source_dir_name=os.path.basename(source_dir)))
+        write_protocol_index(protocol_index_path(target_file), {}, source_dir=source_dir)
         return
 
 
     print(f"Found {len(protocol_files)} protocol, {len(md_files)} markdown, and {len(autodoc_files)} autodoc files.")
 
+    # Work out which protocols changed since the last build, then validate
+    # only those, in one batch.
+    pending = {}
+    for file_path in protocol_files:
+        base_name = os.path.basename(file_path)
+        prefix = base_name.split("_")[0]
+        matching_md = next((md for md in md_files if os.path.basename(md).startswith(prefix + "_")), None)
+        md_bytes = _read_source(matching_md, sources) if matching_md else b""
+        protocol_bytes = _read_source(file_path, sources)
+        # Cached triples hold absolute IRIs resolved against the base URI.
+        cache_key = _sha256(
+            b"\0".join(
+                [protocol_bytes, md_bytes, schema_digest.encode(), context_digest.encode(),
+                 _base_uri(file_path).encode()]
+            )
+        )
+        entry = cached_protocols.get(base_name)
+        fresh = (
+            entry
+            and entry["key"] == cache_key
+            and (not knowledge_graph_file or entry["triples"] is not None)
+        )
+        pending[file_path] = (prefix, matching_md, md_bytes, protocol_bytes, cache_key, entry if fresh else None)
+    # Record every other input of the output, for staleness checks.
+    for path in md_files + autodoc_files + [schema_file]:
+        if path not in sources:
+            _read_source(path, sources)
+    if autodoc_files and autodoc_file:
+        _read_source(autodoc_file, sources)
+    changed = [path for path, item in pending.items() if item[-1] is None]
+    validation_errors = validate_protocol_files(changed, inputs.schema, validator=inputs.validator)
+
     # Initialize RDF graph and start building content
-    g = Graph()
+    triples = []
     disclaimer = DISCLAIMER_TEMPLATE.format(source_dir_name=os.path.basename(source_dir))
     final_content = [disclaimer]
 
@@ -124,52 +449,42 @@ def compile_protocols(source_dir, target_file, schema_file, knowledge_graph_file
             continue
 
         # --- Standard .protocol.json processing ---
-        prefix = base_name.split("_")[0]
-        matching_md = next((md for md in md_files if os.path.basename(md).startswith(prefix + "_")), None)
-
-        if matching_md:
-            print(f"    - Found corresponding markdown: {os.path.basename(matching_md)}")
-            with open(matching_md, "r") as f:
-                final_content.append(f.read())
+        prefix, matching_md, md_bytes, protocol_bytes, cache_key, entry = pending[file_path]
+        if entry:
+            print("    - Unchanged; reusing cached fragment.")
         else:
-            print(f"    - Warning: No corresponding markdown file found for prefix '{prefix}'.")
-
-        # --- Validate and append JSON protocol content ---
-        try:
-            with open(file_path, "r") as f:
-                protocol_data = json.load(f)
-            jsonschema.validate(instance=protocol_data, schema=schema)
-            print(f"    - JSON validation successful.")
-
-            # --- Knowledge Graph Generation (Optional) ---
-            if knowledge_graph_file:
-                protocol_data_for_ld = protocol_data.copy()
-                # Consistently look for the context file in the main protocols directory.
-                context_path = os.path.join(DEFAULT_PROTOCOLS_DIR, "protocol.context.jsonld")
-                if os.path.exists(context_path):
-                    # The @context path in the JSON-LD data should be relative to the protocol file being processed.
-                    relative_context_path = os.path.relpath(context_path, os.path.dirname(file_path))
-                    protocol_data_for_ld["@context"] = relative_context_path
-
-                    # The base URI should be the directory containing the protocol file, to resolve relative paths.
-                    base_uri = "file://" + os.path.abspath(os.path.dirname(file_path)) + "/"
-                    g.parse(data=json.dumps(protocol_data_for_ld), format="json-ld", publicID=base_uri)
-                    print(f"    - Parsed {base_name} into knowledge graph.")
-                else:
-                    print(f"    - Warning: JSON-LD context file not found at {context_path}")
-
-
-            # --- Markdown Generation ---
-            json_string = json.dumps(protocol_data, indent=2)
-            md_json_block = f"```json\n{json_string}\n```\n"
-            final_content.append(md_json_block)
-        except Exception as e:
-            print(f"    - Error: Failed to process JSON for {base_name}: {e}")
-
+            entry = _build_protocol_entry(
+                file_path,
+                protocol_bytes,
+                matching_md,
+                md_bytes,
+                prefix,
+                validation_errors.get(file_path),
+                mapping,
+            )
+            entry["key"] = cache_key
+            rebuilt += 1
+
+        final_content.extend(entry["fragments"])
+        if entry["valid"]:
+            manifest_protocols[base_name] = entry
+            protocol_id = entry["index"]["protocol_id"]
+            if protocol_id in index_protocols:
+                print(f"    - Warning: Duplicate protocol_id '{protocol_id}'; the index keeps the first definition.")
+            else:
+                index_protocols[protocol_id] = {
+                    "file": file_path,
+                    "associated_tools": entry["index"]["associated_tools"],
+                    "rules": entry["index"]["rules"],
+                }
+            if knowledge_graph_file and entry["triples"]:
+                triples.extend(parse_ntriples(entry["triples"]))
         final_content.append("\n---\n")
 
 
     # --- Finalize and Write Outputs ---
+    print(f"Rebuilt {rebuilt} of {len(protocol_files)} protocols; reused the rest from the build manifest.")
+    write_manifest(manifest_file, {"version": MANIFEST_VERSION, "protocols": manifest_protocols})
 
     # Write the final markdown content to a temporary file for atomic replacement.
     temp_target_file = target_file + ".tmp"
@@ -183,6 +498,10 @@ def compile_protocols(source_dir, target_file, schema_file, knowledge_graph_file
         print(f"\n--- {output_filename} Compilation Successful ---")
         print(f"Successfully generated new {output_filename} file.")
 
+        index_file = protocol_index_path(target_file)
+        write_protocol_index(index_file, index_protocols, sources, source_dir)
+        print(f"Successfully generated protocol index at {index_file}")
+
     except Exception as e:
         print(f"\n--- {output_filename} Compilation Failed ---")
         print(f"An error occurred during file write/rename: {e}")
@@ -192,17 +511,133 @@ def compile_protocols(source_dir, target_file, schema_file, knowledge_graph_file
 
     # Write the knowledge graph if requested
     if knowledge_graph_file:
+        temp_kg_file = knowledge_graph_file + ".tmp"
         try:
-            g.serialize(destination=knowledge_graph_file, format="turtle")
+            with open(temp_kg_file, "w") as f:
+                write_turtle(triples, f, mapping.prefixes if mapping else None)
+            os.replace(temp_kg_file, knowledge_graph_file)
+            index_file = triple_index_path(knowledge_graph_file)
+            write_triple_index(triples, index_file, source_path=knowledge_graph_file)
             print("\n--- Knowledge Graph Compilation Successful ---")
             print(f"Successfully generated knowledge graph at {knowledge_graph_file}")
+            print(f"Successfully generated triple index at {index_file}")
         except Exception as e:
             print(f"\n--- Knowledge Graph Compilation Failed ---")
             print(f"Error serializing RDF graph: {e}")
+            if os.path.exists(temp_kg_file):
+                os.remove(temp_kg_file)
 
     print("\n--- Compilation Successful ---")
     print(f"Successfully generated new AGENTS.md file.")
 
+def _compile_target_captured(target, schema_file, autodoc_file, use_cache, inputs):
+    """Builds one target in a worker process and returns its captured log."""
+    source_dir, target_file, knowledge_graph_file = target
+    out = StringIO()
+    with redirect_stdout(out):
+        compile_protocols(
+            source_dir,
+            target_file,
+            schema_file,
+            knowledge_graph_file=knowledge_graph_file,
+            autodoc_file=autodoc_file,
+            use_cache=use_cache,
+            inputs=inputs,
+        )
+    return out.getvalue()
+
+def compile_targets(targets, schema_file, autodoc_file=None, use_cache=True, max_workers=None):
+    """
+    Builds several `(source_dir, target_file, knowledge_graph_file)` targets
+    in one invocation. The schema and context are loaded once; with more
+    than one target and worker, targets are built in parallel processes and
+    each target's log is printed as a block when it finishes.
+    """
+    inputs = load_build_inputs(schema_file)
+    if not inputs:
+        return
+    if len(targets) == 1 or max_workers == 1:
+        for source_dir, target_file, knowledge_graph_file in targets:
+            compile_protocols(
+                source_dir,
+                target_file,
+                schema_file,
+                knowledge_graph_file=knowledge_graph_file,
+                autodoc_file=autodoc_file,
+                use_cache=use_cache,
+                inputs=inputs,
+            )
+        return
+
+    with ProcessPoolExecutor(max_workers=min(len(targets), max_workers or os.cpu_count() or 1)) as pool:
+        futures = [
+            pool.submit(_compile_target_captured, target, schema_file, autodoc_file, use_cache, inputs)
+            for target in targets
+        ]
+        for future in futures:
+            print(future.result())
+
+def watch_targets(targets, schema_file, autodoc_file=None, use_cache=True, debounce=0.2):
+    """
+    Builds every target, then rebuilds affected targets whenever their
+    sources change. A change to the schema or context reloads the shared
+    inputs and rebuilds every target; a change to the system documentation
+    rebuilds the targets that inject it. Runs until interrupted.
+    """
+    inputs = load_build_inputs(schema_file)
+    if not inputs:
+        return
+    shared_files = {os.path.abspath(schema_file), os.path.abspath(CONTEXT_FILE)}
+    autodoc_path = os.path.abspath(autodoc_file) if autodoc_file else None
+    source_dirs = {os.path.abspath(target[0]) for target in targets}
+
+    def build(target):
+        source_dir, target_file, knowledge_graph_file = target
+        compile_protocols(
+            source_dir,
+            target_file,
+            schema_file,
+            knowledge_graph_file=knowledge_graph_file,
+            autodoc_file=autodoc_file,
+            use_cache=use_cache,
+            inputs=inputs,
+        )
+
+    def relevant(path):
+        if path in shared_files or path == autodoc_path:
+            return True
+        return os.path.dirname(path) in source_dirs and path.endswith(
+            (".protocol.json", ".protocol.md", ".autodoc.md")
+        )
+
+    def rebuild(changed):
+        nonlocal inputs
+        shared_changed = bool(changed & shared_files)
+        if shared_changed:
+            inputs = load_build_inputs(schema_file) or inputs
+        for target in targets:
+            source_dir = os.path.abspath(target[0])
+            affected = shared_changed or any(os.path.dirname(path) == source_dir for path in changed)
+            if autodoc_path in changed and glob.glob(os.path.join(source_dir, "*.autodoc.md")):
+                affected = True
+            if affected:
+                build(target)
+
+    for target in targets:
+        build(target)
+    directories = source_dirs | {os.path.dirname(path) for path in shared_files}
+    if autodoc_path:
+        directories.add(os.path.dirname(autodoc_path))
+    watch(sorted(directories), rebuild, relevant=relevant, debounce=debounce)
+
+def _parse_target(values):
+    """Validates one `--target SOURCE_DIR OUTPUT_FILE [KG_FILE]` option."""
+    if len(values) not in (2, 3):
+        raise argparse.ArgumentTypeError(
+            f"--target takes SOURCE_DIR OUTPUT_FILE [KG_FILE], got {len(values)} values: {' '.join(values)}"
+        )
+    return values[0], values[1], values[2] if len(values) == 3 else None
+
 def main():
     """Main function to run the compiler."""
     parser = argparse.ArgumentParser(description="Compiles protocol files into a single Markdown document and optional Knowledge Graph.")
@@ -233,16 +668,84 @@ def main():
         default=DEFAULT_AUTODOC_FILE,
         help=f"Path to the system documentation file to be injected. Defaults to {DEFAULT_AUTODOC_FILE}"
     )
+    parser.add_argument(
+        "--manifest-file",
+        default=None,
+        help="Path to the incremental build manifest. Defaults to <output-file>.manifest.json"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the build manifest and rebuild every protocol."
+    )
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="Only validate the protocol files against the schema; exit non-zero on errors."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes for validation and multi-target builds. Defaults to the CPU count."
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Stay resident and rebuild affected targets whenever their sources change."
+    )
+    parser.add_argument(
+        "--target",
+        dest="targets",
+        action="append",
+        nargs="+",
+        metavar="PATH",
+        help="Build SOURCE_DIR into OUTPUT_FILE (and optionally KG_FILE). Repeat to build several targets in one run; "
+             "overrides --source-dir, --output-file and --knowledge-graph-file."
+    )
 
 
     args = parser.parse_args()
 
+    targets = []
+    if args.targets:
+        try:
+            targets = [_parse_target(values) for values in args.targets]
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+
+    if args.validate_only:
+        source_dirs = [target[0] for target in targets] or [args.source_dir]
+        failures = sum(validate_protocols(source_dir, args.schema_file, max_workers=args.jobs) for source_dir in source_dirs)
+        sys.exit(1 if failures else 0)
+
+    if args.watch:
+        watch_targets(
+            targets or [(args.source_dir, args.output_file, args.knowledge_graph_file)],
+            schema_file=args.schema_file,
+            autodoc_file=args.autodoc_file,
+            use_cache=not args.no_cache,
+        )
+        return
+
+    if targets:
+        compile_targets(
+            targets,
+            schema_file=args.schema_file,
+            autodoc_file=args.autodoc_file,
+            use_cache=not args.no_cache,
+            max_workers=args.jobs,
+        )
+        return
+
     compile_protocols(
         source_dir=args.source_dir,
         target_file=args.output_file,
         schema_file=args.schema_file,
         knowledge_graph_file=args.knowledge_graph_file,
-        autodoc_file=args.autodoc_file
+        autodoc_file=args.autodoc_file,
+        manifest_file=args.manifest_file,
+        use_cache=not args.no_cache
     )
 
 if __name__ == "__main__":
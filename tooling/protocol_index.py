@@ -0,0 +1,178 @@
+"""
+Reads and writes the protocol index, a machine-readable summary of a
+compiled protocol document.
+
+`protocol_compiler.py` writes the index next to each output file (e.g.
+`AGENTS.index.json` next to `AGENTS.md`). It maps every valid protocol to its
+source file, its rules and the tools associated with the protocol and with
+each rule:
+
+    {
+      "version": 2,
+      "protocols": {
+        "fdc-protocol-001": {
+          "file": "protocols/04_fdc-protocol.protocol.json",
+          "associated_tools": ["tooling/fdc_cli.py"],
+          "rules": {"fdc-entry-point": {"associated_tools": []}}
+        }
+      },
+      "source_dir": "protocols",
+      "sources": {
+        "protocols/04_fdc-protocol.protocol.json": {"sha256": "...", "mtime_ns": 0, "size": 0}
+      }
+    }
+
+Source file paths are relative to the directory containing the index.
+Consumers (the auditor, the protocol updater and the self-correction
+orchestrator) read this one file instead of re-parsing the JSON blocks of
+the compiled Markdown or every protocol source file.
+
+`sources` records the content hash of every file the output was built from
+(and its stat at build time). `stale_sources` uses it to decide exactly
+whether the output is out of date: files whose size and mtime are unchanged
+keep their recorded hash, and only the others are rehashed, so a checkout
+that merely touches files is not reported as a change.
+"""
+import glob
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Set
+
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 2
+SOURCE_PATTERNS = ("*.protocol.json", "*.protocol.md", "*.autodoc.md")
+
+
+def protocol_index_path(target_file: str) -> str:
+    """Returns the path of the protocol index for a compiled output file."""
+    return os.path.splitext(target_file)[0] + INDEX_SUFFIX
+
+
+def index_entry(protocol_data: dict) -> dict:
+    """Returns the index entry of one (validated) protocol, without its file."""
+    return {
+        "associated_tools": list(protocol_data.get("associated_tools", [])),
+        "rules": {
+            rule["rule_id"]: {"associated_tools": list(rule.get("associated_tools", []))}
+            for rule in protocol_data.get("rules", [])
+        },
+    }
+
+
+def file_sha256(path: str) -> str:
+    """Returns the hex SHA-256 of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def source_record(path: str, sha256: Optional[str] = None) -> dict:
+    """Returns the hash and current stat of a source file (hashing it unless `sha256` is given)."""
+    st = os.stat(path)
+    return {"sha256": sha256 or file_sha256(path), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def write_protocol_index(index_file: str, protocols: dict, sources: Optional[Dict[str, dict]] = None,
+                         source_dir: Optional[str] = None):
+    """
+    Writes an index atomically. `protocols` maps protocol ids to entries
+    from `index_entry` with an added `"file"` key holding the source path.
+    `sources` maps the paths of the files the output was built from to
+    their `source_record`; `source_dir` is the directory scanned for them.
+    """
+    base_dir = os.path.dirname(os.path.abspath(index_file))
+
+    def relative(path):
+        return os.path.relpath(os.path.abspath(path), base_dir)
+
+    index = {"version": INDEX_VERSION, "protocols": {}, "sources": {}}
+    for protocol_id, entry in protocols.items():
+        entry = dict(entry)
+        entry["file"] = relative(entry["file"])
+        index["protocols"][protocol_id] = entry
+    for path, record in (sources or {}).items():
+        index["sources"][relative(path)] = record
+    if source_dir:
+        index["source_dir"] = relative(source_dir)
+
+    temp_file = index_file + ".tmp"
+    try:
+        with open(temp_file, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_file, index_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def load_protocol_index(index_file: Optional[str]) -> Optional[dict]:
+    """
+    Loads an index, resolving its source paths against the index directory.
+    Returns None if the index is missing, unreadable or of another version,
+    so that callers can fall back to parsing the sources.
+    """
+    if not index_file:
+        return None
+    try:
+        with open(index_file, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    base_dir = os.path.dirname(os.path.abspath(index_file))
+
+    def resolve(path):
+        return os.path.normpath(os.path.join(base_dir, path))
+
+    for entry in index.get("protocols", {}).values():
+        entry["file"] = resolve(entry["file"])
+    index["sources"] = {resolve(path): record for path, record in index.get("sources", {}).items()}
+    if index.get("source_dir"):
+        index["source_dir"] = resolve(index["source_dir"])
+    return index
+
+
+def protocol_tools(index: dict) -> Set[str]:
+    """Returns every tool associated with a protocol or with one of its rules."""
+    tools = set()
+    for entry in index["protocols"].values():
+        tools.update(entry["associated_tools"])
+        for rule in entry["rules"].values():
+            tools.update(rule["associated_tools"])
+    return tools
+
+
+def stale_sources(index: dict, known: Dict[str, dict]) -> List[str]:
+    """
+    Returns the source files that differ from those the output was built
+    from: changed or deleted recorded sources, and new files in the source
+    directory. `known` maps paths to `source_record`s from earlier checks;
+    a file is rehashed only if its size or mtime differ from both the known
+    and the build-time record, and `known` is updated with the new hashes.
+    """
+    stale = []
+    for path, recorded in index["sources"].items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            stale.append(path)
+            continue
+        stat = (st.st_mtime_ns, st.st_size)
+        for record in (known.get(path), recorded):
+            if record and (record["mtime_ns"], record["size"]) == stat:
+                digest = record["sha256"]
+                break
+        else:
+            digest = file_sha256(path)
+            known[path] = {"sha256": digest, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+        if digest != recorded["sha256"]:
+            stale.append(path)
+
+    source_dir = index.get("source_dir")
+    if source_dir:
+        for pattern in SOURCE_PATTERNS:
+            for path in glob.glob(os.path.join(source_dir, pattern)):
+                if os.path.normpath(path) not in index["sources"]:
+                    stale.append(os.path.normpath(path))
+    return sorted(stale)
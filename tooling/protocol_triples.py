@@ -0,0 +1,261 @@
+"""
+Emits RDF triples for protocol definitions without a JSON-LD processor.
+
+`protocol_compiler.py` used to turn every protocol into RDF by handing it to
+rdflib's JSON-LD parser, which re-expands the whole `@context` for every
+document and dominated the cost of building `AGENTS.md`. Protocol files only
+use the flat vocabulary declared in `protocol.context.jsonld`, so this module
+compiles that context once into a `ContextMapping` (term → predicate IRI,
+`@id`/`@type` aliases, `@id`-coerced terms, prefixes) and maps protocol dicts
+straight to triples.
+
+Triples are produced as N-Triples term strings (`<iri>`, `_:label` or a
+quoted literal) and can be streamed to N-Triples or to Turtle without
+building an in-memory graph. The output is the same graph that rdflib's
+JSON-LD parser produces for these documents; `test_protocol_triples.py`
+checks this against every protocol in the repository.
+"""
+import json
+import re
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple
+from urllib.parse import urljoin
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+Triple = Tuple[str, str, str]
+
+_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_NEEDS_ESCAPE = re.compile(r'[\\"\n\r\t]')
+# Characters that may not appear unescaped in an N-Triples IRI.
+_IRI_UNSAFE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+_ABSOLUTE_IRI = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*:")
+# Local names that can be written as `prefix:local` in Turtle.
+_TURTLE_LOCAL = re.compile(r"^[A-Za-z_][A-Za-z0-9_-]*$")
+
+
+def _literal(text: str, datatype: Optional[str] = None) -> str:
+    escaped = _NEEDS_ESCAPE.sub(lambda m: _ESCAPES[m.group()], text)
+    return f'"{escaped}"^^<{datatype}>' if datatype else f'"{escaped}"'
+
+
+def _iri(iri: str) -> str:
+    return "<" + _IRI_UNSAFE.sub(lambda m: f"\\u{ord(m.group()):04X}", iri) + ">"
+
+
+class ContextMapping:
+    """
+    A JSON-LD context compiled into lookup tables for the emitter.
+
+    Attributes:
+        prefixes: Prefix → namespace IRI, for compact IRIs and Turtle output.
+        terms: Term → expanded predicate IRI.
+        id_terms: Terms whose values are IRIs (`"@type": "@id"`).
+        id_aliases: Keys that alias `@id` (e.g. `protocol_id`).
+        type_aliases: Keys that alias `@type`.
+    """
+
+    __slots__ = ("prefixes", "terms", "id_terms", "id_aliases", "type_aliases")
+
+    def __init__(self, context: Dict):
+        self.prefixes: Dict[str, str] = {}
+        self.terms: Dict[str, str] = {}
+        self.id_terms = set()
+        self.id_aliases = ["@id"]
+        self.type_aliases = ["@type"]
+
+        definitions = {}
+        for term, definition in context.items():
+            if isinstance(definition, str) and definition.endswith(("/", "#")):
+                self.prefixes[term] = definition
+            else:
+                definitions[term] = definition
+        for term, definition in definitions.items():
+            if isinstance(definition, dict):
+                if definition.get("@type") == "@id":
+                    self.id_terms.add(term)
+                definition = definition.get("@id", term)
+            if definition == "@id":
+                self.id_aliases.append(term)
+            elif definition == "@type":
+                self.type_aliases.append(term)
+            elif isinstance(definition, str):
+                self.terms[term] = self.expand(definition)
+
+    @classmethod
+    def from_file(cls, context_file: str) -> "ContextMapping":
+        """Compiles the `@context` of a JSON-LD context document."""
+        with open(context_file, "r") as f:
+            return cls(json.load(f)["@context"])
+
+    def expand(self, value: str) -> str:
+        """Expands a compact IRI (`prefix:local`); other values are returned unchanged."""
+        prefix, sep, local = value.partition(":")
+        if sep and prefix in self.prefixes and not local.startswith("//"):
+            return self.prefixes[prefix] + local
+        return value
+
+    def expand_key(self, key: str) -> Optional[str]:
+        """Expands a key that is not a defined term: a compact or absolute IRI, else `None`."""
+        expanded = self.expand(key)
+        if expanded is not key or (_ABSOLUTE_IRI.match(key) and not key.startswith("@")):
+            return expanded
+        return None
+
+    def resolve(self, value: str, base_uri: str) -> str:
+        """Expands a node reference into an absolute IRI, relative to `base_uri`."""
+        expanded = self.expand(value)
+        if expanded is not value or _ABSOLUTE_IRI.match(value):
+            return expanded
+        return urljoin(base_uri, value)
+
+
+def _value_term(value, coerce_id: bool, mapping: ContextMapping, base_uri: str) -> str:
+    """Converts a scalar JSON value into an N-Triples object term."""
+    if isinstance(value, bool):
+        return _literal("true" if value else "false", XSD + "boolean")
+    if isinstance(value, int):
+        return _literal(str(value), XSD + "integer")
+    if isinstance(value, float):
+        # The canonical xsd:double form, e.g. 1.5 -> "1.5E0".
+        mantissa, exponent = f"{value:.15E}".split("E")
+        mantissa = mantissa.rstrip("0")
+        if mantissa.endswith("."):
+            mantissa += "0"
+        return _literal(f"{mantissa}E{int(exponent)}", XSD + "double")
+    if coerce_id:
+        return _iri(mapping.resolve(value, base_uri))
+    return _literal(value)
+
+
+class _BlankNodes:
+    """Issues blank node labels that are unique within one emitter run."""
+
+    __slots__ = ("prefix", "count")
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.count = 0
+
+    def new(self) -> str:
+        self.count += 1
+        return f"_:{self.prefix}{self.count}"
+
+
+def _subject_of(node: Dict, mapping: ContextMapping, base_uri: str, bnodes: _BlankNodes) -> str:
+    """Returns the subject term of a node object: its `@id`, or a new blank node."""
+    for key in mapping.id_aliases:
+        if isinstance(node.get(key), str):
+            return _iri(mapping.resolve(node[key], base_uri))
+    return bnodes.new()
+
+
+def _emit_node(node: Dict, mapping: ContextMapping, base_uri: str, bnodes: _BlankNodes, subject: str):
+    """
+    Yields the triples of one node object. A node's own triples come first
+    and its nested nodes after, so that triples are grouped by subject.
+    """
+    children = []
+    for key, value in node.items():
+        if key in mapping.id_aliases:
+            continue
+        if key in mapping.type_aliases:
+            for type_value in value if isinstance(value, list) else [value]:
+                yield subject, _iri(RDF_TYPE), _iri(mapping.resolve(type_value, base_uri))
+            continue
+        predicate = mapping.terms.get(key) or mapping.expand_key(key)
+        if predicate is None:
+            # Terms not defined in the context are dropped, as in JSON-LD.
+            continue
+        predicate = _iri(predicate)
+        coerce_id = key in mapping.id_terms
+        for item in value if isinstance(value, list) else [value]:
+            if item is None:
+                continue
+            if isinstance(item, dict):
+                child = _subject_of(item, mapping, base_uri, bnodes)
+                yield subject, predicate, child
+                children.append((item, child))
+            else:
+                yield subject, predicate, _value_term(item, coerce_id, mapping, base_uri)
+
+    for item, child in children:
+        yield from _emit_node(item, mapping, base_uri, bnodes, subject=child)
+
+
+def emit_triples(protocol_data: Dict, mapping: ContextMapping, base_uri: str, bnode_prefix: str = "b") -> Iterator[Triple]:
+    """
+    Yields the triples of one protocol as `(subject, predicate, object)`
+    N-Triples term strings. Relative IRIs are resolved against `base_uri`.
+    Blank node labels start with `bnode_prefix`; use a distinct prefix per
+    document when the triples of several documents are merged.
+    """
+    bnodes = _BlankNodes(bnode_prefix)
+    return _emit_node(protocol_data, mapping, base_uri, bnodes, _subject_of(protocol_data, mapping, base_uri, bnodes))
+
+
+def to_ntriples(triples: Iterable[Triple]) -> str:
+    """Formats triples as an N-Triples document."""
+    return "".join(f"{s} {p} {o} .\n" for s, p, o in triples)
+
+
+def parse_ntriples(text: str) -> Iterator[Triple]:
+    """
+    Splits N-Triples produced by this module back into term strings.
+
+    Subjects and predicates never contain spaces, so each line splits on
+    its first two spaces; the object is the rest of the line before ` .`.
+    """
+    for line in text.splitlines():
+        if line:
+            s, p, rest = line.split(" ", 2)
+            yield s, p, rest[:-2]
+
+
+def write_ntriples(triples: Iterable[Triple], out: TextIO):
+    """Streams triples to `out` as N-Triples."""
+    for s, p, o in triples:
+        out.write(f"{s} {p} {o} .\n")
+
+
+def _turtle_term(term: str, namespaces) -> str:
+    if term == "<" + RDF_TYPE + ">":
+        return "a"
+    if term.startswith("<"):
+        iri = term[1:-1]
+        for prefix, namespace in namespaces:
+            if iri.startswith(namespace) and _TURTLE_LOCAL.match(iri[len(namespace):]):
+                return f"{prefix}:{iri[len(namespace):]}"
+    return term
+
+
+def write_turtle(triples: Iterable[Triple], out: TextIO, prefixes: Optional[Dict[str, str]] = None):
+    """
+    Streams triples to `out` as Turtle.
+
+    Consecutive triples that share a subject (and predicate) are folded with
+    `;` (and `,`), and IRIs in a known namespace are written as prefixed
+    names. Triples are written in the order they are given.
+    """
+    prefixes = prefixes or {}
+    # Longest namespaces first, so that nested namespaces pick the closest prefix.
+    namespaces = sorted(prefixes.items(), key=lambda item: -len(item[1]))
+    for prefix, namespace in sorted(prefixes.items()):
+        out.write(f"@prefix {prefix}: <{namespace}> .\n")
+    if prefixes:
+        out.write("\n")
+
+    last_subject = last_predicate = None
+    for s, p, o in triples:
+        obj = _turtle_term(o, namespaces)
+        if s == last_subject and p == last_predicate:
+            out.write(f",\n        {obj}")
+        elif s == last_subject:
+            out.write(f" ;\n    {_turtle_term(p, namespaces)} {obj}")
+        else:
+            if last_subject is not None:
+                out.write(" .\n\n")
+            out.write(f"{_turtle_term(s, namespaces)} {_turtle_term(p, namespaces)} {obj}")
+        last_subject, last_predicate = s, p
+    if last_subject is not None:
+        out.write(" .\n")
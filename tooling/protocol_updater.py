@@ -8,16 +8,54 @@ workflow.
 
 The tool operates on the .protocol.json files located in the `protocols/`
 directory, performing targeted updates based on command-line arguments.
+Protocol files are located through the protocol index written by the
+compiler (`AGENTS.index.json`) when it covers the directory, instead of
+opening every protocol file.
+
+`apply_updates` applies a batch of updates in-process, loading and
+rewriting each protocol file once however many updates target it; the
+self-correction orchestrator uses it to apply all pending lessons at once.
 """
 import argparse
 import json
 import os
 import glob
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling.protocol_index import load_protocol_index
 
 DEFAULT_PROTOCOLS_DIR = "protocols/"
+DEFAULT_INDEX_FILE = "AGENTS.index.json"
+
+def _indexed_protocol_file(protocol_id: str, protocols_dir: str, index: dict | None) -> tuple | None:
+    """
+    Looks a protocol up in a loaded index, checking that the file still
+    defines it. Returns the file path and parsed data, or None.
+    """
+    entry = index and index["protocols"].get(protocol_id)
+    if not entry:
+        return None
+    filepath = entry["file"]
+    if os.path.dirname(os.path.realpath(filepath)) != os.path.realpath(protocols_dir):
+        return None
+    try:
+        with open(filepath, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return None
+    return (filepath, data) if data.get("protocol_id") == protocol_id else None
 
-def find_protocol_file(protocol_id: str, protocols_dir: str) -> str | None:
-    """Finds the protocol file path corresponding to a given protocol_id."""
+def find_protocol_file(protocol_id: str, protocols_dir: str, index_file: str | None = None) -> str | None:
+    """
+    Finds the protocol file path corresponding to a given protocol_id.
+    The protocol index is consulted first if given; if it is missing or
+    stale, every protocol file in the directory is scanned.
+    """
+    if index_file:
+        indexed = _indexed_protocol_file(protocol_id, protocols_dir, load_protocol_index(index_file))
+        if indexed:
+            return indexed[0]
     for filepath in glob.glob(os.path.join(protocols_dir, "*.protocol.json")):
         try:
             with open(filepath, "r") as f:
@@ -28,74 +66,149 @@ def find_protocol_file(protocol_id: str, protocols_dir: str) -> str | None:
             continue
     return None
 
-def add_tool_to_protocol(protocol_id: str, tool_name: str, protocols_dir: str):
-    """
-    Adds a tool to the 'associated_tools' list of a specified protocol.
-    """
-    protocol_file = find_protocol_file(protocol_id, protocols_dir)
-    if not protocol_file:
-        print(f"Error: Protocol with ID '{protocol_id}' not found in '{protocols_dir}'.")
-        # Exit with a non-zero status code to indicate failure to the calling process.
-        exit(1)
-
-    try:
-        with open(protocol_file, "r") as f:
-            data = json.load(f)
+class ProtocolUpdateError(Exception):
+    """Raised when an update cannot be applied to a protocol."""
 
-        if "associated_tools" not in data:
-            data["associated_tools"] = []
 
-        if tool_name in data["associated_tools"]:
-            print(f"Info: Tool '{tool_name}' already exists in protocol '{protocol_id}'. No changes made.")
-            return
+def load_protocols(protocol_ids, protocols_dir: str, index_file: str | None = None) -> dict:
+    """
+    Loads the source files of several protocols, each at most once.
 
-        data["associated_tools"].append(tool_name)
+    Protocols are located through the index if given; the others by a
+    single scan of the protocols directory. Returns a dict mapping each
+    protocol found to its file path and parsed data.
+    """
+    missing = set(protocol_ids)
+    found = {}
+    index = load_protocol_index(index_file) if index_file else None
+    for protocol_id in sorted(missing):
+        indexed = _indexed_protocol_file(protocol_id, protocols_dir, index)
+        if indexed:
+            found[protocol_id] = indexed
+    missing.difference_update(found)
 
-        with open(protocol_file, "w") as f:
+    for filepath in glob.glob(os.path.join(protocols_dir, "*.protocol.json")):
+        if not missing:
+            break
+        try:
+            with open(filepath, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            continue
+        protocol_id = data.get("protocol_id")
+        if protocol_id in missing:
+            found[protocol_id] = (filepath, data)
+            missing.discard(protocol_id)
+    return found
+
+def write_protocol_file(protocol_file: str, data: dict):
+    """Writes a protocol file atomically, so readers never see a partial file."""
+    temp_file = protocol_file + ".tmp"
+    try:
+        with open(temp_file, "w") as f:
             json.dump(data, f, indent=2)
+        os.replace(temp_file, protocol_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def apply_add_tool(data: dict, tool_name: str) -> bool:
+    """Adds a tool to a protocol's data. Returns False if it was already listed."""
+    tools = data.setdefault("associated_tools", [])
+    if tool_name in tools:
+        return False
+    tools.append(tool_name)
+    return True
+
+def apply_update_rule(data: dict, rule_id: str, new_description: str) -> bool:
+    """Sets the description of a rule in a protocol's data."""
+    protocol_id = data.get("protocol_id")
+    if "rules" not in data or not isinstance(data["rules"], list):
+        raise ProtocolUpdateError(f"Protocol '{protocol_id}' does not contain a valid 'rules' list.")
+    for rule in data["rules"]:
+        if rule.get("rule_id") == rule_id:
+            rule["description"] = new_description
+            return True
+    raise ProtocolUpdateError(f"Rule with ID '{rule_id}' not found in protocol '{protocol_id}'.")
+
+def _apply_update(data: dict, update: dict) -> tuple:
+    """Applies one update to a protocol's data. Returns whether it changed and a message."""
+    protocol_id = update["protocol_id"]
+    if update["command"] == "add-tool":
+        tool_name = update["tool_name"]
+        if not apply_add_tool(data, tool_name):
+            return False, f"Info: Tool '{tool_name}' already exists in protocol '{protocol_id}'. No changes made."
+        return True, f"Successfully added tool '{tool_name}' to protocol '{protocol_id}'."
+    if update["command"] == "update-rule":
+        apply_update_rule(data, update["rule_id"], update["description"])
+        return True, f"Successfully updated rule '{update['rule_id']}' in protocol '{protocol_id}' with new description."
+    raise ProtocolUpdateError(f"Unknown update command '{update['command']}'.")
+
+def apply_updates(updates: list, protocols_dir: str, index_file: str | None = None) -> list:
+    """
+    Applies a batch of updates, each a dict with a `command` ("add-tool" or
+    "update-rule"), a `protocol_id` and the command's parameters.
 
-        print(f"Successfully added tool '{tool_name}' to protocol '{protocol_id}' in file '{protocol_file}'.")
-
-    except (IOError, json.JSONDecodeError) as e:
-        print(f"Error processing protocol file '{protocol_file}': {e}")
+    Updates are grouped by protocol: each protocol file is loaded once and,
+    if any of its updates changed it, written once, atomically. Returns one
+    result per update, in order: a dict with `ok`, `changed` and `message`.
+    An update that fails does not prevent the others to the same protocol.
+    """
+    results = [None] * len(updates)
+    by_protocol = {}
+    for position, update in enumerate(updates):
+        by_protocol.setdefault(update["protocol_id"], []).append(position)
+    protocols = load_protocols(by_protocol, protocols_dir, index_file)
+
+    for protocol_id, positions in by_protocol.items():
+        if protocol_id not in protocols:
+            for position in positions:
+                message = f"Error: Protocol with ID '{protocol_id}' not found in '{protocols_dir}'."
+                results[position] = {"ok": False, "changed": False, "message": message}
+            continue
+        protocol_file, data = protocols[protocol_id]
+        changed_positions = []
+        for position in positions:
+            try:
+                changed, message = _apply_update(data, updates[position])
+            except ProtocolUpdateError as e:
+                results[position] = {"ok": False, "changed": False, "message": f"Error: {e}"}
+                continue
+            results[position] = {"ok": True, "changed": changed, "message": message}
+            if changed:
+                changed_positions.append(position)
+        if not changed_positions:
+            continue
+        try:
+            write_protocol_file(protocol_file, data)
+        except IOError as e:
+            for position in changed_positions:
+                message = f"Error processing protocol file '{protocol_file}': {e}"
+                results[position] = {"ok": False, "changed": False, "message": message}
+    return results
+
+def _apply_or_exit(update: dict, protocols_dir: str, index_file: str | None):
+    result = apply_updates([update], protocols_dir, index_file)[0]
+    print(result["message"])
+    if not result["ok"]:
+        # Exit with a non-zero status code to indicate failure to the calling process.
         exit(1)
 
-def update_rule_in_protocol(protocol_id: str, rule_id: str, new_description: str, protocols_dir: str):
+def add_tool_to_protocol(protocol_id: str, tool_name: str, protocols_dir: str, index_file: str | None = None):
     """
-    Updates the description of a specific rule within a protocol.
+    Adds a tool to the 'associated_tools' list of a specified protocol.
     """
-    protocol_file = find_protocol_file(protocol_id, protocols_dir)
-    if not protocol_file:
-        print(f"Error: Protocol with ID '{protocol_id}' not found in '{protocols_dir}'.")
-        exit(1)
-
-    try:
-        with open(protocol_file, "r") as f:
-            data = json.load(f)
+    update = {"command": "add-tool", "protocol_id": protocol_id, "tool_name": tool_name}
+    _apply_or_exit(update, protocols_dir, index_file)
 
-        if "rules" not in data or not isinstance(data["rules"], list):
-            print(f"Error: Protocol '{protocol_id}' does not contain a valid 'rules' list.")
-            exit(1)
-
-        rule_found = False
-        for rule in data["rules"]:
-            if rule.get("rule_id") == rule_id:
-                rule["description"] = new_description
-                rule_found = True
-                break
-
-        if not rule_found:
-            print(f"Error: Rule with ID '{rule_id}' not found in protocol '{protocol_id}'.")
-            exit(1)
-
-        with open(protocol_file, "w") as f:
-            json.dump(data, f, indent=2)
-
-        print(f"Successfully updated rule '{rule_id}' in protocol '{protocol_id}' with new description.")
-
-    except (IOError, json.JSONDecodeError) as e:
-        print(f"Error processing protocol file '{protocol_file}': {e}")
-        exit(1)
+def update_rule_in_protocol(
+    protocol_id: str, rule_id: str, new_description: str, protocols_dir: str, index_file: str | None = None
+):
+    """
+    Updates the description of a specific rule within a protocol.
+    """
+    update = {"command": "update-rule", "protocol_id": protocol_id, "rule_id": rule_id, "description": new_description}
+    _apply_or_exit(update, protocols_dir, index_file)
 
 
 def main():
@@ -106,6 +219,11 @@ def main():
         default=DEFAULT_PROTOCOLS_DIR,
         help="The directory containing the protocol source files."
     )
+    parser.add_argument(
+        "--index-file",
+        default=DEFAULT_INDEX_FILE,
+        help="The protocol index written by the compiler, used to locate protocol files."
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     # --- 'add-tool' command ---
@@ -122,9 +240,9 @@ def main():
     args = parser.parse_args()
 
     if args.command == "add-tool":
-        add_tool_to_protocol(args.protocol_id, args.tool_name, args.protocols_dir)
+        add_tool_to_protocol(args.protocol_id, args.tool_name, args.protocols_dir, args.index_file)
     elif args.command == "update-rule":
-        update_rule_in_protocol(args.protocol_id, args.rule_id, args.description, args.protocols_dir)
+        update_rule_in_protocol(args.protocol_id, args.rule_id, args.description, args.protocols_dir, args.index_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
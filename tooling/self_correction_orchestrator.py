@@ -3,29 +3,50 @@ Orchestrates the Protocol-Driven Self-Correction (PDSC) workflow.
 
 This script is the engine of the automated feedback loop. It reads structured,
 actionable lessons from `knowledge_core/lessons.jsonl` and uses the
-`protocol_updater.py` tool to apply them to the source protocol files.
+`protocol_updater.py` functions to apply them to the source protocol files.
+
+The protocol index written by the compiler (`AGENTS.index.json`) is read
+once per cycle. It is passed on to the updater, so that protocol files are
+located without scanning the protocols directory, and `add-tool` lessons
+whose tool the index already lists are marked applied without running the
+updater at all.
+
+Only the pending lessons are loaded, and their new statuses are appended to
+the lesson journal rather than rewriting `lessons.jsonl` (see
+`lesson_journal.py`), which is compacted once the journal grows large.
 """
-import json
 import os
 import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling import lesson_journal
+from tooling.protocol_index import load_protocol_index
+from tooling.protocol_updater import apply_updates
 
 LESSONS_FILE = "knowledge_core/lessons.jsonl"
-UPDATER_SCRIPT = "tooling/protocol_updater.py"
+INDEX_FILE = "AGENTS.index.json"
+PROTOCOLS_DIR = "protocols/"
 CODE_SUGGESTER_SCRIPT = "tooling/code_suggester.py"
 
 def load_lessons():
-    """Loads all lessons from the JSONL file."""
-    if not os.path.exists(LESSONS_FILE):
-        return []
+    """Loads all lessons from the JSONL file, with their journaled statuses."""
+    return lesson_journal.load_lessons(LESSONS_FILE)
 
-    with open(LESSONS_FILE, "r") as f:
-        return [json.loads(line) for line in f]
+def load_pending_lessons():
+    """Loads only the pending lessons, through the pending-lesson index."""
+    return lesson_journal.load_pending_lessons(LESSONS_FILE)
 
 def save_lessons(lessons):
-    """Saves a list of lessons back to the JSONL file, overwriting it."""
-    with open(LESSONS_FILE, "w") as f:
-        for lesson in lessons:
-            f.write(json.dumps(lesson) + "\n")
+    """Saves a list of lessons back to the JSONL file, overwriting it and its journal."""
+    lesson_journal.save_lessons(LESSONS_FILE, lessons)
+
+def record_lesson_statuses(lessons):
+    """Journals the status of each lesson that is no longer pending."""
+    lesson_journal.record_statuses(
+        LESSONS_FILE,
+        {lesson["lesson_id"]: lesson["status"] for lesson in lessons if lesson.get("status") != "pending"},
+    )
 
 def run_command(command: list) -> bool:
     """Runs a command and returns True on success, False on failure."""
@@ -43,12 +64,34 @@ def run_command(command: list) -> bool:
         print(f"Stderr: {e.stderr}")
         return False
 
-def process_lessons(lessons: list, protocols_dir: str) -> bool:
+def _indexed_tools(index: dict | None, index_file: str, protocol_id: str) -> list:
+    """
+    Returns the tools the index lists for a protocol, or an empty list if the
+    protocol is not indexed or its source file changed after the index was written.
+    """
+    entry = index and index["protocols"].get(protocol_id)
+    if not entry:
+        return []
+    try:
+        if os.path.getmtime(entry["file"]) > os.path.getmtime(index_file):
+            return []
+    except OSError:
+        return []
+    return entry["associated_tools"]
+
+def process_lessons(lessons: list, protocols_dir: str, index_file: str | None = None) -> bool:
     """
     Processes all pending lessons, applies them, and updates their status.
     Returns True if any changes were made, False otherwise.
+
+    Protocol updates are collected and applied in-process as one batch (see
+    `protocol_updater.apply_updates`), so each protocol file is loaded and
+    written once however many lessons target it.
     """
     changes_made = False
+    index = load_protocol_index(index_file)
+    # Pending protocol updates, and the lesson each one came from.
+    updates, update_lessons = [], []
     for lesson in lessons:
         if lesson.get("status") != "pending":
             continue
@@ -64,34 +107,30 @@ def process_lessons(lessons: list, protocols_dir: str) -> bool:
                 continue
 
             params = action.get("parameters", {})
-            command_executed = False
+            update = None
 
             if command_name == "add-tool":
                 protocol_id = params.get("protocol_id")
                 tool_name = params.get("tool_name")
+                if protocol_id and tool_name and tool_name in _indexed_tools(index, index_file, protocol_id):
+                    print(f"Info: Tool '{tool_name}' already exists in protocol '{protocol_id}'. No changes made.")
+                    lesson["status"] = "applied"
+                    continue
                 if protocol_id and tool_name:
-                    command = [
-                        "python3", UPDATER_SCRIPT, "--protocols-dir", protocols_dir,
-                        "add-tool", "--protocol-id", protocol_id, "--tool-name", tool_name
-                    ]
-                    command_executed = True
+                    update = {"command": "add-tool", "protocol_id": protocol_id, "tool_name": tool_name}
             elif command_name == "update-rule":
                 protocol_id = params.get("protocol_id")
                 rule_id = params.get("rule_id")
                 description = params.get("description")
                 if protocol_id and rule_id and description:
-                    command = [
-                        "python3", UPDATER_SCRIPT, "--protocols-dir", protocols_dir,
-                        "update-rule", "--protocol-id", protocol_id, "--rule-id", rule_id, "--description", description
-                    ]
-                    command_executed = True
-
-            if command_executed:
-                if run_command(command):
-                    lesson["status"] = "applied"
-                else:
-                    lesson["status"] = "failed"
-                changes_made = True
+                    update = {
+                        "command": "update-rule", "protocol_id": protocol_id,
+                        "rule_id": rule_id, "description": description,
+                    }
+
+            if update:
+                updates.append(update)
+                update_lessons.append(lesson)
             else:
                 print(f"Warning: Skipping lesson with unhandled or malformed command: '{command_name}'")
 
@@ -127,6 +166,14 @@ def process_lessons(lessons: list, protocols_dir: str) -> bool:
             # This handles cases where the action type itself is unknown.
             print(f"Warning: Skipping lesson with unknown action type: '{action_type}'")
 
+    if updates:
+        print(f"--- Applying {len(updates)} protocol update(s) ---")
+        results = apply_updates(updates, protocols_dir, index_file if index else None)
+        for lesson, result in zip(update_lessons, results):
+            print(f"{lesson['lesson_id']}: {result['message']}")
+            lesson["status"] = "applied" if result["ok"] else "failed"
+        changes_made = True
+
     return changes_made
 
 def main():
@@ -136,19 +183,21 @@ def main():
     # This script is intended to be called from a controlled environment
     # like a test or a dedicated plan, so we don't use argparse here.
     # The protocols directory is assumed to be the default one.
-    protocols_directory = "protocols/"
+    protocols_directory = PROTOCOLS_DIR
 
     print("--- Starting Protocol-Driven Self-Correction Cycle ---")
-    lessons = load_lessons()
+    lessons = load_pending_lessons()
 
-    if not any(l.get("status") == "pending" for l in lessons):
+    if not lessons:
         print("No pending lessons to process. Exiting.")
         return
 
-    changes_were_applied = process_lessons(lessons, protocols_directory)
+    changes_were_applied = process_lessons(lessons, protocols_directory, INDEX_FILE)
 
     print("\n--- Saving updated lesson statuses ---")
-    save_lessons(lessons)
+    record_lesson_statuses(lessons)
+    if lesson_journal.compact_if_due(LESSONS_FILE):
+        print("Compacted the lesson journal into the lessons file.")
 
     if changes_were_applied:
         print("\n--- Protocol sources updated. Rebuilding AGENTS.md... ---")
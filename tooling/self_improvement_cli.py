@@ -12,6 +12,11 @@ The primary analysis currently implemented is:
   task can suggest that the initial planning phase was insufficient, the task
   was poorly understood, or the agent struggled to adapt to unforeseen
   challenges.
+- **Latency Analysis:** It reconstructs how long each step took from the
+  timestamps of consecutive entries in a session, and reports p50/p90/p99
+  durations per tool and per action type, along with the slowest tasks. The
+  percentiles are kept in mergeable streaming sketches (see
+  `quantile_sketch.py`), so memory stays bounded on huge logs.
 
 By flagging these tasks, the script provides a starting point for a deeper
 post-mortem analysis, helping the agent (or its developers) to understand the
@@ -20,57 +25,331 @@ upfront planning in the future.
 
 The tool is designed to be extensible, with future analyses (such as error
 rate tracking or tool usage anti-patterns) to be added as the system evolves.
+Each analysis is an `Analyzer` registered with `analysis_engine.py`, which
+decodes every log entry once and hands it to all of them, so adding an
+analysis does not add another pass over the log. The engine scans
+multi-gigabyte logs in parallel shards (see `log_scan.py`) and reports the
+CPU time spent in each analyzer. Rotated, compressed log segments are read
+too; with `--since`/`--until`, only the segments overlapping that time window
+are opened. With `--db`, the log is first loaded incrementally into its
+SQLite index (see `log_db.py`) and the analyses run as indexed queries.
 """
 import argparse
-import json
-from collections import defaultdict
+import contextlib
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tooling import log_db
+from tooling.analysis_engine import ANALYZERS, Analyzer, AnalyzerScanner, register_analyzer, run_analyzers
+from tooling.quantile_sketch import KLLSketch
+from utils.log_segments import parse_timestamp
 
 LOG_FILE_PATH = "logs/activity.log.jsonl"
 ACTION_TYPE_MAP = {"set_plan": "PLAN_UPDATE"}
+# Gaps between entries longer than this are idle time, not a step's duration.
+MAX_STEP_SECONDS = 3600
+# Number of tasks listed by the latency analysis.
+SLOWEST_TASKS = 5
+
+
+@register_analyzer
+class PlanningEfficiencyAnalyzer(Analyzer):
+    """
+    Counts plan updates per task. Its result keeps the tasks with more than
+    one, most revised first.
+    """
+
+    name = "planning-efficiency"
+    title = "Planning Inefficiencies"
+
+    def start(self):
+        return Counter()
+
+    def on_entry(self, task_plan_updates, entry):
+        action = entry.get("action")
+        if not isinstance(action, dict):
+            return
+        # Support both direct action types and mapped tool names
+        details = action.get("details")
+        tool_name = details.get("tool_name") if isinstance(details, dict) else None
+        is_plan_update = action.get("type") == "PLAN_UPDATE" or ACTION_TYPE_MAP.get(tool_name) == "PLAN_UPDATE"
+        if is_plan_update:
+            task = entry.get("task")
+            task_id = task.get("id") if isinstance(task, dict) else None
+            if task_id:
+                task_plan_updates[task_id] += 1
+
+    def merge(self, states):
+        return sum(states, Counter())
+
+    def finalize(self, task_plan_updates):
+        revised = sorted(task_plan_updates.items(), key=lambda item: (-item[1], item[0]))
+        return {task: count for task, count in revised if count > 1}
+
+    def query(self, conn, since=None, until=None):
+        plan_tools = tuple(tool for tool, action in ACTION_TYPE_MAP.items() if action == "PLAN_UPDATE")
+        return self.finalize(log_db.plan_updates(conn, plan_tools=plan_tools, since=since, until=until))
+
+    def report(self, inefficient_tasks):
+        if not inefficient_tasks:
+            return ["  - Result: No tasks with significant planning inefficiencies found."]
+        lines = ["  - Result: Found tasks with multiple plan revisions:"]
+        for task_id, count in inefficient_tasks.items():
+            lines.append(f"    - Task ID: {task_id}, Plan Revisions: {count}")
+        return lines
+
+
+@register_analyzer
+class ProtocolViolationAnalyzer(Analyzer):
+    """Collects the tasks that used `reset_all`; partial sets are joined."""
+
+    name = "protocol-violations"
+    title = "Critical Protocol Violations"
+
+    def start(self):
+        return set()
+
+    def on_entry(self, violation_tasks, entry):
+        action = entry.get("action")
+        if not isinstance(action, dict):
+            return
+        action_type = action.get("type")
+        details = action.get("details")
+        if not isinstance(details, dict):
+            return
+
+        is_violation = False
+        # Case 1: The tool use was logged as a system failure.
+        if action_type == "SYSTEM_FAILURE":
+            if details.get("tool_name") == "reset_all":
+                is_violation = True
+
+        # Case 2: The tool was logged as a standard tool execution.
+        elif action_type == "TOOL_EXEC":
+            command = details.get("command", "")
+            if isinstance(command, str) and "reset_all" in command:
+                is_violation = True
+
+        if is_violation:
+            task = entry.get("task")
+            task_id = task.get("id") if isinstance(task, dict) else None
+            if task_id:
+                violation_tasks.add(task_id)
+
+    def merge(self, states):
+        return set().union(*states)
 
+    def finalize(self, violation_tasks):
+        return sorted(violation_tasks)
 
-def analyze_planning_efficiency(log_file):
+    def query(self, conn, since=None, until=None):
+        return self.finalize(log_db.reset_all_tasks(conn, since=since, until=until))
+
+    def report(self, violation_tasks):
+        if not violation_tasks:
+            return ["  - Result: No critical protocol violations found."]
+        lines = ["  - WARNING: Found tasks with critical protocol violations (use of `reset_all`):"]
+        for task_id in violation_tasks:
+            lines.append(f"    - Task ID: {task_id}")
+        return lines
+
+
+def _entry_time(entry):
+    """Returns the POSIX time of an entry's timestamp, or None if it has none."""
+    parsed = parse_timestamp(entry.get("timestamp"))
+    return None if parsed is None else parsed.timestamp()
+
+
+@register_analyzer
+class LatencyAnalyzer(Analyzer):
+    """
+    Measures how long each logged step took: the time since the previous
+    entry of the same session, since an entry is logged when its action
+    completes. Durations are kept in `KLLSketch`es per tool (for `TOOL_EXEC`
+    entries) and per action type, and summed per task.
+
+    The first entry of each session in a shard cannot be measured until the
+    shard before it is known, so a state also keeps each session's first
+    (`heads`) and last (`tails`) entry time, which `merge` pairs up.
+    """
+
+    name = "latency"
+    title = "Step and Tool Latency"
+
+    def start(self):
+        return {"tools": {}, "steps": {}, "tasks": {}, "heads": {}, "tails": {}}
+
+    def _record(self, state, step, seconds):
+        if not 0 <= seconds <= MAX_STEP_SECONDS:
+            return  # Clock skew, or the session was idle.
+        action_type, tool_name, task_id, plan_step = step
+        if tool_name is not None:
+            state["tools"].setdefault(tool_name, KLLSketch()).add(seconds)
+        state["steps"].setdefault(action_type, KLLSketch()).add(seconds)
+        if task_id is not None:
+            task = state["tasks"].setdefault(task_id, [0.0, 0, 0.0, None])
+            task[0] += seconds
+            task[1] += 1
+            if seconds > task[2]:
+                task[2], task[3] = seconds, (plan_step, tool_name or action_type)
+
+    def on_entry(self, state, entry):
+        when = _entry_time(entry)
+        if when is None:
+            return
+        action = entry.get("action")
+        action = action if isinstance(action, dict) else {}
+        details = action.get("details")
+        tool_name = details.get("tool_name") if isinstance(details, dict) and action.get("type") == "TOOL_EXEC" else None
+        task = entry.get("task")
+        task = task if isinstance(task, dict) else {}
+        step = (action.get("type"), tool_name, task.get("id"), task.get("plan_step"))
+
+        session = entry.get("session_id")
+        previous = state["tails"].get(session)
+        if previous is None:
+            state["heads"][session] = (when, step)
+        else:
+            self._record(state, step, when - previous)
+        state["tails"][session] = when
+
+    def merge(self, states):
+        merged = self.start()
+        for state in states:
+            for session, (when, step) in state["heads"].items():
+                previous = merged["tails"].get(session)
+                if previous is None:
+                    merged["heads"][session] = (when, step)
+                else:
+                    self._record(merged, step, when - previous)
+            for key in ("tools", "steps"):
+                for name, sketch in state[key].items():
+                    merged[key].setdefault(name, KLLSketch()).merge(sketch)
+            for task_id, (total, steps, slowest, slowest_step) in state["tasks"].items():
+                task = merged["tasks"].setdefault(task_id, [0.0, 0, 0.0, None])
+                task[0] += total
+                task[1] += steps
+                if slowest > task[2]:
+                    task[2], task[3] = slowest, slowest_step
+            merged["tails"].update(state["tails"])
+        return merged
+
+    @staticmethod
+    def _summary(sketch):
+        p50, p90, p99 = sketch.quantiles((0.5, 0.9, 0.99))
+        return {"count": sketch.count, "p50": p50, "p90": p90, "p99": p99, "max": sketch.max}
+
+    def finalize(self, state):
+        slowest = sorted(state["tasks"].items(), key=lambda item: (-item[1][0], item[0]))[:SLOWEST_TASKS]
+        return {
+            "tools": {name: self._summary(sketch) for name, sketch in sorted(state["tools"].items())},
+            "steps": {str(name): self._summary(sketch) for name, sketch in sorted(
+                state["steps"].items(), key=lambda item: str(item[0]))},
+            "slowest_tasks": [
+                {"task_id": task_id, "seconds": total, "steps": steps,
+                 "slowest_step": step[0] if step else None, "slowest_action": step[1] if step else None,
+                 "slowest_seconds": slowest_seconds}
+                for task_id, (total, steps, slowest_seconds, step) in slowest
+            ],
+        }
+
+    @staticmethod
+    def _table(label, summaries):
+        width = max([len(label)] + [len(name) for name in summaries])
+        lines = [f"    {label:<{width}}  {'count':>7}  {'p50 s':>8}  {'p90 s':>8}  {'p99 s':>8}  {'max s':>8}"]
+        for name, summary in summaries.items():
+            lines.append(
+                f"    {name:<{width}}  {summary['count']:>7}  {summary['p50']:>8.2f}  {summary['p90']:>8.2f}"
+                f"  {summary['p99']:>8.2f}  {summary['max']:>8.2f}"
+            )
+        return lines
+
+    def report(self, result):
+        if not result["steps"]:
+            return ["  - Result: No timed steps found."]
+        lines = []
+        if result["tools"]:
+            lines.append("  - Tool latency:")
+            lines += self._table("tool", result["tools"])
+        lines.append("  - Step latency by action type:")
+        lines += self._table("action", result["steps"])
+        lines.append("  - Slowest tasks:")
+        for task in result["slowest_tasks"]:
+            lines.append(
+                f"    - Task ID: {task['task_id']}, {task['seconds']:.2f} s over {task['steps']} steps;"
+                f" slowest step {task['slowest_step']} ({task['slowest_action']}, {task['slowest_seconds']:.2f} s)"
+            )
+        return lines
+
+
+class PlanningEfficiencyScanner(AnalyzerScanner):
+    """Counts plan updates per task, as a `LogScanner`."""
+
+    def __init__(self):
+        super().__init__(PlanningEfficiencyAnalyzer())
+
+
+class ProtocolViolationScanner(AnalyzerScanner):
+    """Collects the tasks that used `reset_all`, as a `LogScanner`."""
+
+    def __init__(self):
+        super().__init__(ProtocolViolationAnalyzer())
+
+
+def _query(log_file, db_path, analyzers, since=None, until=None):
+    """Brings the log's database up to date and runs the analyzers' queries on it."""
+    log_db.ingest(log_file, db_path)
+    with contextlib.closing(log_db.connect(db_path)) as conn:
+        return {analyzer.name: analyzer.query(conn, since=since, until=until) for analyzer in analyzers}
+
+
+def run_analyses(log_file, analyzers, max_workers=None, since=None, until=None, db_path=None):
+    """
+    Runs analyzers over the log in a single pass and returns the engine's
+    result (see `analysis_engine.run_analyzers`). With a `db_path`, the
+    analyzers that have a `query` run it on the log database instead, and
+    only the others scan the log.
+    """
+    analyzers = list(analyzers)
+    queried = {}
+    if db_path:
+        with_query = [a for a in analyzers if a.query is not None]
+        queried = _query(log_file, db_path, with_query, since, until)
+        analyzers = [a for a in analyzers if a.query is None]
+    if analyzers or not queried:
+        result = run_analyzers(log_file, analyzers, since=since, until=until, max_workers=max_workers)
+    else:
+        result = {"entries": None, "malformed": 0, "cpu": {}, "results": {}}
+    result["results"].update(queried)
+    return result
+
+
+def analyze_planning_efficiency(log_file, max_workers=None, since=None, until=None, db_path=None):
     """
     Analyzes the log file to find tasks with multiple plan revisions.
 
     Args:
         log_file (str): Path to the activity log file.
+        max_workers (int, optional): Processes used to scan large logs.
+        since (str, optional): Only analyze entries at or after this ISO 8601 time.
+        until (str, optional): Only analyze entries at or before this ISO 8601 time.
+        db_path (str, optional): Run the analysis as a query on this log database.
 
     Returns:
         dict: A dictionary mapping task IDs to the number of plan updates.
     """
-    task_plan_updates = defaultdict(int)
+    analyzer = PlanningEfficiencyAnalyzer()
     try:
-        with open(log_file, "r") as f:
-            for line in f:
-                try:
-                    entry = json.loads(line)
-                    # Support both direct action types and mapped tool names
-                    action_type = entry.get("action", {}).get("type")
-                    tool_name = (
-                        entry.get("action", {}).get("details", {}).get("tool_name")
-                    )
-
-                    is_plan_update = (
-                        action_type == "PLAN_UPDATE"
-                        or ACTION_TYPE_MAP.get(tool_name) == "PLAN_UPDATE"
-                    )
-
-                    if is_plan_update:
-                        task_id = entry.get("task", {}).get("id")
-                        if task_id:
-                            task_plan_updates[task_id] += 1
-                except json.JSONDecodeError:
-                    print(f"Warning: Skipping malformed JSON line: {line.strip()}")
-                    continue
+        result = run_analyses(log_file, [analyzer], max_workers, since, until, db_path)
     except FileNotFoundError:
         print(f"Error: Log file not found at {log_file}")
         return {}
-
-    return {task: count for task, count in task_plan_updates.items() if count > 1}
+    return result["results"][analyzer.name]
 
 
-def analyze_protocol_violations(log_file):
+def analyze_protocol_violations(log_file, max_workers=None, since=None, until=None, db_path=None):
     """
     Scans the log file for critical protocol violations, such as the
     unauthorized use of `reset_all`.
@@ -81,43 +360,56 @@ def analyze_protocol_violations(log_file):
 
     Args:
         log_file (str): Path to the activity log file.
+        max_workers (int, optional): Processes used to scan large logs.
+        since (str, optional): Only analyze entries at or after this ISO 8601 time.
+        until (str, optional): Only analyze entries at or before this ISO 8601 time.
+        db_path (str, optional): Run the analysis as a query on this log database.
 
     Returns:
         list: A list of unique task IDs where `reset_all` was used.
     """
-    violation_tasks = set()
+    analyzer = ProtocolViolationAnalyzer()
     try:
-        with open(log_file, "r") as f:
-            for line in f:
-                try:
-                    entry = json.loads(line)
-                    action = entry.get("action", {})
-                    action_type = action.get("type")
-                    details = action.get("details", {})
-
-                    is_violation = False
-                    # Case 1: The tool use was logged as a system failure.
-                    if action_type == "SYSTEM_FAILURE":
-                        if details.get("tool_name") == "reset_all":
-                            is_violation = True
-
-                    # Case 2: The tool was logged as a standard tool execution.
-                    elif action_type == "TOOL_EXEC":
-                        if "reset_all" in details.get("command", ""):
-                            is_violation = True
-
-                    if is_violation:
-                        task_id = entry.get("task", {}).get("id")
-                        if task_id:
-                            violation_tasks.add(task_id)
-
-                except json.JSONDecodeError:
-                    # Ignore malformed lines, they are not our concern here.
-                    continue
+        result = run_analyses(log_file, [analyzer], max_workers, since, until, db_path)
     except FileNotFoundError:
         # If the log file doesn't exist, there are no violations.
         return []
-    return list(violation_tasks)
+    return result["results"][analyzer.name]
+
+
+def analyze_latency(log_file, max_workers=None, since=None, until=None):
+    """
+    Reconstructs the duration of each logged step and summarizes it per tool
+    and per action type, with the slowest tasks.
+
+    Args:
+        log_file (str): Path to the activity log file.
+        max_workers (int, optional): Processes used to scan large logs.
+        since (str, optional): Only analyze entries at or after this ISO 8601 time.
+        until (str, optional): Only analyze entries at or before this ISO 8601 time.
+
+    Returns:
+        dict: `tools` and `steps` map names to their count, p50, p90, p99 and
+        max duration in seconds; `slowest_tasks` lists the tasks that took
+        longest, slowest first.
+    """
+    analyzer = LatencyAnalyzer()
+    try:
+        result = run_analyses(log_file, [analyzer], max_workers, since, until)
+    except FileNotFoundError:
+        print(f"Error: Log file not found at {log_file}")
+        return analyzer.finalize(analyzer.start())
+    return result["results"][analyzer.name]
+
+
+def _cpu_report(result):
+    """Returns lines with the CPU time spent decoding and in each analyzer."""
+    if not result["cpu"]:
+        return ["  - All analyses ran as database queries."]
+    lines = [f"  - {result['entries']} log entries decoded once ({result['malformed']} malformed lines skipped)."]
+    for name, seconds in result["cpu"].items():
+        lines.append(f"    - {name}: {seconds * 1000:.1f} ms")
+    return lines
 
 
 def main():
@@ -132,30 +424,52 @@ def main():
         default=LOG_FILE_PATH,
         help=f"Path to the log file. Defaults to {LOG_FILE_PATH}",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes used to scan large logs. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--since",
+        default=None,
+        help="Only analyze entries at or after this ISO 8601 timestamp.",
+    )
+    parser.add_argument(
+        "--until",
+        default=None,
+        help="Only analyze entries at or before this ISO 8601 timestamp.",
+    )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help=f"Run the analyses as queries on this SQLite log index (e.g. {log_db.DB_FILE}).",
+    )
+    parser.add_argument(
+        "--analyzer",
+        action="append",
+        choices=sorted(ANALYZERS),
+        help="Run only this analyzer (may be repeated). Defaults to all of them.",
+    )
     args = parser.parse_args()
 
     # --- Run Analyses ---
     print("--- Running Self-Improvement Analysis ---")
+    analyzers = [ANALYZERS[name]() for name in (args.analyzer or ANALYZERS)]
+    try:
+        result = run_analyses(args.log_file, analyzers, args.jobs, args.since, args.until, args.db)
+    except FileNotFoundError:
+        print(f"Error: Log file not found at {args.log_file}")
+        return
 
-    print("\n[1] Analyzing for Planning Inefficiencies...")
-    inefficient_tasks = analyze_planning_efficiency(args.log_file)
-    if not inefficient_tasks:
-        print("  - Result: No tasks with significant planning inefficiencies found.")
-    else:
-        print("  - Result: Found tasks with multiple plan revisions:")
-        for task_id, count in inefficient_tasks.items():
-            print(f"    - Task ID: {task_id}, Plan Revisions: {count}")
+    for number, analyzer in enumerate(analyzers, 1):
+        print(f"\n[{number}] Analyzing for {analyzer.title}...")
+        for line in analyzer.report(result["results"][analyzer.name]):
+            print(line)
 
-    print("\n[2] Analyzing for Critical Protocol Violations...")
-    violation_tasks = analyze_protocol_violations(args.log_file)
-    if not violation_tasks:
-        print("  - Result: No critical protocol violations found.")
-    else:
-        print(
-            "  - WARNING: Found tasks with critical protocol violations (use of `reset_all`):"
-        )
-        for task_id in violation_tasks:
-            print(f"    - Task ID: {task_id}")
+    print(f"\n[{len(analyzers) + 1}] Analyzer CPU Time")
+    for line in _cpu_report(result):
+        print(line)
 
     print("\n--- Analysis Complete ---")
 
@@ -14,31 +14,36 @@ snapshot-able representation of the agent's progress through a task.
 
 Together, these classes enable the hierarchical, stack-based planning and
 execution that is the hallmark of the CFDC.
+
+Both dataclasses use `__slots__`, so that orchestrators holding many
+concurrent tasks, each with a deep plan stack, do not pay for a per-instance
+`__dict__`. A `PlanContext` can hold its commands either as a list or as a
+compact, array-backed `CommandTable`.
 """
 import json
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 
 # The Command dataclass is now defined in the central plan_parser module.
 from tooling.plan_parser import Command
 
-@dataclass
+@dataclass(slots=True)
 class PlanContext:
     """
     Represents the execution context of a single plan file within the plan stack.
 
     This class holds the state of a specific plan being executed, including its
-    file path, its content (as a list of parsed Command objects), and a pointer
-    to the current step being executed.
+    file path, its content (as a sequence of parsed Command objects), and a
+    pointer to the current step being executed.
     """
 
     plan_path: str
-    commands: List[Command]
+    commands: Sequence[Command]
     current_step: int = 0
     plan_content: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentState:
     """
     Represents the complete, serializable state of the agent's workflow.
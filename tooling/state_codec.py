@@ -0,0 +1,337 @@
+"""
+Serializes the complete `AgentState` into a compact, versioned binary format.
+
+`AgentState.to_json` is a lossy summary meant for the final report: it drops
+the commands of every plan on the stack. This module encodes the full state,
+including every `PlanContext` with its commands and spans, so that a state
+can be shipped to another process or persisted and restored exactly.
+
+Every encoded snapshot is a frame:
+
+    magic (4 bytes) | format version | codec id | kind | payload
+
+The payload is produced by the fastest codec available: `orjson` or `msgpack`
+when installed, and the standard library `json` module otherwise. The codec
+id in the frame tells the decoder which one to use.
+
+Snapshots come in two kinds:
+- **Full:** the whole state.
+- **Delta:** only what changed since the previous snapshot produced by the
+  same `StateEncoder`. Messages are treated as an append-only history, so a
+  delta carries only the new messages. Plan contexts that are still on the
+  stack, with the same commands and plan content, carry only their new
+  `current_step`. Other contexts are encoded in full.
+
+`StateDecoder` applies a stream of full and delta frames in order. The
+`append_snapshot` and `read_snapshot_journal` helpers store such a stream in
+a length-prefixed journal file.
+"""
+import hashlib
+import json
+import struct
+import sys
+from typing import Any, Dict, List, Optional
+
+from tooling.plan_parser import Command, CommandTable
+from tooling.state import AgentState, PlanContext
+
+FORMAT_VERSION = 1
+MAGIC = b"AGST"
+KIND_FULL = 0
+KIND_DELTA = 1
+
+# magic, format version, codec id, snapshot kind
+_FRAME_HEADER = struct.Struct("<4sBBB")
+_JOURNAL_LENGTH = struct.Struct("<I")
+
+# Scalar (or small, replace-on-change) fields of AgentState.
+_SCALAR_FIELDS = (
+    "task",
+    "plan_path",
+    "orientation_complete",
+    "vm_capability_report",
+    "research_findings",
+    "draft_postmortem_path",
+    "final_report",
+    "error",
+)
+
+
+# --- Codecs ---
+
+
+def _json_dumps(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(data: bytes):
+    return json.loads(data)
+
+
+def _load_codecs():
+    """Returns the available codecs as `{codec_id: (name, dumps, loads)}`."""
+    codecs = {0: ("json", _json_dumps, _json_loads)}
+    try:
+        import msgpack
+
+        codecs[2] = (
+            "msgpack",
+            lambda obj: msgpack.packb(obj, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False),
+        )
+    except ImportError:
+        pass
+    try:
+        import orjson
+
+        codecs[1] = ("orjson", orjson.dumps, orjson.loads)
+    except ImportError:
+        pass
+    return codecs
+
+
+CODECS = _load_codecs()
+# Prefer orjson, then msgpack, then the standard library.
+DEFAULT_CODEC_ID = next(codec_id for codec_id in (1, 2, 0) if codec_id in CODECS)
+
+
+def _frame(kind: int, payload: Dict[str, Any], codec_id: int) -> bytes:
+    """Encodes a payload and prefixes it with the frame header."""
+    _, dumps, _ = CODECS[codec_id]
+    return _FRAME_HEADER.pack(MAGIC, FORMAT_VERSION, codec_id, kind) + dumps(payload)
+
+
+def _unframe(data: bytes):
+    """Validates a frame header and returns `(kind, payload)`."""
+    if len(data) < _FRAME_HEADER.size:
+        raise ValueError("Snapshot is too short to contain a frame header.")
+    magic, version, codec_id, kind = _FRAME_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Data is not an AgentState snapshot.")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version {version}.")
+    if codec_id not in CODECS:
+        raise ValueError(f"Snapshot was encoded with codec id {codec_id}, which is not installed.")
+    _, _, loads = CODECS[codec_id]
+    return kind, loads(data[_FRAME_HEADER.size:])
+
+
+# --- Plain-data conversion ---
+
+
+def _encode_commands(commands) -> Dict[str, Any]:
+    """Encodes a command sequence column-wise with an interned tool table."""
+    tool_table: Dict[str, int] = {}
+    tool_ids = []
+    args = []
+    spans = []
+    for command in commands:
+        tool_ids.append(tool_table.setdefault(command.tool_name, len(tool_table)))
+        args.append(command.args_text)
+        span = command._span
+        spans.extend(span if span is not None else (-1, -1, -1, -1))
+    return {"tools": list(tool_table), "ids": tool_ids, "args": args, "spans": spans}
+
+
+def _decode_commands(data: Dict[str, Any]) -> List[Command]:
+    """Rebuilds the commands encoded by `_encode_commands`."""
+    tools = [sys.intern(name) for name in data["tools"]]
+    span_values = iter(data["spans"])
+    spans = zip(span_values, span_values, span_values, span_values)
+    return [
+        Command(tools[tool_id], args_text, None if span[0] < 0 else span)
+        for tool_id, args_text, span in zip(data["ids"], data["args"], spans)
+    ]
+
+
+def _encode_context(ctx: PlanContext) -> Dict[str, Any]:
+    return {
+        "plan_path": ctx.plan_path,
+        "current_step": ctx.current_step,
+        "plan_content": ctx.plan_content,
+        "commands": _encode_commands(ctx.commands),
+    }
+
+
+def _decode_context(data: Dict[str, Any]) -> PlanContext:
+    return PlanContext(
+        plan_path=data["plan_path"],
+        commands=_decode_commands(data["commands"]),
+        current_step=data["current_step"],
+        plan_content=list(data["plan_content"]),
+    )
+
+
+def state_to_dict(state: AgentState) -> Dict[str, Any]:
+    """Converts an `AgentState` into plain data, without loss."""
+    data = {name: getattr(state, name) for name in _SCALAR_FIELDS}
+    data["messages"] = state.messages
+    data["plan_stack"] = [_encode_context(ctx) for ctx in state.plan_stack]
+    return data
+
+
+def state_from_dict(data: Dict[str, Any]) -> AgentState:
+    """Rebuilds an `AgentState` from the output of `state_to_dict`."""
+    state = AgentState(task=data["task"])
+    for name in _SCALAR_FIELDS:
+        setattr(state, name, data[name])
+    state.messages = list(data["messages"])
+    state.plan_stack = [_decode_context(ctx) for ctx in data["plan_stack"]]
+    return state
+
+
+# --- Full snapshots ---
+
+
+def dumps(state: AgentState, codec_id: int = DEFAULT_CODEC_ID) -> bytes:
+    """Encodes a full snapshot of `state`."""
+    return _frame(KIND_FULL, state_to_dict(state), codec_id)
+
+
+def loads(data: bytes) -> AgentState:
+    """Decodes a full snapshot produced by `dumps`."""
+    kind, payload = _unframe(data)
+    if kind != KIND_FULL:
+        raise ValueError("Cannot decode a delta snapshot without its base; use StateDecoder.")
+    return state_from_dict(payload)
+
+
+# --- Delta snapshots ---
+
+
+def _commands_digest(commands) -> bytes:
+    """Fingerprints a command sequence, so that edits made in place are noticed."""
+    digest = hashlib.sha256()
+    if isinstance(commands, CommandTable):
+        # Hash the columns and source as they are, without materializing arguments.
+        source = commands.source
+        digest.update("\0".join(commands.tool_names).encode("utf-8"))
+        for column in (commands.tool_ids, commands.spans, commands.range_index, commands.ranges):
+            digest.update(b"\1" + column.tobytes())
+        digest.update(b"\1" + (source.encode("utf-8", "surrogatepass") if isinstance(source, str) else source))
+        return digest.digest()
+    for command in commands:
+        digest.update(f"{command.tool_name}\0{command.args_text}\0{command._span}\1".encode("utf-8", "surrogatepass"))
+    return digest.digest()
+
+
+def _context_key(ctx: PlanContext) -> tuple:
+    """What identifies a plan context between snapshots, up to its current step."""
+    content = hashlib.sha256("\0".join(ctx.plan_content).encode("utf-8", "surrogatepass")).digest()
+    return (ctx, ctx.commands, ctx.plan_path, content, _commands_digest(ctx.commands))
+
+
+class StateEncoder:
+    """
+    Encodes successive snapshots of one evolving `AgentState`.
+
+    The first snapshot is always full. Later snapshots are deltas against the
+    previous one, unless `delta=False` is passed or the state can no longer
+    be expressed as a delta (e.g. a different `AgentState` object).
+    """
+
+    def __init__(self, codec_id: int = DEFAULT_CODEC_ID):
+        self.codec_id = codec_id
+        self._state = None
+        self._scalars: Dict[str, bytes] = {}
+        self._message_count = 0
+        self._last_message = None
+        self._contexts: List[tuple] = []
+
+    def _remember(self, state: AgentState, scalars: Dict[str, bytes]):
+        """Records what the decoder now knows, for the next delta."""
+        self._state = state
+        self._scalars = scalars
+        self._message_count = len(state.messages)
+        self._last_message = state.messages[-1] if state.messages else None
+        self._contexts = [_context_key(ctx) for ctx in state.plan_stack]
+
+    def _messages_are_appended(self, state: AgentState) -> bool:
+        """True if the known messages are still an unchanged prefix."""
+        count = self._message_count
+        if len(state.messages) < count:
+            return False
+        return count == 0 or state.messages[count - 1] is self._last_message
+
+    def encode(self, state: AgentState, delta: bool = True) -> bytes:
+        """Encodes `state`, as a delta against the previous snapshot when possible."""
+        _, dumps_payload, _ = CODECS[self.codec_id]
+        scalars = {name: dumps_payload(getattr(state, name)) for name in _SCALAR_FIELDS}
+
+        if not (delta and self._state is state and self._messages_are_appended(state)):
+            frame = _frame(KIND_FULL, state_to_dict(state), self.codec_id)
+            self._remember(state, scalars)
+            return frame
+
+        kept = 0
+        for known, ctx in zip(self._contexts, state.plan_stack):
+            if known != _context_key(ctx):
+                break
+            kept += 1
+
+        payload = {
+            "fields": {
+                name: getattr(state, name)
+                for name, encoded in scalars.items()
+                if self._scalars.get(name) != encoded
+            },
+            "messages": state.messages[self._message_count:],
+            "keep": kept,
+            "steps": [ctx.current_step for ctx in state.plan_stack[:kept]],
+            "push": [_encode_context(ctx) for ctx in state.plan_stack[kept:]],
+        }
+        frame = _frame(KIND_DELTA, payload, self.codec_id)
+        self._remember(state, scalars)
+        return frame
+
+
+class StateDecoder:
+    """Rebuilds an `AgentState` from a stream of full and delta snapshots."""
+
+    def __init__(self):
+        self.state: Optional[AgentState] = None
+
+    def decode(self, data: bytes) -> AgentState:
+        """Applies one snapshot frame and returns the current state."""
+        kind, payload = _unframe(data)
+        if kind == KIND_FULL:
+            self.state = state_from_dict(payload)
+            return self.state
+        if self.state is None:
+            raise ValueError("Received a delta snapshot before any full snapshot.")
+
+        state = self.state
+        for name, value in payload["fields"].items():
+            setattr(state, name, value)
+        state.messages.extend(payload["messages"])
+        kept = payload["keep"]
+        del state.plan_stack[kept:]
+        for ctx, step in zip(state.plan_stack, payload["steps"]):
+            ctx.current_step = step
+        state.plan_stack.extend(_decode_context(ctx) for ctx in payload["push"])
+        return state
+
+
+# --- Journal files ---
+
+
+def append_snapshot(journal_path: str, frame: bytes):
+    """Appends one length-prefixed snapshot frame to a journal file."""
+    with open(journal_path, "ab") as f:
+        f.write(_JOURNAL_LENGTH.pack(len(frame)) + frame)
+
+
+def read_snapshot_journal(journal_path: str) -> Optional[AgentState]:
+    """Replays a snapshot journal and returns the latest state it records."""
+    decoder = StateDecoder()
+    with open(journal_path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + _JOURNAL_LENGTH.size <= len(data):
+        (length,) = _JOURNAL_LENGTH.unpack_from(data, pos)
+        pos += _JOURNAL_LENGTH.size
+        if pos + length > len(data):
+            break  # A torn final frame from an interrupted write.
+        decoder.decode(data[pos:pos + length])
+        pos += length
+    return decoder.state
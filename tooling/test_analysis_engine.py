@@ -0,0 +1,104 @@
+"""
+Unit tests for the single-pass analyzer engine.
+"""
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tooling import analysis_engine, log_scan
+from tooling.analysis_engine import ANALYZERS, Analyzer, run_analyzers
+from tooling.self_improvement_cli import analyze_planning_efficiency, analyze_protocol_violations, main
+
+
+def _entry(i):
+    if i % 7 == 0:
+        return {"task": {"id": f"task-{i % 5}"}, "action": {"type": "PLAN_UPDATE"}}
+    if i % 11 == 0:
+        return {"task": {"id": f"task-{i}"}, "action": {"type": "TOOL_EXEC", "details": {"command": "reset_all"}}}
+    return {"task": {"id": f"task-{i}"}, "action": {"type": "TOOL_EXEC", "details": {"tool_name": "ls"}}}
+
+
+class EntryCounter(Analyzer):
+    """Counts entries; not registered, so the CLI does not run it."""
+
+    name = "entry-count"
+
+    def start(self):
+        return [0]
+
+    def on_entry(self, state, entry):
+        state[0] += 1
+
+    def merge(self, states):
+        return [sum(state[0] for state in states)]
+
+    def finalize(self, state):
+        return state[0]
+
+
+class TestAnalysisEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.test_dir, "activity.log.jsonl")
+        lines = [json.dumps(_entry(i)) for i in range(300)]
+        lines.insert(50, "not json")
+        lines.insert(60, "")
+        with open(self.log_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _analyzers(self):
+        return [cls() for cls in ANALYZERS.values()] + [EntryCounter()]
+
+    def test_entries_are_decoded_once_for_all_analyzers(self):
+        with patch.object(analysis_engine.json, "loads", wraps=json.loads) as loads:
+            result = run_analyzers(self.log_path, self._analyzers(), max_workers=1)
+        self.assertEqual(loads.call_count, 301)
+        self.assertEqual((result["entries"], result["malformed"]), (300, 1))
+        self.assertEqual(result["results"]["entry-count"], 300)
+        self.assertEqual(set(result["cpu"]), {"decode", "entry-count"} | set(ANALYZERS))
+
+    def test_results_match_single_analyses(self):
+        result = run_analyzers(self.log_path, self._analyzers(), max_workers=1)
+        self.assertEqual(result["results"]["planning-efficiency"], analyze_planning_efficiency(self.log_path))
+        self.assertEqual(result["results"]["protocol-violations"], analyze_protocol_violations(self.log_path))
+        self.assertEqual(len(result["results"]["protocol-violations"]), 24)
+
+    def test_parallel_shards_match_sequential_scan(self):
+        sequential = run_analyzers(self.log_path, self._analyzers(), max_workers=1)
+        with patch.object(analysis_engine, "CHUNK_SIZE", 7), patch.object(log_scan, "PARALLEL_SCAN_THRESHOLD", 0), \
+                patch.object(log_scan, "MAX_SHARD_SIZE", 1024):
+            sharded = run_analyzers(self.log_path, self._analyzers(), max_workers=3)
+        self.assertEqual(sharded["results"], sequential["results"])
+        self.assertEqual((sharded["entries"], sharded["malformed"]), (300, 1))
+
+    def test_cli_runs_all_analyzers_and_database_queries(self):
+        db_path = os.path.join(self.test_dir, "activity.sqlite3")
+        outputs = []
+        for extra in ([], ["--db", db_path]):
+            argv = ["self_improvement_cli", "--log-file", self.log_path, "--jobs", "1",
+                    "--analyzer", "planning-efficiency", "--analyzer", "protocol-violations"] + extra
+            with patch.object(sys, "argv", argv), patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                main()
+            outputs.append(stdout.getvalue())
+        scanned, queried = outputs
+        self.assertIn("300 log entries decoded once (1 malformed lines skipped)", scanned)
+        self.assertIn("All analyses ran as database queries.", queried)
+
+        def strip(text):
+            return text.split("Analyzer CPU Time")[0]
+
+        self.assertEqual(strip(scanned), strip(queried))
+        self.assertTrue(os.path.exists(db_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Unit tests for the compiled plan (`.planc`) cache.
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tooling import fdc_cli
+
+from tooling.compiled_plan import (
+    compile_plan,
+    compiled_plan_path,
+    load_compiled_plan,
+    load_plan,
+    record_validation,
+)
+from tooling.plan_parser import parse_plan
+
+
+class TestCompiledPlan(unittest.TestCase):
+
+    PLAN = (
+        "set_plan\n"
+        "  A multi-line plan\n"
+        "  # with a comment\n"
+        "  and a second line\n"
+        "\n"
+        "read_file\n"
+        "README.md\n"
+        "\n"
+        "read_file\n"
+        "AGENTS.md\n"
+        "\n"
+        "submit\n"
+    )
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.plan_path = os.path.join(self.test_dir, "plan.txt")
+        with open(self.plan_path, "w") as f:
+            f.write(self.PLAN)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip_matches_parser(self):
+        """A compiled plan loads back into the same commands and spans."""
+        compile_plan(self.plan_path)
+        self.assertTrue(os.path.exists(compiled_plan_path(self.plan_path)))
+
+        loaded = load_compiled_plan(self.plan_path)
+        expected = parse_plan(self.PLAN.encode("utf-8"))
+        self.assertEqual(loaded.commands, expected)
+        self.assertEqual([c.span for c in loaded.commands], [c.span for c in expected])
+        self.assertEqual(loaded.tool_names, ["set_plan", "read_file", "submit"])
+        self.assertIs(loaded.commands[1].tool_name, loaded.commands[2].tool_name)
+
+    def test_stale_artifact_is_ignored_and_rebuilt(self):
+        """Editing the source invalidates the artifact; load_plan recompiles it."""
+        compile_plan(self.plan_path)
+        with open(self.plan_path, "a") as f:
+            f.write("\nplan_step_complete\n")
+
+        self.assertIsNone(load_compiled_plan(self.plan_path))
+        commands = load_plan(self.plan_path).commands
+        self.assertEqual(commands[-1].tool_name, "plan_step_complete")
+        self.assertIsNotNone(load_compiled_plan(self.plan_path))
+
+    def test_corrupt_artifact_is_ignored(self):
+        """A truncated or foreign artifact is treated as missing."""
+        with open(compiled_plan_path(self.plan_path), "wb") as f:
+            f.write(b"not a compiled plan")
+        self.assertIsNone(load_compiled_plan(self.plan_path))
+        self.assertEqual(load_plan(self.plan_path).commands, parse_plan(self.PLAN))
+
+    def test_failed_artifact_write_is_reported(self):
+        """A plan is still returned when its artifact cannot be written, marked as not saved."""
+        self.assertTrue(compile_plan(self.plan_path).saved)
+        os.remove(compiled_plan_path(self.plan_path))
+        with patch("os.replace", side_effect=PermissionError):
+            compiled = compile_plan(self.plan_path)
+        self.assertFalse(compiled.saved)
+        self.assertEqual(compiled.commands, parse_plan(self.PLAN))
+        self.assertFalse(os.path.exists(compiled_plan_path(self.plan_path)))
+
+    def test_validation_summary_is_persisted(self):
+        """The FSM summary survives a reload and is dropped when the source changes."""
+        summary = {"fsm_path": "tooling/fdc_fsm.json", "fsm_sha256": "abc", "final_state": "DONE", "accepted": True}
+        record_validation(self.plan_path, summary)
+        self.assertEqual(load_compiled_plan(self.plan_path).fsm_summary, summary)
+
+        with open(self.plan_path, "w") as f:
+            f.write("submit\n")
+        self.assertIsNone(load_plan(self.plan_path).fsm_summary)
+
+    def test_cached_validation_tracks_sub_plans_and_registry(self):
+        """Editing a called sub-plan or the plan registry invalidates the parent's cached validation."""
+        fsm_path = os.path.join(self.test_dir, "fsm.json")
+        with open(fsm_path, "w") as f:
+            json.dump({
+                "transitions": {"IDLE": {"read_op": "DONE"}, "DONE": {"read_op": "DONE"}},
+                "start_state": "IDLE",
+                "accept_states": ["DONE"],
+            }, f)
+        paths = {}
+        for name, body in (("parent", "read_file a\ncall_plan sub\n"), ("sub", "read_file b\n"),
+                           ("broken", "submit\n")):
+            paths[name] = os.path.join(self.test_dir, f"{name}.txt")
+            with open(paths[name], "w") as f:
+                f.write(f"# FSM: {fsm_path}\n{body}")
+        registry_path = os.path.join(self.test_dir, "plan_registry.json")
+
+        def validate(sub):
+            with open(registry_path, "w") as f:
+                json.dump({"sub": paths[sub]}, f)
+            with patch.object(fdc_cli, "PLAN_REGISTRY_PATH", registry_path), \
+                    contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                fdc_cli.validate_plan(paths["parent"])
+
+        validate("sub")
+        self.assertIsNotNone(fdc_cli._cached_validation(paths["parent"]))
+        with self.assertRaises(SystemExit):
+            validate("broken")  # The registry now points at a broken sub-plan.
+
+        validate("sub")
+        with open(paths["sub"], "a") as f:
+            f.write("submit\n")
+        self.assertIsNone(fdc_cli._cached_validation(paths["parent"]))
+        with self.assertRaises(SystemExit):
+            validate("sub")
+
+    def test_validation_errors_report_source_lines(self):
+        """Validation errors name the plan line they were found on."""
+        with open(self.plan_path, "w") as f:
+            f.write("set_plan a plan\n\n  read_file README.md\n")
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr), \
+                self.assertRaises(SystemExit):
+            fdc_cli.validate_plan(self.plan_path)
+        self.assertIn("Error on line 3: Unexpected indentation.", stderr.getvalue())
+
+        with open(self.plan_path, "w") as f:
+            f.write("set_plan a plan\n\nfrobnicate\n")
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr), \
+                self.assertRaises(SystemExit):
+            fdc_cli.validate_plan(self.plan_path)
+        self.assertIn("Error on line 3: Unknown command 'frobnicate'.", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
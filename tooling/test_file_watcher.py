@@ -0,0 +1,83 @@
+"""
+Unit tests for the file watcher behind the `--watch` modes.
+"""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from tooling.file_watcher import FileWatcher, watch
+
+
+class TestFileWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.test_dir, "sub"))
+        self.existing = os.path.join(self.test_dir, "sub", "existing.py")
+        with open(self.existing, "w") as f:
+            f.write("x = 1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _check_backend(self, force_polling):
+        with FileWatcher([self.test_dir], poll_interval=0.05, force_polling=force_polling) as watcher:
+            self.assertEqual(watcher.wait(timeout=0.1), set())
+            time.sleep(0.01)
+            with open(self.existing, "a") as f:
+                f.write("y = 2\n")
+            created = os.path.join(self.test_dir, "created.py")
+            with open(created, "w") as f:
+                f.write("z = 3\n")
+            changed = set()
+            deadline = time.monotonic() + 2
+            while not {self.existing, created} <= changed and time.monotonic() < deadline:
+                changed |= watcher.wait(timeout=0.2)
+            self.assertLessEqual({self.existing, created}, changed)
+            return watcher.backend
+
+    def test_polling_detects_changes_recursively(self):
+        """The polling fallback reports modified and created files in subdirectories."""
+        self.assertEqual(self._check_backend(force_polling=True), "polling")
+
+    def test_native_backend_detects_changes_recursively(self):
+        """The native backend (inotify where available) reports the same changes."""
+        self._check_backend(force_polling=False)
+
+    def test_watch_debounces_a_burst_into_one_rebuild(self):
+        """A burst of edits triggers a single rebuild with every relevant path."""
+        rebuilds = []
+
+        def edit_burst():
+            time.sleep(0.2)
+            for i in range(5):
+                with open(os.path.join(self.test_dir, f"file{i}.py"), "w") as f:
+                    f.write("pass\n")
+                with open(os.path.join(self.test_dir, f"notes{i}.txt"), "w") as f:
+                    f.write("ignored\n")
+                time.sleep(0.02)
+
+        editor = threading.Thread(target=edit_burst)
+        editor.start()
+        with redirect_stdout(io.StringIO()) as out:
+            watch(
+                [self.test_dir],
+                rebuilds.append,
+                relevant=lambda path: path.endswith(".py"),
+                debounce=0.3,
+                poll_interval=0.05,
+                max_rebuilds=1,
+            )
+        editor.join()
+        self.assertEqual(len(rebuilds), 1)
+        self.assertEqual({os.path.basename(p) for p in rebuilds[0]}, {f"file{i}.py" for i in range(5)})
+        self.assertIn("ms after the first change", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,10 @@ import os
 import json
 import tempfile
 import shutil
+from unittest.mock import patch
+
+import tooling.knowledge_compiler as knowledge_compiler
+from tooling.knowledge_compiler import compile_postmortems, load_lessons_index
 from tooling.knowledge_compiler import main as compile_knowledge
 
 class TestKnowledgeCompiler(unittest.TestCase):
@@ -165,5 +169,86 @@ class TestKnowledgeCompilerAdvanced(unittest.TestCase):
         self.assertEqual(lesson3["action"]["command"], "placeholder")
 
 
+POSTMORTEM_TEMPLATE = """
+# Post-Mortem Report
+**Task ID:** `{task_id}`
+**Completion Date:** `2025-01-01`
+---
+## 3. Corrective Actions & Lessons Learned
+1.  **Lesson:** {lesson}
+    **Action:** Add tool '{tool}' to protocol 'fdc-protocol-001'.
+2.  **Lesson:** The agent needs to be more careful.
+    **Action:** This is a free-text action that is not machine-readable.
+---
+"""
+
+
+class TestKnowledgeCompilerBatch(unittest.TestCase):
+
+    def setUp(self):
+        """Writes a directory of post-mortems that share one lesson."""
+        self.test_dir = tempfile.mkdtemp()
+        self.postmortems_dir = os.path.join(self.test_dir, "postmortems")
+        os.mkdir(self.postmortems_dir)
+        self.lessons_path = os.path.join(self.test_dir, "knowledge_core", "lessons.jsonl")
+        self.paths = [self._write(i, f"Tool number {i} was missing.", f"tool_{i}") for i in range(20)]
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, i, lesson, tool):
+        path = os.path.join(self.postmortems_dir, f"2025-01-01-task-{i:02d}.md")
+        with open(path, "w") as f:
+            f.write(POSTMORTEM_TEMPLATE.format(task_id=f"task-{i}", lesson=lesson, tool=tool))
+        return path
+
+    def _lessons(self):
+        with open(self.lessons_path, "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_recompiling_skips_unchanged_postmortems_and_duplicate_lessons(self):
+        summary = compile_postmortems(self.paths, self.lessons_path, max_workers=1)
+        self.assertEqual(summary, {"compiled": 20, "skipped": 0, "added": 21, "duplicates": 19})
+        self.assertEqual(len(self._lessons()), 21)
+
+        self.assertEqual(compile_postmortems(self.paths, self.lessons_path)["skipped"], 20)
+        os.utime(self.paths[0], ns=(0, 0))  # Touched, but unchanged.
+        self.assertEqual(compile_postmortems(self.paths, self.lessons_path)["skipped"], 20)
+
+        # An edited post-mortem is re-parsed; only its new lesson is added, whatever its spacing and case.
+        self._write(0, "Tool number 0 was missing.\n    Also, TOOL   NUMBER 1 was missing.", "tool_0")
+        self._write(1, "TOOL   number 1 was missing.", "tool_1")
+        summary = compile_postmortems(self.paths, self.lessons_path, use_manifest=False)
+        self.assertEqual((summary["compiled"], summary["added"]), (20, 1))
+        self.assertEqual(len(self._lessons()), 22)
+
+    def test_index_is_rebuilt_when_the_lessons_file_changes(self):
+        compile_postmortems(self.paths[:2], self.lessons_path)
+        first = self._lessons()[0]
+        with open(self.lessons_path, "w") as f:
+            f.write(json.dumps(first) + "\n")
+        self.assertEqual(len(load_lessons_index(self.lessons_path)), 1)
+        summary = compile_postmortems(self.paths[:2], self.lessons_path)
+        # Both post-mortems lost a lesson, so neither is skipped.
+        self.assertEqual((summary["skipped"], summary["added"]), (0, 2))
+
+    def test_parallel_batch_matches_sequential(self):
+        with patch.object(knowledge_compiler, "PARALLEL_COMPILE_THRESHOLD", 1):
+            compile_postmortems(self.paths, self.lessons_path, max_workers=2)
+        parallel = [(lesson["task_id"], lesson["insight"]) for lesson in self._lessons()]
+        os.remove(self.lessons_path)
+        compile_postmortems(self.paths, self.lessons_path, max_workers=1, use_manifest=False)
+        self.assertEqual(parallel, [(lesson["task_id"], lesson["insight"]) for lesson in self._lessons()])
+
+    def test_main_compiles_the_postmortems_directory(self):
+        argv = ["tooling/knowledge_compiler.py", "--all", "--postmortems-dir", self.postmortems_dir]
+        with patch.object(knowledge_compiler, "KNOWLEDGE_CORE_PATH", self.lessons_path), \
+                patch("sys.argv", argv):
+            compile_knowledge()
+            compile_knowledge()
+        self.assertEqual(len(self._lessons()), 21)
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, "knowledge_core", "postmortems.manifest.json")))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
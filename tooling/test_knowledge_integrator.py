@@ -4,7 +4,8 @@ import tempfile
 from unittest.mock import patch, MagicMock
 from rdflib import Graph, Literal, URIRef
 
-from tooling import knowledge_integrator
+from tooling import knowledge_integrator, triple_index
+from tooling.triple_index import build_triple_index, open_triple_index
 
 class TestKnowledgeIntegrator(unittest.TestCase):
 
@@ -43,6 +44,26 @@ class TestKnowledgeIntegrator(unittest.TestCase):
         self.assertEqual(concepts, ["Python (programming language)"])
         self.assertIn("Extracted 1 unique concepts", msg)
 
+    def test_extract_concepts_from_triple_index(self):
+        """Concepts read from the triple index match those of the parsed graph."""
+        g, _ = knowledge_integrator.load_local_graph(self.input_graph_path)
+        with open_triple_index(self.input_graph_path) as index:
+            self.assertEqual(knowledge_integrator.extract_concepts(index), knowledge_integrator.extract_concepts(g))
+
+    @patch('tooling.knowledge_integrator.query_dbpedia')
+    def test_integration_without_external_triples_skips_parsing(self, mock_query_dbpedia):
+        """With nothing to merge, the local graph and its index are copied, not parsed."""
+        mock_query_dbpedia.return_value = (None, "No results")
+        build_triple_index(self.input_graph_path)
+        with patch.object(knowledge_integrator, "load_local_graph") as load_local_graph, \
+                patch.object(triple_index, "build_triple_index") as build:
+            summary = knowledge_integrator.run_knowledge_integration(self.input_graph_path, self.output_graph_path)
+            with open_triple_index(self.output_graph_path) as index:
+                self.assertEqual(len(index), 1)
+        load_local_graph.assert_not_called()
+        build.assert_not_called()
+        self.assertIn("Initial triples: 1, Added: 0, Final triples: 1.", summary)
+
     @patch('tooling.knowledge_integrator.requests.get')
     def test_query_dbpedia_success(self, mock_get):
         """Test a successful query to DBPedia, mocking the HTTP request."""
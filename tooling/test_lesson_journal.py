@@ -0,0 +1,88 @@
+"""
+Unit tests for the append-only lesson status journal.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tooling import lesson_journal
+from tooling.lesson_journal import (
+    compact_if_due,
+    journal_path,
+    load_lessons,
+    load_pending_index,
+    load_pending_lessons,
+    record_statuses,
+    save_lessons,
+)
+
+
+def _lesson(i, status="pending"):
+    return {"lesson_id": f"l{i}", "insight": f"Lesson {i}", "action": {}, "status": status}
+
+
+class TestLessonJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.lessons_path = os.path.join(self.test_dir, "lessons.jsonl")
+        with open(self.lessons_path, "w") as f:
+            for i in range(100):
+                f.write(json.dumps(_lesson(i, "pending" if i % 10 == 0 else "applied")) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _ids(self, lessons):
+        return [lesson["lesson_id"] for lesson in lessons]
+
+    def test_statuses_are_journaled_without_rewriting_the_lessons_file(self):
+        with open(self.lessons_path, "rb") as f:
+            before = f.read()
+        record_statuses(self.lessons_path, {"l0": "applied", "l10": "failed", "l5": "pending"})
+        with open(self.lessons_path, "rb") as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(
+            self._ids(load_pending_lessons(self.lessons_path)),
+            ["l5", "l20", "l30", "l40", "l50", "l60", "l70", "l80", "l90"],
+        )
+        statuses = {lesson["lesson_id"]: lesson["status"] for lesson in load_lessons(self.lessons_path)}
+        self.assertEqual((statuses["l0"], statuses["l10"], statuses["l5"]), ("applied", "failed", "pending"))
+
+    def test_pending_lessons_are_read_without_scanning_the_history(self):
+        load_pending_index(self.lessons_path)
+        with open(self.lessons_path, "a") as f:  # As the knowledge compiler appends.
+            f.write(json.dumps(_lesson(100)) + "\n")
+        record_statuses(self.lessons_path, {"l20": "applied"})
+        with patch.object(lesson_journal, "_decode", wraps=lesson_journal._decode) as decode:
+            pending = load_pending_lessons(self.lessons_path)
+        self.assertEqual(decode.call_count, 0)
+        self.assertEqual(self._ids(pending), ["l0", "l10", "l30", "l40", "l50", "l60", "l70", "l80", "l90", "l100"])
+
+    def test_rewritten_lessons_file_rebuilds_the_index(self):
+        load_pending_index(self.lessons_path)
+        with open(self.lessons_path, "w") as f:
+            for i in range(200, 205):
+                f.write(json.dumps(_lesson(i)) + "\n")
+        self.assertEqual(self._ids(load_pending_lessons(self.lessons_path)), ["l200", "l201", "l202", "l203", "l204"])
+
+    def test_compaction_folds_the_journal_into_the_lessons_file(self):
+        record_statuses(self.lessons_path, {"l0": "applied"})
+        self.assertFalse(compact_if_due(self.lessons_path, threshold=2))
+        record_statuses(self.lessons_path, {"l10": "failed"})
+        self.assertTrue(compact_if_due(self.lessons_path, threshold=2))
+        self.assertFalse(os.path.exists(journal_path(self.lessons_path)))
+        with open(self.lessons_path, "r") as f:
+            lessons = [json.loads(line) for line in f]
+        self.assertEqual((lessons[0]["status"], lessons[10]["status"]), ("applied", "failed"))
+        self.assertEqual(len(load_pending_lessons(self.lessons_path)), 8)
+
+        save_lessons(self.lessons_path, [_lesson(1)])
+        self.assertEqual(self._ids(load_pending_lessons(self.lessons_path)), ["l1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Unit tests for the SQLite activity log index and the log_query CLI.
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tooling import log_db, log_query
+from tooling.protocol_auditor import get_tool_usage
+from tooling.self_improvement_cli import analyze_planning_efficiency, analyze_protocol_violations
+from utils.log_segments import rotate_log
+
+
+def _entry(i):
+    entry = {
+        "session_id": f"session-{i // 50}",
+        "timestamp": f"2025-10-06T{i // 60:02d}:{i % 60:02d}:00+00:00",
+        "phase": "Phase 5",
+        "task": {"id": f"task-{i % 7}", "plan_step": i},
+        "action": {"type": "TOOL_EXEC", "details": {"tool_name": f"tool_{i % 5}"}},
+        "outcome": {"status": "FAILURE" if i % 9 == 0 else "SUCCESS"},
+    }
+    if i % 4 == 0:
+        entry["action"] = {"type": "PLAN_UPDATE", "details": {}}
+    if i % 23 == 0:
+        entry["action"] = {"type": "TOOL_EXEC", "details": {"command": "reset_all --force"}}
+    return entry
+
+
+class TestLogDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.test_dir, "activity.log.jsonl")
+        self.db_path = os.path.join(self.test_dir, "activity.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _append(self, entries, tail=""):
+        with open(self.log_path, "a") as f:
+            for i in entries:
+                f.write(json.dumps(_entry(i)) + "\n")
+            f.write(tail)
+
+    def _count(self):
+        with contextlib.closing(log_db.connect(self.db_path)) as conn:
+            return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def test_ingestion_is_incremental_across_rotations(self):
+        """Each entry is inserted once, whether appended, partial or rotated out."""
+        self._append(range(0, 100), tail="not json\n")
+        self.assertEqual(log_db.ingest(self.log_path, self.db_path), 100)
+        line = json.dumps(_entry(100)) + "\n"
+        self._append(range(101, 150), tail=line[:20])
+        self.assertEqual(log_db.ingest(self.log_path, self.db_path), 49)
+        with open(self.log_path, "a") as f:
+            f.write(line[20:])
+        rotate_log(self.log_path)
+        self._append(range(150, 200))
+        self.assertEqual(log_db.ingest(self.log_path, self.db_path), 51)
+        self.assertEqual(log_db.ingest(self.log_path, self.db_path), 0)
+        self.assertEqual(self._count(), 200)
+
+        with open(self.log_path, "w") as f:  # Rewritten: the database is rebuilt.
+            f.write(json.dumps(_entry(0)) + "\n")
+        log_db.ingest(self.log_path, self.db_path)
+        self.assertEqual(self._count(), 151)
+
+    def test_analyzers_match_the_log_scans(self):
+        """The indexed queries return what the scanning analyzers return."""
+        self._append(range(300))
+        since = "2025-10-06T02:00:00+00:00"
+        for kwargs in ({}, {"since": since}):
+            with self.subTest(**kwargs):
+                self.assertEqual(
+                    analyze_planning_efficiency(self.log_path, 1, db_path=self.db_path, **kwargs),
+                    analyze_planning_efficiency(self.log_path, 1, **kwargs),
+                )
+                self.assertEqual(
+                    sorted(analyze_protocol_violations(self.log_path, 1, db_path=self.db_path, **kwargs)),
+                    sorted(analyze_protocol_violations(self.log_path, 1, **kwargs)),
+                )
+        with contextlib.closing(log_db.connect(self.db_path)) as conn:
+            self.assertEqual(log_db.tool_usage(conn), get_tool_usage(self.log_path))
+
+    def test_log_query_cli(self):
+        self._append(range(100))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            log_query.main(["--log-file", self.log_path, "--db", self.db_path,
+                            "--status", "FAILURE", "--group-by", "phase", "--format", "json"])
+        self.assertEqual(json.loads(output.getvalue()), {"phase": "Phase 5", "count": 12})
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            log_query.main(["--db", self.db_path, "--no-ingest", "--task", "task-3", "--limit", "2"])
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn("2025-10-06T00:03:00", lines[1])
+
+        with patch("sys.stderr", io.StringIO()), self.assertRaises(SystemExit):
+            log_query.main(["--db", self.db_path, "--no-ingest", "--group-by", "nonsense"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Unit tests for the sharded parallel log scan.
+"""
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+from tooling import log_scan
+from tooling.log_scan import LogScanner, last_complete_line, scan_log, shard_ranges
+from tooling.protocol_auditor import ToolUsageScanner, get_used_tools_from_log
+from tooling.self_improvement_cli import PlanningEfficiencyScanner, ProtocolViolationScanner
+
+
+class LineCollector(LogScanner):
+    """Returns every line, in order, to check shard coverage."""
+
+    def scan_lines(self, lines):
+        return list(lines)
+
+    def merge(self, partials):
+        return [line for partial in partials for line in partial]
+
+
+def _entry(i):
+    if i % 7 == 0:
+        return {"task": {"id": f"task-{i % 5}"}, "action": {"type": "PLAN_UPDATE"}}
+    if i % 11 == 0:
+        return {"task": {"id": f"task-{i}"}, "action": {"type": "TOOL_EXEC", "details": {"command": "reset_all"}}}
+    return {"task": {"id": f"task-{i}"}, "action": {"type": "TOOL_EXEC", "details": {"tool_name": f"tool_{i % 13}"}}}
+
+
+class TestLogScan(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.test_dir, "activity.log.jsonl")
+        lines = [json.dumps(_entry(i)) for i in range(500)]
+        lines.insert(100, "not json")
+        lines.insert(200, "")
+        with open(self.log_path, "w") as f:
+            f.write("\n".join(lines) + "\n" + json.dumps(_entry(1)))  # No final newline.
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _parallel(self, scanner, **kwargs):
+        with patch.object(log_scan, "PARALLEL_SCAN_THRESHOLD", 0), patch.object(log_scan, "MAX_SHARD_SIZE", 4096):
+            return scan_log(self.log_path, scanner, max_workers=3, **kwargs)
+
+    def test_shards_are_newline_aligned_and_cover_the_range(self):
+        """Shards are contiguous, and each ends just after a newline or at the end."""
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = shard_ranges(mm, 10, len(mm), 9)
+            self.assertEqual(ranges[0][0], 10)
+            self.assertEqual(ranges[-1][1], len(mm))
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(end, start)
+                self.assertEqual(mm[end - 1:end], b"\n")
+
+    def test_parallel_scan_matches_sequential_scan(self):
+        """Every scanner returns the same result with shards and worker processes."""
+        with open(self.log_path, "rb") as f:
+            expected_lines = f.read().split(b"\n")
+        self.assertEqual(self._parallel(LineCollector()), expected_lines)
+        for scanner in (ToolUsageScanner(), PlanningEfficiencyScanner(), ProtocolViolationScanner()):
+            with self.subTest(scanner=type(scanner).__name__):
+                self.assertEqual(self._parallel(scanner), scan_log(self.log_path, scanner, max_workers=1))
+        self.assertEqual(
+            Counter(self._parallel(ToolUsageScanner())["total"]), Counter(get_used_tools_from_log(self.log_path))
+        )
+
+    def test_ranges_and_partial_lines(self):
+        """A scan can stop at the last complete line and resume from there."""
+        line_start, end = last_complete_line(self.log_path)
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+        self.assertEqual(end, data.rindex(b"\n") + 1)
+        self.assertEqual(line_start, data.rindex(b"\n", 0, end - 1) + 1)
+        head = self._parallel(LineCollector(), end=end)
+        tail = self._parallel(LineCollector(), start=end)
+        self.assertEqual(head + tail, data.split(b"\n"))
+        self.assertIsNone(last_complete_line(self.log_path, end))
+
+    def test_empty_log(self):
+        """An empty log yields the scanner's empty result."""
+        open(self.log_path, "w").close()
+        self.assertEqual(scan_log(self.log_path, LineCollector()), [])
+        self.assertIsNone(last_complete_line(self.log_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Unit tests for the single-pass plan parser.
+
+These tests check that `parse_plan` keeps the exact semantics of the original
+split-based parser (blank-line separated blocks, comment handling, argument
+stripping) while additionally recording source spans and deferring the
+materialization of argument text.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tooling import plan_parser
+from tooling.plan_parser import Command, CommandTable, parse_plan, parse_plan_file, plan_line_commands
+
+
+def _reference_parse(plan_content):
+    """The original split-based parser, used as the behavioural oracle."""
+    commands = []
+    for block in plan_content.strip().split("\n\n"):
+        block = block.strip()
+        if not block or block.startswith("#"):
+            continue
+        lines = [line for line in block.split("\n") if not line.strip().startswith("#")]
+        if not lines:
+            continue
+        commands.append(Command(tool_name=lines[0].strip(), args_text="\n".join(lines[1:]).strip()))
+    return commands
+
+
+class TestPlanParser(unittest.TestCase):
+
+    PLAN = (
+        "# Leading comment block\n"
+        "\n"
+        "set_plan\n"
+        "  The plan body\n"
+        "  # an inline comment\n"
+        "  continues here\n"
+        "\n"
+        "\n"
+        "   \n"
+        "plan_step_complete\n"
+        "\n"
+        "run_in_bash_session\n"
+        "echo 'issue #42'\n"
+    )
+
+    def test_matches_reference_parser(self):
+        """The new parser yields the same commands as the original parser."""
+        cases = [
+            self.PLAN,
+            "",
+            "\n\n\n",
+            "tool_only",
+            "a\n\n\nb\nargs",
+            "  \n# skipped\ntool\nargs\n\nnext",
+            "tool\n# c1\narg1\n# c2\narg2\n# c3",
+            "tool\r\nargs\r\n\r\nother",
+        ]
+        for case in cases:
+            with self.subTest(case=case):
+                self.assertEqual(parse_plan(case), _reference_parse(case))
+
+    def test_records_source_spans(self):
+        """Each command records the offsets and lines it was parsed from."""
+        commands = parse_plan(self.PLAN)
+        self.assertEqual([c.tool_name for c in commands], ["set_plan", "plan_step_complete", "run_in_bash_session"])
+
+        set_plan = commands[0]
+        self.assertEqual(set_plan.span.line, 3)
+        self.assertEqual(set_plan.span.end_line, 6)
+        self.assertEqual(self.PLAN[set_plan.span.start:set_plan.span.end].splitlines()[0], "set_plan")
+        self.assertEqual(set_plan.args_text, "The plan body\n  continues here")
+
+        self.assertEqual(commands[1].line, 10)
+        self.assertEqual(commands[2].span.line, 12)
+        self.assertEqual(commands[2].span.end_line, 13)
+
+    def test_args_text_is_materialized_lazily(self):
+        """Argument text is only decoded from the buffer on first access."""
+        commands = parse_plan(b"tool\nsome args\n\nother")
+        with patch.object(plan_parser, "_materialize", wraps=plan_parser._materialize) as materialize:
+            self.assertEqual(materialize.call_count, 0)
+            self.assertEqual(commands[0].args_text, "some args")
+            self.assertEqual(commands[0].args_text, "some args")
+            self.assertEqual(materialize.call_count, 1)
+
+    def test_parse_plan_file_uses_mmap_for_large_files(self):
+        """Large plan files are memory-mapped and parse to the same commands."""
+        content = "".join(f"read_file\nfile_{i}.txt\n\n" for i in range(50))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "plan.txt")
+            with open(path, "w") as f:
+                f.write(content)
+            with patch.object(plan_parser, "MMAP_THRESHOLD_BYTES", 1):
+                commands = parse_plan_file(path)
+            self.assertEqual(commands, _reference_parse(content))
+            self.assertEqual(commands[-1].span.line, 148)
+
+    def test_line_commands_keep_indentation_and_lines(self):
+        """The validator's line view has one lazy command per non-blank line."""
+        content = "# FSM: tooling/fdc_fsm.json\n\nfor_each_file\n  read_file {file1}  \n \t\nsubmit"
+        with patch.object(plan_parser, "_materialize", wraps=plan_parser._materialize) as materialize:
+            lines = plan_line_commands(content)
+            self.assertEqual(materialize.call_count, 0)
+        self.assertEqual([(indent, c.tool_name, c.line) for indent, c in lines],
+                         [(0, "#", 1), (0, "for_each_file", 3), (2, "read_file", 4), (0, "submit", 6)])
+        self.assertEqual([c.args_text for _, c in lines], ["FSM: tooling/fdc_fsm.json", "", "{file1}", ""])
+
+    def test_tool_names_are_interned(self):
+        """Repeated tool names share a single string object."""
+        commands = parse_plan("".join(f"read_file\nf{i}\n\n" for i in range(3)))
+        self.assertIs(commands[0].tool_name, commands[2].tool_name)
+
+
+class TestCommandTable(unittest.TestCase):
+
+    def test_table_matches_list_parse(self):
+        """The array-backed table yields the same commands and spans as parse_plan."""
+        plan = TestPlanParser.PLAN + "\nsubmit\n\nread_file\n# c\na\n# d\nb\n"
+        table = CommandTable.from_source(plan)
+        commands = parse_plan(plan)
+
+        self.assertEqual(len(table), len(commands))
+        self.assertEqual(table, commands)
+        self.assertEqual([c.span for c in table], [c.span for c in commands])
+        self.assertEqual(table[-1].args_text, "a\nb")
+        self.assertEqual(table[1:3], commands[1:3])
+        self.assertEqual(len(table.tool_names), 5)
+        with self.assertRaises(IndexError):
+            table[len(commands)]
+
+
+if __name__ == "__main__":
+    unittest.main()
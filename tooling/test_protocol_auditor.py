@@ -1,8 +1,11 @@
 import unittest
 import os
 import json
+import shutil
 import sys
+import tempfile
 from unittest.mock import patch, mock_open
+from utils.log_segments import rotate_log
 
 # Ensure the tooling directory is in the path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
@@ -79,6 +82,8 @@ This is not a JSON line and should be skipped.
             expected_tools = ["tool_A", "tooling/some_script.py", "tool_D", "run_in_bash_session"]
             self.assertCountEqual(used_tools, expected_tools)
 
+    @patch.object(protocol_auditor, "AUDIT_STATE_FILE", None)
+    @patch.object(protocol_auditor, "PROTOCOL_INDEX_FILE", None)
     @patch('tooling.protocol_auditor.run_protocol_source_check')
     def test_end_to_end_report_generation(self, mock_source_check):
         """
@@ -131,5 +136,110 @@ This is not a JSON line and should be skipped.
         self.assertIn("| `tooling/some_script.py` | 1 |", written_content)
         self.assertIn("| `tool_D` | 1 |", written_content)
 
+
+def _tool_line(tool_name):
+    return json.dumps({"action": {"type": "TOOL_EXEC", "details": {"tool_name": tool_name}}}) + "\n"
+
+
+class TestIncrementalLogScan(unittest.TestCase):
+    """Tests for the persisted, incremental scan of the activity log."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.test_dir, "activity.log.jsonl")
+        self.state_path = os.path.join(self.test_dir, "auditor.state.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _append(self, text):
+        with open(self.log_path, "a") as f:
+            f.write(text)
+
+    def _scan(self):
+        with patch.object(protocol_auditor, "_tool_execs_in_line", wraps=protocol_auditor._tool_execs_in_line) as decode:
+            counts = protocol_auditor.get_tool_usage(self.log_path, self.state_path)
+        return counts, decode.call_count
+
+    def test_only_appended_lines_are_decoded(self):
+        """A second run decodes only the new lines and matches a full scan."""
+        self._append(_tool_line("tool_A") + _tool_line("tool_B") + "not json\n")
+        counts, decoded = self._scan()
+        self.assertEqual(counts, {"tool_A": 1, "tool_B": 1})
+        self.assertEqual(decoded, 3)
+
+        self._append(_tool_line("tool_A") + _tool_line("tool_C"))
+        counts, decoded = self._scan()
+        self.assertEqual(decoded, 2)
+        self.assertEqual(counts, {"tool_A": 2, "tool_B": 1, "tool_C": 1})
+        self.assertEqual(counts, protocol_auditor.get_tool_usage(self.log_path))
+
+        counts, decoded = self._scan()
+        self.assertEqual(decoded, 0)
+        self.assertEqual(counts, {"tool_A": 2, "tool_B": 1, "tool_C": 1})
+
+    def test_partial_trailing_line_waits_for_its_newline(self):
+        """A line still being written is counted once it is complete."""
+        line = _tool_line("tool_A")
+        self._append(_tool_line("tool_B") + line[:10])
+        counts, _ = self._scan()
+        self.assertEqual(counts, {"tool_B": 1})
+        self._append(line[10:])
+        counts, decoded = self._scan()
+        self.assertEqual(decoded, 1)
+        self.assertEqual(counts, {"tool_A": 1, "tool_B": 1})
+
+    def test_truncated_or_rewritten_log_is_rescanned(self):
+        """Truncation and in-place rewrites rebuild the counts from the start."""
+        self._append(_tool_line("tool_A") * 3)
+        self._scan()
+        with open(self.log_path, "w") as f:
+            f.write(_tool_line("tool_B"))
+        counts, _ = self._scan()
+        self.assertEqual(counts, {"tool_B": 1})
+
+        with open(self.log_path, "w") as f:
+            f.write(_tool_line("tool_C") + _tool_line("tool_D"))
+        counts, _ = self._scan()
+        self.assertEqual(counts, {"tool_C": 1, "tool_D": 1})
+
+    def test_rotated_log_is_rescanned(self):
+        """A log replaced by a new file is scanned from the start."""
+        self._append(_tool_line("tool_A"))
+        self._scan()
+        os.rename(self.log_path, self.log_path + ".1")
+        self._append(_tool_line("tool_A"))
+        counts, decoded = self._scan()
+        self.assertEqual(decoded, 1)
+        self.assertEqual(counts, {"tool_A": 1})
+
+    def test_segments_rotated_by_the_logger_are_read_once(self):
+        """Rotated segments resume the previous scan; each line is decoded once."""
+        self._append(_tool_line("tool_A") + _tool_line("tool_B"))
+        self._scan()
+        self._append(_tool_line("tool_C") + _tool_line("tool_A")[:10])
+        rotate_log(self.log_path)
+        self._append(_tool_line("tool_D"))
+        rotate_log(self.log_path, compression="lzma")
+        self._append(_tool_line("tool_E"))
+        counts, decoded = self._scan()
+        self.assertEqual(decoded, 4)  # tool_C, the partial line, tool_D and tool_E.
+        self.assertEqual(counts, {"tool_A": 1, "tool_B": 1, "tool_C": 1, "tool_D": 1, "tool_E": 1})
+        self.assertEqual(counts, protocol_auditor.get_tool_usage(self.log_path))
+
+        os.remove(self.state_path)
+        counts, _ = self._scan()
+        self.assertEqual(counts, protocol_auditor.get_tool_usage(self.log_path))
+
+    def test_unreadable_state_falls_back_to_a_full_scan(self):
+        """A corrupt state file is ignored and rewritten."""
+        self._append(_tool_line("tool_A"))
+        with open(self.state_path, "w") as f:
+            f.write("{not json")
+        counts, _ = self._scan()
+        self.assertEqual(counts, {"tool_A": 1})
+        self.assertEqual(protocol_auditor.load_audit_state(self.state_path)["offset"], os.path.getsize(self.log_path))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
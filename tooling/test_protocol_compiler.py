@@ -0,0 +1,292 @@
+"""
+Unit tests for the protocol compiler's incremental builds.
+"""
+import io
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from rdflib import Graph
+
+from tooling import protocol_auditor, protocol_compiler, protocol_index
+from tooling.protocol_auditor import get_protocol_tools
+from tooling.protocol_index import load_protocol_index, protocol_index_path, stale_sources
+from tooling.protocol_updater import find_protocol_file
+from tooling.protocol_compiler import (
+    DEFAULT_SCHEMA_FILE,
+    build_manifest_path,
+    compile_protocols,
+    compile_targets,
+    load_build_inputs,
+    load_schema,
+    validate_protocol_files,
+    validate_protocols,
+)
+
+
+def _protocol(protocol_id, description):
+    return {
+        "protocol_id": protocol_id,
+        "description": description,
+        "rules": [{"rule_id": f"{protocol_id}-rule", "description": "A rule.", "enforcement": "Manual."}],
+        "associated_tools": ["tooling/fdc_cli.py"],
+    }
+
+
+class TestIncrementalCompilation(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.test_dir, "protocols")
+        os.makedirs(self.source_dir)
+        self.target_file = os.path.join(self.test_dir, "AGENTS.md")
+        self.kg_file = os.path.join(self.test_dir, "protocols.ttl")
+        self._write("01_alpha.protocol.json", json.dumps(_protocol("alpha", "First.")))
+        self._write("01_alpha.protocol.md", "# Alpha\n")
+        self._write("02_beta.protocol.json", json.dumps(_protocol("beta", "Second.")))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.source_dir, name), "w") as f:
+            f.write(content)
+
+    def _compile(self, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            compile_protocols(
+                self.source_dir, self.target_file, DEFAULT_SCHEMA_FILE, knowledge_graph_file=self.kg_file, **kwargs
+            )
+        with open(self.target_file) as f:
+            return f.read()
+
+    def test_only_changed_protocols_are_rebuilt(self):
+        """A second build reuses cached fragments and rebuilds only edited protocols."""
+        first = self._compile()
+        self.assertTrue(os.path.exists(build_manifest_path(self.target_file)))
+
+        build = protocol_compiler._build_protocol_entry
+        with patch.object(protocol_compiler, "_build_protocol_entry", wraps=build) as build_entry:
+            self.assertEqual(self._compile(), first)
+            self.assertEqual(build_entry.call_count, 0)
+
+            self._write("02_beta.protocol.json", json.dumps(_protocol("beta", "Changed.")))
+            output = self._compile()
+            self.assertEqual(build_entry.call_count, 1)
+        self.assertIn('"description": "Changed."', output)
+        self.assertIn("# Alpha", output)
+
+    def test_moved_sources_are_rebuilt(self):
+        """Cached triples hold absolute IRIs, so a moved source directory is rebuilt."""
+        self._compile()
+        moved_dir = os.path.join(self.test_dir, "moved")
+        os.rename(self.source_dir, moved_dir)
+        self.source_dir = moved_dir
+        build = protocol_compiler._build_protocol_entry
+        with patch.object(protocol_compiler, "_build_protocol_entry", wraps=build) as build_entry:
+            self._compile()
+        self.assertEqual(build_entry.call_count, 2)
+        with open(self.kg_file) as f:
+            self.assertIn(moved_dir, f.read())
+
+    def test_cached_graph_matches_full_rebuild(self):
+        """The graph reassembled from cached triples equals a fresh rebuild."""
+        self._compile()
+        self._compile()
+        cached = Graph().parse(self.kg_file, format="turtle")
+        self._compile(use_cache=False)
+        fresh = Graph().parse(self.kg_file, format="turtle")
+        self.assertEqual(len(cached), len(fresh))
+        self.assertEqual(set(cached.predicates()), set(fresh.predicates()))
+
+    def test_invalid_protocols_are_not_cached(self):
+        """A protocol that fails validation is retried on every build."""
+        self._write("03_broken.protocol.json", json.dumps({"protocol_id": "broken"}))
+        self._compile()
+        with open(build_manifest_path(self.target_file)) as f:
+            manifest = json.load(f)
+        self.assertEqual(sorted(manifest["protocols"]), ["01_alpha.protocol.json", "02_beta.protocol.json"])
+
+
+class TestProtocolIndex(unittest.TestCase):
+    """The protocol index written next to the output file, and its readers."""
+
+    setUp = TestIncrementalCompilation.setUp
+    tearDown = TestIncrementalCompilation.tearDown
+    _write = TestIncrementalCompilation._write
+    _compile = TestIncrementalCompilation._compile
+
+    def test_index_maps_protocols_to_rules_and_tools(self):
+        """The index lists each valid protocol with its file, rules and tools."""
+        self._write("03_broken.protocol.json", json.dumps({"protocol_id": "broken"}))
+        self._compile()
+        self._compile()  # Rebuilt from the manifest cache.
+        index = load_protocol_index(protocol_index_path(self.target_file))
+        self.assertEqual(sorted(index["protocols"]), ["alpha", "beta"])
+        alpha = index["protocols"]["alpha"]
+        self.assertEqual(alpha["file"], os.path.join(self.source_dir, "01_alpha.protocol.json"))
+        self.assertEqual(alpha["associated_tools"], ["tooling/fdc_cli.py"])
+        self.assertEqual(alpha["rules"], {"alpha-rule": {"associated_tools": []}})
+
+    def test_readers_agree_with_the_markdown(self):
+        """The auditor and the updater get the same answers from the index as from the sources."""
+        self._compile()
+        index_file = protocol_index_path(self.target_file)
+        self.assertEqual(get_protocol_tools(self.target_file, index_file), get_protocol_tools(self.target_file))
+        with patch("tooling.protocol_updater.glob.glob") as scan:
+            self.assertEqual(
+                find_protocol_file("beta", self.source_dir, index_file),
+                os.path.join(self.source_dir, "02_beta.protocol.json"),
+            )
+            scan.assert_not_called()
+
+    def test_updater_falls_back_when_the_index_is_stale(self):
+        """A protocol moved to another file since the last build is found by scanning."""
+        self._compile()
+        os.rename(
+            os.path.join(self.source_dir, "02_beta.protocol.json"), os.path.join(self.source_dir, "05_beta.protocol.json")
+        )
+        self.assertEqual(
+            find_protocol_file("beta", self.source_dir, protocol_index_path(self.target_file)),
+            os.path.join(self.source_dir, "05_beta.protocol.json"),
+        )
+
+    def test_stale_sources_rehash_only_touched_files(self):
+        """Touched files are rehashed once; only content changes and new files are stale."""
+        self._compile()
+        index = load_protocol_index(protocol_index_path(self.target_file))
+        alpha = os.path.join(self.source_dir, "01_alpha.protocol.json")
+        self.assertIn(alpha, index["sources"])
+        self.assertIn(os.path.abspath(DEFAULT_SCHEMA_FILE), index["sources"])
+
+        known = {}
+        with patch("tooling.protocol_index.file_sha256", wraps=protocol_index.file_sha256) as rehash:
+            self.assertEqual(stale_sources(index, known), [])
+            self.assertEqual(rehash.call_count, 0)
+            os.utime(alpha, ns=(0, 0))  # A checkout that only changes the mtime.
+            self.assertEqual(stale_sources(index, known), [])
+            self.assertEqual(stale_sources(index, known), [])
+            self.assertEqual(rehash.call_count, 1)
+
+        self._write("02_beta.protocol.json", json.dumps(_protocol("beta", "Changed.")))
+        self._write("03_gamma.protocol.json", json.dumps(_protocol("gamma", "New.")))
+        self.assertEqual(
+            stale_sources(index, known),
+            [os.path.join(self.source_dir, name) for name in ("02_beta.protocol.json", "03_gamma.protocol.json")],
+        )
+
+    def test_auditor_source_check_uses_the_index(self):
+        """The auditor reports exactly which sources changed since compilation."""
+        self._compile()
+        cache_file = os.path.join(self.test_dir, "sources.json")
+        with patch.multiple(
+            protocol_auditor,
+            AGENTS_FILE=self.target_file,
+            PROTOCOL_INDEX_FILE=protocol_index_path(self.target_file),
+            SOURCE_CHECK_CACHE_FILE=cache_file,
+            ROOT_DIR=self.test_dir,
+        ):
+            os.utime(os.path.join(self.source_dir, "01_alpha.protocol.json"), ns=(2**62, 2**62))
+            self.assertEqual(protocol_auditor.run_protocol_source_check()["status"], "success")
+            self.assertTrue(os.path.exists(cache_file))
+            self._write("01_alpha.protocol.md", "# Alpha, edited\n")
+            result = protocol_auditor.run_protocol_source_check()
+        self.assertEqual(result["status"], "warning")
+        self.assertIn("protocols/01_alpha.protocol.md", result["details"])
+
+
+class TestMultiTargetBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.targets = []
+        for name in ("main", "security"):
+            source_dir = os.path.join(self.test_dir, name)
+            os.makedirs(source_dir)
+            with open(os.path.join(source_dir, "01_p.protocol.json"), "w") as f:
+                json.dump(_protocol(f"{name}-protocol", f"The {name} protocol."), f)
+            self.targets.append((source_dir, os.path.join(self.test_dir, f"{name}.md"), None))
+        self.targets[0] = self.targets[0][:2] + (os.path.join(self.test_dir, "main.ttl"),)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_targets_build_in_parallel_with_shared_inputs(self):
+        """One call builds every target, loading the schema only once."""
+        load_schema_calls = []
+        real_load_schema = protocol_compiler.load_schema
+
+        def counting_load_schema(schema_file):
+            load_schema_calls.append(schema_file)
+            return real_load_schema(schema_file)
+
+        with patch.object(protocol_compiler, "load_schema", counting_load_schema):
+            with redirect_stdout(io.StringIO()) as out:
+                compile_targets(self.targets, DEFAULT_SCHEMA_FILE, max_workers=2)
+        self.assertEqual(len(load_schema_calls), 1)
+        for name, (_, target_file, _) in zip(("main", "security"), self.targets):
+            with open(target_file) as f:
+                self.assertIn(f"The {name} protocol.", f.read())
+        self.assertTrue(os.path.exists(self.targets[0][2]))
+        self.assertIn("security.md", out.getvalue())
+
+    def test_build_inputs_survive_pickling(self):
+        """Shared inputs can be sent to worker processes; the validator is rebuilt there."""
+        with redirect_stdout(io.StringIO()):
+            inputs = load_build_inputs(DEFAULT_SCHEMA_FILE)
+        inputs.validator
+        restored = pickle.loads(pickle.dumps(inputs))
+        self.assertEqual(restored.schema_digest, inputs.schema_digest)
+        self.assertEqual(restored.mapping.terms, inputs.mapping.terms)
+        self.assertFalse(list(restored.validator.iter_errors(_protocol("p", "Valid."))))
+
+
+class TestValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.schema = load_schema(DEFAULT_SCHEMA_FILE)
+        self.paths = []
+        for i in range(6):
+            data = _protocol(f"p{i}", "Valid.")
+            if i % 3 == 0:
+                del data["rules"][0]["enforcement"]
+            self.paths.append(self._write(f"{i:02d}_p.protocol.json", json.dumps(data)))
+        self.paths.append(self._write("99_bad.protocol.json", "{not json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_errors_are_aggregated_per_file(self):
+        """In-process and pooled validation report the same errors per file."""
+        serial = validate_protocol_files(self.paths, self.schema)
+        self.assertEqual(sorted(serial), [self.paths[0], self.paths[3], self.paths[6]])
+        self.assertIn("rules/0: 'enforcement' is a required property", serial[self.paths[0]])
+
+        with patch.object(protocol_compiler, "PARALLEL_VALIDATION_THRESHOLD", 2):
+            pooled = validate_protocol_files(self.paths, self.schema, max_workers=2)
+        self.assertEqual(pooled, serial)
+
+    def test_validate_only_skips_compilation(self):
+        """Validate-only mode reports invalid files without writing any output."""
+        with patch.object(protocol_compiler, "_build_protocol_entry") as build_entry:
+            with redirect_stdout(io.StringIO()) as out:
+                failures = validate_protocols(self.test_dir, DEFAULT_SCHEMA_FILE)
+        self.assertEqual(failures, 3)
+        self.assertIn("99_bad.protocol.json failed validation", out.getvalue())
+        build_entry.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
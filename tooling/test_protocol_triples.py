@@ -0,0 +1,84 @@
+"""
+Conformance tests for the direct protocol triple emitter.
+
+The emitter must produce the same graph as rdflib's JSON-LD parser, which
+the protocol compiler used before, for every protocol in the repository.
+"""
+import glob
+import io
+import json
+import os
+import unittest
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from tooling.protocol_compiler import CONTEXT_FILE, DEFAULT_PROTOCOLS_DIR
+from tooling.protocol_triples import ContextMapping, emit_triples, to_ntriples, write_turtle
+
+
+def _base_uri(file_path):
+    return "file://" + os.path.abspath(os.path.dirname(file_path)) + "/"
+
+
+def _reference_graph(protocol_data, file_path):
+    """The original rdflib JSON-LD path, used as the conformance oracle."""
+    data = dict(protocol_data)
+    data["@context"] = os.path.relpath(CONTEXT_FILE, os.path.dirname(file_path))
+    return Graph().parse(data=json.dumps(data), format="json-ld", publicID=_base_uri(file_path))
+
+
+class TestProtocolTriples(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.mapping = ContextMapping.from_file(CONTEXT_FILE)
+
+    def _emitted_graph(self, protocol_data, file_path):
+        nt = to_ntriples(emit_triples(protocol_data, self.mapping, _base_uri(file_path)))
+        return Graph().parse(data=nt, format="nt")
+
+    def test_repository_protocols_match_rdflib(self):
+        """Every protocol in the repository yields the same graph as JSON-LD parsing."""
+        paths = glob.glob(os.path.join(DEFAULT_PROTOCOLS_DIR, "**", "*.protocol.json"), recursive=True)
+        self.assertTrue(paths)
+        for path in paths:
+            with self.subTest(protocol=os.path.basename(path)):
+                with open(path) as f:
+                    data = json.load(f)
+                self.assertTrue(isomorphic(self._emitted_graph(data, path), _reference_graph(data, path)))
+
+    def test_edge_cases_match_rdflib(self):
+        """Typed literals, blank nodes, nulls, coercion and unknown keys follow JSON-LD."""
+        path = os.path.join(DEFAULT_PROTOCOLS_DIR, "edge.protocol.json")
+        data = {
+            "protocol_id": "edge",
+            "version": 3,
+            "scope": True,
+            "flags": 1.5,
+            "name": None,
+            "description": 'Quotes "and"\nnewlines\t\\',
+            "rules": [
+                {"description": "A rule without an id.", "details": "nested"},
+                {"rule_id": "schema:compact", "type": "Rule", "associated_tools": ["http://example.com/t", "proto:t"]},
+            ],
+            "schema:extra": "compact key",
+            "http://example.com/p": "absolute key",
+            "undefined_term": "dropped",
+        }
+        self.assertTrue(isomorphic(self._emitted_graph(data, path), _reference_graph(data, path)))
+
+    def test_turtle_output_round_trips(self):
+        """Streamed Turtle parses back to the emitted graph."""
+        path = os.path.join(DEFAULT_PROTOCOLS_DIR, "04_fdc-protocol.protocol.json")
+        with open(path) as f:
+            data = json.load(f)
+        out = io.StringIO()
+        write_turtle(emit_triples(data, self.mapping, _base_uri(path)), out, self.mapping.prefixes)
+        self.assertIn("proto:hasRule", out.getvalue())
+        turtle = Graph().parse(data=out.getvalue(), format="turtle")
+        self.assertTrue(isomorphic(turtle, self._emitted_graph(data, path)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,7 +11,10 @@ import os
 import json
 import tempfile
 import shutil
-from tooling.protocol_updater import add_tool_to_protocol, find_protocol_file
+from unittest.mock import patch
+
+import tooling.protocol_updater as protocol_updater
+from tooling.protocol_updater import add_tool_to_protocol, apply_updates, find_protocol_file
 
 class TestProtocolUpdater(unittest.TestCase):
 
@@ -79,5 +82,30 @@ class TestProtocolUpdater(unittest.TestCase):
         self.assertEqual(len(data["associated_tools"]), 1)
         self.assertEqual(data["associated_tools"].count(existing_tool), 1)
 
+    def test_apply_updates_writes_each_protocol_once(self):
+        """Verify that a batch loads and writes a protocol once and reports each update."""
+        with open(self.protocol_file_path, "w") as f:
+            json.dump(dict(self.initial_data, rules=[{"rule_id": "r1", "description": "Old."}]), f, indent=2)
+        updates = [
+            {"command": "add-tool", "protocol_id": self.protocol_id, "tool_name": "tool_a"},
+            {"command": "update-rule", "protocol_id": self.protocol_id, "rule_id": "r1", "description": "New."},
+            {"command": "update-rule", "protocol_id": self.protocol_id, "rule_id": "r2", "description": "Missing."},
+            {"command": "add-tool", "protocol_id": self.protocol_id, "tool_name": "existing_tool"},
+            {"command": "add-tool", "protocol_id": "unknown-protocol", "tool_name": "tool_b"},
+        ]
+        with patch.object(protocol_updater, "write_protocol_file", wraps=protocol_updater.write_protocol_file) as write:
+            results = apply_updates(updates, self.mock_protocols_dir)
+        write.assert_called_once()
+        self.assertEqual([r["ok"] for r in results], [True, True, False, True, False])
+        self.assertEqual([r["changed"] for r in results], [True, True, False, False, False])
+        self.assertIn("r2", results[2]["message"])
+
+        with open(self.protocol_file_path, "r") as f:
+            data = json.load(f)
+        self.assertEqual(data["associated_tools"], ["existing_tool", "tool_a"])
+        self.assertEqual(data["rules"][0]["description"], "New.")
+        self.assertEqual(os.listdir(self.mock_protocols_dir), ["test.protocol.json"])
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
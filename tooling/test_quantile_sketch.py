@@ -0,0 +1,49 @@
+"""
+Unit tests for the KLL quantile sketch.
+"""
+import pickle
+import random
+import unittest
+
+from tooling.quantile_sketch import KLLSketch
+
+
+class TestKLLSketch(unittest.TestCase):
+
+    def test_small_streams_are_exact(self):
+        sketch = KLLSketch()
+        sketch.update(range(1, 101))
+        self.assertEqual(sketch.quantiles((0, 0.5, 0.9, 0.99, 1)), [1, 50, 90, 99, 100])
+        self.assertEqual(KLLSketch().quantile(0.5), None)
+        with self.assertRaises(ValueError):
+            sketch.quantile(1.5)
+
+    def test_large_streams_stay_bounded_and_accurate(self):
+        values = list(range(200000))
+        random.Random(7).shuffle(values)
+        sketch = KLLSketch()
+        sketch.update(values)
+        self.assertLess(len(sketch), 1000)
+        self.assertEqual((sketch.count, sketch.min, sketch.max), (200000, 0, 199999))
+        for q, estimate in zip((0.5, 0.9, 0.99), sketch.quantiles((0.5, 0.9, 0.99))):
+            self.assertAlmostEqual(estimate / 200000, q, delta=0.02)
+
+    def test_merged_shards_match_the_whole_stream(self):
+        values = [random.Random(i).expovariate(1.0) for i in range(50000)]
+        whole = KLLSketch()
+        whole.update(values)
+        merged = KLLSketch()
+        for start in range(0, len(values), 12500):
+            part = KLLSketch()
+            part.update(values[start:start + 12500])
+            merged.merge(pickle.loads(pickle.dumps(part)))
+        self.assertEqual(merged.count, whole.count)
+        self.assertLess(len(merged), 1000)
+        exact = sorted(values)
+        for q, estimate in zip((0.5, 0.9, 0.99), merged.quantiles((0.5, 0.9, 0.99))):
+            rank = sum(1 for value in exact if value <= estimate) / len(exact)
+            self.assertAlmostEqual(rank, q, delta=0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
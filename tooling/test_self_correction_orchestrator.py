@@ -3,15 +3,15 @@ Unit tests for the self_correction_orchestrator.py script.
 
 This test suite verifies the end-to-end functionality of the automated
 self-correction workflow. It ensures that the orchestrator can correctly
-read structured lessons, invoke the protocol_updater.py script as a
-subprocess with the correct arguments, and update the lesson status file
-to reflect the outcome.
+read structured lessons, apply them through the protocol_updater.py
+functions, and update the lesson status file to reflect the outcome.
 """
 import unittest
 import os
 import json
 import tempfile
 import shutil
+from unittest.mock import patch
 from tooling.self_correction_orchestrator import process_lessons, load_lessons, save_lessons
 
 class TestSelfCorrectionOrchestrator(unittest.TestCase):
@@ -139,6 +139,59 @@ class TestSelfCorrectionOrchestrator(unittest.TestCase):
         # The malformed lesson should still be 'pending' as it was skipped
         self.assertEqual(final_lessons[1]["status"], "pending")
 
+    def test_indexed_tool_is_applied_without_running_the_updater(self):
+        """An add-tool lesson the protocol index already satisfies skips the updater."""
+        from tooling.protocol_index import index_entry, write_protocol_index
+        index_file = os.path.join(self.test_dir, "AGENTS.index.json")
+        protocol = dict(self.initial_protocol_data, associated_tools=["existing_tool", "new_tool"])
+        write_protocol_index(index_file, {"p1": dict(index_entry(protocol), file=self.protocol_file_path)})
+        os.utime(self.protocol_file_path, (0, 0))
+
+        lessons = load_lessons()
+        with patch("tooling.self_correction_orchestrator.run_command") as run_command:
+            changes_made = process_lessons(lessons, self.protocols_dir_path, index_file)
+        run_command.assert_not_called()
+        self.assertFalse(changes_made)
+        self.assertEqual(lessons[0]["status"], "applied")
+
+    def test_lessons_are_applied_in_process_with_one_write_per_protocol(self):
+        """Several lessons for one protocol are applied without subprocesses, with one write."""
+        import tooling.protocol_updater as protocol_updater
+        lessons = [
+            dict(self.initial_lessons[0], lesson_id=f"l-{tool}",
+                 action=dict(self.initial_lessons[0]["action"], parameters={"protocol_id": "p1", "tool_name": tool}))
+            for tool in ("tool_a", "tool_b", "tool_c")
+        ]
+        lessons.append(dict(self.initial_lessons[0], lesson_id="l-bad", action={
+            "type": "UPDATE_PROTOCOL", "command": "update-rule",
+            "parameters": {"protocol_id": "p1", "rule_id": "missing", "description": "x"},
+        }))
+        with patch("tooling.self_correction_orchestrator.run_command") as run_command, \
+                patch.object(protocol_updater, "write_protocol_file", wraps=protocol_updater.write_protocol_file) as write:
+            self.assertTrue(process_lessons(lessons, self.protocols_dir_path))
+        run_command.assert_not_called()
+        write.assert_called_once()
+        self.assertEqual([lesson["status"] for lesson in lessons], ["applied", "applied", "applied", "failed"])
+        with open(self.protocol_file_path, "r") as f:
+            self.assertEqual(json.load(f)["associated_tools"], ["existing_tool", "tool_a", "tool_b", "tool_c"])
+
+    def test_main_journals_statuses_instead_of_rewriting_lessons(self):
+        """A cycle appends the new statuses to the journal and leaves lessons.jsonl as it was."""
+        from tooling import lesson_journal
+        from tooling.self_correction_orchestrator import main
+        with open(self.lessons_file_path, "rb") as f:
+            before = f.read()
+        with patch("tooling.self_correction_orchestrator.run_command", return_value=True), \
+                patch("tooling.self_correction_orchestrator.PROTOCOLS_DIR", self.protocols_dir_path), \
+                patch("tooling.self_correction_orchestrator.INDEX_FILE", os.path.join(self.test_dir, "missing.json")):
+            main()
+        with open(self.lessons_file_path, "rb") as f:
+            self.assertEqual(f.read(), before)
+        with open(lesson_journal.journal_path(self.lessons_file_path), "r") as f:
+            self.assertEqual([json.loads(line)["status"] for line in f], ["applied"])
+        self.assertEqual(load_lessons()[0]["status"], "applied")
+        self.assertEqual(lesson_journal.load_pending_lessons(self.lessons_file_path), [])
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
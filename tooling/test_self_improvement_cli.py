@@ -4,7 +4,11 @@ Unit tests for the self-improvement analysis CLI tool.
 import unittest
 import os
 import json
+from unittest.mock import patch
+
+from tooling import log_scan
 from tooling.self_improvement_cli import (
+    analyze_latency,
     analyze_planning_efficiency,
     analyze_protocol_violations,
 )
@@ -108,5 +112,50 @@ class TestProtocolViolationAnalysis(unittest.TestCase):
         self.assertIn("task-violation-2", violation_tasks)
 
 
+class TestLatencyAnalysis(unittest.TestCase):
+    """Tests for the analyze_latency function."""
+
+    def setUp(self):
+        """Writes two interleaved sessions whose steps take known times."""
+        self.test_log_path = "temp_test_latency_activity.log.jsonl"
+        entries = []
+        for i in range(400):
+            session = f"session-{i % 2}"
+            task = "task-slow" if i % 2 else "task-fast"
+            seconds = (i // 2) * (3 if i % 2 else 1)  # Each step takes 3 s (slow) or 1 s (fast).
+            entries.append({
+                "session_id": session,
+                "timestamp": f"2025-10-06T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}Z",
+                "task": {"id": task, "plan_step": i // 2},
+                "action": {"type": "TOOL_EXEC", "details": {"tool_name": "read_file" if i % 2 else "list_files"}},
+            })
+        entries.append({"session_id": "session-0", "timestamp": "not a time", "action": {"type": "INFO"}})
+        with open(self.test_log_path, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+    def tearDown(self):
+        """Clean up the temporary log file."""
+        if os.path.exists(self.test_log_path):
+            os.remove(self.test_log_path)
+
+    def test_analyze_latency(self):
+        """Test that durations are reconstructed per tool and the slowest task is flagged first."""
+        result = analyze_latency(self.test_log_path, max_workers=1)
+        self.assertEqual(result["tools"]["read_file"]["count"], 199)
+        self.assertEqual(result["tools"]["read_file"]["p50"], 3.0)
+        self.assertEqual(result["tools"]["list_files"]["p99"], 1.0)
+        self.assertEqual(result["steps"]["TOOL_EXEC"]["count"], 398)
+        slowest = result["slowest_tasks"][0]
+        self.assertEqual((slowest["task_id"], slowest["seconds"], slowest["steps"]), ("task-slow", 597.0, 199))
+
+    def test_shards_measure_steps_across_boundaries(self):
+        """Test that a parallel scan measures the steps that straddle shard boundaries."""
+        sequential = analyze_latency(self.test_log_path, max_workers=1)
+        with patch.object(log_scan, "PARALLEL_SCAN_THRESHOLD", 0), patch.object(log_scan, "MAX_SHARD_SIZE", 2048):
+            sharded = analyze_latency(self.test_log_path, max_workers=2)
+        self.assertEqual(sharded, sequential)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Unit tests for the full-fidelity AgentState snapshot codec.
+"""
+import os
+import tempfile
+import unittest
+
+from tooling import state_codec
+from tooling.plan_parser import CommandTable, parse_plan
+from tooling.state import AgentState, PlanContext
+from tooling.state_codec import (
+    StateDecoder,
+    StateEncoder,
+    append_snapshot,
+    dumps,
+    loads,
+    read_snapshot_journal,
+)
+
+
+def _make_state():
+    plan = "set_plan\n  Do the thing\n\nread_file\nREADME.md\n\nsubmit\n"
+    state = AgentState(task="test-task", plan_path="plan.txt")
+    state.plan_stack.append(
+        PlanContext(plan_path="plan.txt", commands=parse_plan(plan), plan_content=plan.splitlines())
+    )
+    state.plan_stack.append(
+        PlanContext(plan_path="sub.txt", commands=CommandTable.from_source(b"read_file\nAGENTS.md\n"), current_step=1)
+    )
+    state.messages = [{"role": "system", "content": "hello"}, {"role": "user", "content": "ünïcode"}]
+    state.research_findings = {"topic": {"notes": [1, 2, 3]}}
+    return state
+
+
+class TestStateCodec(unittest.TestCase):
+
+    def assertStatesEqual(self, restored, original):
+        self.assertEqual(restored, original)
+        for restored_ctx, ctx in zip(restored.plan_stack, original.plan_stack):
+            self.assertEqual([c.span for c in restored_ctx.commands], [c.span for c in ctx.commands])
+
+    def test_full_round_trip(self):
+        """A full snapshot restores every field, including commands and spans."""
+        state = _make_state()
+        data = dumps(state)
+        self.assertEqual(data[:4], state_codec.MAGIC)
+        self.assertStatesEqual(loads(data), state)
+
+    def test_every_available_codec_round_trips(self):
+        """Each installed codec, including the stdlib fallback, is lossless."""
+        state = _make_state()
+        for codec_id, (name, _, _) in state_codec.CODECS.items():
+            with self.subTest(codec=name):
+                self.assertStatesEqual(loads(dumps(state, codec_id=codec_id)), state)
+
+    def test_deltas_reproduce_the_state(self):
+        """A stream of delta snapshots tracks an evolving state exactly."""
+        state = _make_state()
+        encoder, decoder = StateEncoder(), StateDecoder()
+        first = encoder.encode(state)
+        decoder.decode(first)
+
+        state.messages.append({"role": "assistant", "content": "step"})
+        state.plan_stack[-1].current_step = 2
+        state.research_findings["topic"]["notes"].append(4)
+        delta = encoder.encode(state)
+        self.assertLess(len(delta), len(first))
+        self.assertStatesEqual(decoder.decode(delta), state)
+
+        state.plan_stack.pop()
+        state.plan_stack.append(PlanContext(plan_path="other.txt", commands=parse_plan("submit")))
+        state.error = "boom"
+        self.assertStatesEqual(decoder.decode(encoder.encode(state)), state)
+
+    def test_edited_plan_content_is_encoded(self):
+        """An in-place edit of a context's plan content, even of the same length, is in the delta."""
+        state = _make_state()
+        encoder, decoder = StateEncoder(), StateDecoder()
+        decoder.decode(encoder.encode(state))
+        state.plan_stack[0].plan_content[0] = "reset_all"
+        self.assertStatesEqual(decoder.decode(encoder.encode(state)), state)
+
+    def test_edited_commands_are_encoded(self):
+        """Commands appended or edited in place are in the delta."""
+        state = _make_state()
+        state.plan_stack[0].commands = parse_plan("read_file\nREADME.md\n\nsubmit\n")
+        encoder, decoder = StateEncoder(), StateDecoder()
+        decoder.decode(encoder.encode(state))
+        state.plan_stack[0].commands.append(parse_plan("reset_all")[0])
+        self.assertStatesEqual(decoder.decode(encoder.encode(state)), state)
+        state.plan_stack[0].commands[0].args_text = "AGENTS.md"
+        self.assertStatesEqual(decoder.decode(encoder.encode(state)), state)
+        self.assertEqual(len(state.plan_stack[0].commands), 3)
+
+    def test_rewritten_messages_force_a_full_snapshot(self):
+        """Replacing the message history falls back to a full snapshot."""
+        state = _make_state()
+        encoder = StateEncoder()
+        encoder.encode(state)
+        state.messages = [{"role": "system", "content": "reset"}]
+        data = encoder.encode(state)
+        self.assertEqual(data[6], state_codec.KIND_FULL)
+        self.assertStatesEqual(loads(data), state)
+
+    def test_invalid_snapshots_are_rejected(self):
+        """Foreign data and orphan deltas raise ValueError."""
+        state = _make_state()
+        encoder = StateEncoder()
+        encoder.encode(state)
+        with self.assertRaises(ValueError):
+            loads(b"not a snapshot")
+        with self.assertRaises(ValueError):
+            StateDecoder().decode(encoder.encode(state))
+
+    def test_journal_replay(self):
+        """A journal replays to the latest state and ignores a torn tail."""
+        state = _make_state()
+        encoder = StateEncoder()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.journal")
+            append_snapshot(path, encoder.encode(state))
+            state.final_report = "done"
+            append_snapshot(path, encoder.encode(state))
+            with open(path, "ab") as f:
+                f.write(b"\xff\x00\x00\x00partial")
+            self.assertStatesEqual(read_snapshot_journal(path), state)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for the memory-mapped triple index (`.kgi`).
+"""
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+
+from rdflib import Graph, Literal, URIRef
+
+from tooling.triple_index import TripleIndex, open_triple_index, triple_index_path, write_triple_index
+
+EX = "http://example.org/"
+
+
+def _triples():
+    triples = set()
+    for i in range(20):
+        s = f"<{EX}rule{i}>"
+        triples.add((s, f"<{EX}partOf>", f"<{EX}protocol{i % 3}>"))
+        triples.add((s, f"<{EX}tool>", f"<{EX}tool{i % 5}>"))
+        triples.add((s, f"<{EX}description>", f'"Rule {i} \\"quoted\\""'))
+    triples.add(("_:b1", f"<{EX}tool>", f"<{EX}tool0>"))
+    return triples
+
+
+class TestTripleIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.test_dir, "graph.kgi")
+        self.triples = _triples()
+        write_triple_index(list(self.triples) * 2, self.index_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_every_pattern_matches_a_scan(self):
+        """Each combination of bound positions returns exactly the matching triples."""
+        with TripleIndex(self.index_path) as index:
+            self.assertEqual(len(index), len(self.triples))
+            self.assertEqual(set(index.triples()), self.triples)
+            for triple in sorted(self.triples)[::7]:
+                for mask in itertools.product((False, True), repeat=3):
+                    pattern = tuple(term if bound else None for term, bound in zip(triple, mask))
+                    with self.subTest(pattern=pattern):
+                        expected = {t for t in self.triples if all(q is None or q == v for q, v in zip(pattern, t))}
+                        found = list(index.triples(pattern))
+                        self.assertEqual(len(found), len(expected))
+                        self.assertEqual(set(found), expected)
+
+    def test_unknown_terms_match_nothing(self):
+        """Patterns with terms absent from the dictionary return no triples."""
+        with TripleIndex(self.index_path) as index:
+            self.assertIsNone(index.term_id(f"<{EX}missing>"))
+            self.assertEqual(list(index.triples((None, f"<{EX}missing>", None))), [])
+            self.assertEqual(sorted(index.objects(f"<{EX}rule3>", f"<{EX}tool>")), [f"<{EX}tool3>"])
+
+    def test_corrupt_index_is_rejected(self):
+        """A truncated index raises ValueError instead of returning bad data."""
+        with open(self.index_path, "r+b") as f:
+            f.truncate(40)
+        with self.assertRaises(ValueError):
+            TripleIndex(self.index_path)
+
+    def test_open_triple_index_rebuilds_stale_indexes(self):
+        """The index of a Turtle file is rebuilt when the Turtle file changes."""
+        graph_path = os.path.join(self.test_dir, "protocols.ttl")
+        graph = Graph()
+        graph.add((URIRef(EX + "a"), URIRef(EX + "p"), Literal("one")))
+        graph.serialize(graph_path, format="turtle")
+        with open_triple_index(graph_path) as index:
+            self.assertEqual(len(index), 1)
+        self.assertTrue(os.path.exists(triple_index_path(graph_path)))
+
+        graph.add((URIRef(EX + "b"), URIRef(EX + "p"), Literal("two")))
+        graph.serialize(graph_path, format="turtle")
+        with open_triple_index(graph_path) as index:
+            self.assertEqual(sorted(index.objects(predicate=f"<{EX}p>")), ['"one"', '"two"'])
+
+
+if __name__ == "__main__":
+    unittest.main()
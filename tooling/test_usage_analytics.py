@@ -0,0 +1,98 @@
+"""
+Unit tests for the windowed tool-usage aggregates.
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tooling import protocol_auditor, usage_analytics
+from tooling.usage_analytics import add_tool_use, merge_usage, new_usage, prune_usage, render_usage_trends
+
+
+def _entry(i):
+    return {
+        "session_id": f"session-{i // 40}",
+        "timestamp": f"2025-10-{1 + i // 48:02d}T{(i // 2) % 24:02d}:30:00+00:00",
+        "task": {"id": f"task-{i % 3}"},
+        "action": {"type": "TOOL_EXEC", "details": {"tool_name": f"tool_{i % 4}"}},
+    }
+
+
+def _usage(entries):
+    usage = new_usage()
+    for entry in entries:
+        add_tool_use(usage, entry["action"]["details"]["tool_name"], entry)
+    return usage
+
+
+class TestUsageAnalytics(unittest.TestCase):
+
+    def test_windows_and_summaries(self):
+        """Tool uses are counted per UTC hour, day, session and task."""
+        usage = _usage([
+            _entry(0),
+            _entry(1),
+            dict(_entry(2), timestamp="2025-10-01T03:15:00+02:00"),
+            dict(_entry(3), timestamp="not a time"),
+        ])
+        self.assertEqual(usage["total"], {"tool_0": 1, "tool_1": 1, "tool_2": 1, "tool_3": 1})
+        self.assertEqual(usage["hourly"], {"2025-10-01T00": {"tool_0": 1, "tool_1": 1}, "2025-10-01T01": {"tool_2": 1}})
+        self.assertEqual(usage["daily"], {"2025-10-01": {"tool_0": 1, "tool_1": 1, "tool_2": 1}})
+        session = usage["sessions"]["session-0"]
+        self.assertEqual((session["first"], session["last"], session["count"]), ("2025-10-01T00:30:00", "2025-10-01T01:15:00", 4))
+        self.assertEqual(usage["tasks"]["task-0"]["tools"], {"tool_0": 1, "tool_3": 1})
+
+    def test_merging_shards_matches_a_single_pass(self):
+        """Aggregates of consecutive slices merge into those of the whole stream."""
+        entries = [_entry(i) for i in range(200)]
+        whole = _usage(entries)
+        merged = new_usage()
+        for start in range(0, 200, 37):
+            merge_usage(merged, _usage(entries[start:start + 37]))
+        self.assertEqual(json.dumps(merged, sort_keys=True), json.dumps(whole, sort_keys=True))
+
+    def test_pruning_keeps_the_most_recent_history(self):
+        """Retention limits drop the oldest windows and sessions."""
+        usage = _usage([_entry(i) for i in range(200)])
+        with patch.object(usage_analytics, "HOURLY_RETENTION", 5), patch.object(usage_analytics, "SESSION_RETENTION", 2):
+            prune_usage(usage)
+        self.assertEqual(sorted(usage["hourly"]), ["2025-10-04T23", "2025-10-05T00", "2025-10-05T01", "2025-10-05T02", "2025-10-05T03"])
+        self.assertEqual(sorted(usage["sessions"]), ["session-3", "session-4"])
+        self.assertEqual(sum(usage["total"].values()), 200)
+
+    def test_report_shows_recent_slices(self):
+        """The report lists the latest day first and the busiest tools of each slice."""
+        report = "\n".join(render_usage_trends(_usage([_entry(i) for i in range(200)])))
+        self.assertIn("| 2025-10-05 | 8 |", report)
+        self.assertLess(report.index("2025-10-05"), report.index("2025-10-04"))
+        self.assertIn("| `session-4` |", report)
+        self.assertIn("No timestamped tool usage", "\n".join(render_usage_trends(new_usage())))
+
+
+class TestAuditorUsageState(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.test_dir, "activity.log.jsonl")
+        self.state_path = os.path.join(self.test_dir, "auditor.state.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_incremental_runs_match_a_full_scan(self):
+        """Windows built over several incremental runs equal those of one full scan."""
+        for start in (0, 70, 150):
+            with open(self.log_path, "a") as f:
+                for i in range(start, start + 70):
+                    f.write(json.dumps(_entry(i)) + "\n")
+            incremental = protocol_auditor.get_usage_analytics(self.log_path, self.state_path)
+        full = protocol_auditor.get_usage_analytics(self.log_path)
+        self.assertEqual(json.dumps(incremental, sort_keys=True), json.dumps(full, sort_keys=True))
+        self.assertEqual(sum(full["daily"]["2025-10-01"].values()), 48)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,282 @@
+"""
+Reads and writes indexed binary triple files (`.kgi`) for the knowledge graph.
+
+Consumers of `protocols.ttl` and `enriched_protocols.ttl` normally parse the
+whole Turtle file into an rdflib `Graph` before they can answer a single
+question. A `.kgi` file stores the same triples in a form that can be
+memory-mapped and queried in place:
+
+- **Term dictionary:** every distinct term, in N-Triples syntax (`<iri>`,
+  `_:label` or a quoted literal), stored once and sorted, so that a term is
+  found by binary search over the mapped file.
+- **Permutation indexes:** the triples as `(subject, predicate, object)` term
+  ids, sorted three ways: SPO, POS and OSP. Any pattern with bound and
+  unbound positions is answered by a binary search for the range of one of
+  them.
+- **Source hash:** the SHA-256 of the Turtle file the index was built from.
+
+Files are little-endian regardless of the host. Like `.planc` artifacts, an
+index is a cache: `open_triple_index` rebuilds it when it is missing or no
+longer matches its Turtle source.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, Iterator, Optional, Tuple
+
+TRIPLE_INDEX_SUFFIX = ".kgi"
+FORMAT_VERSION = 1
+MAGIC = b"KGIX"
+
+# magic, version, source sha256, term count, triple count, term blob length
+_HEADER = struct.Struct("<4sH32sIIQ")
+
+Triple = Tuple[str, str, str]
+Pattern = Tuple[Optional[str], Optional[str], Optional[str]]
+
+# For each permutation, the positions of (s, p, o) in its sort key.
+_PERMUTATIONS = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+
+def triple_index_path(graph_path: str) -> str:
+    """Returns the path of the `.kgi` index for a Turtle graph file."""
+    return os.path.splitext(graph_path)[0] + TRIPLE_INDEX_SUFFIX
+
+
+def _le_bytes(arr: array) -> bytes:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _file_sha256(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def write_triple_index(triples: Iterable[Triple], index_path: str, source_path: Optional[str] = None):
+    """
+    Writes triples of N-Triples term strings to an index file, atomically.
+    Duplicate triples are stored once. If `source_path` is given, the hash
+    of that (Turtle) file is recorded so that stale indexes can be detected.
+    """
+    source_sha256 = _file_sha256(source_path) if source_path else b"\0" * 32
+    unique = set(triples)
+    terms = sorted({term for triple in unique for term in triple}, key=lambda t: t.encode("utf-8"))
+    ids = {term: i for i, term in enumerate(terms)}
+    encoded = [term.encode("utf-8") for term in terms]
+    offsets = array("Q", [0])
+    for term in encoded:
+        offsets.append(offsets[-1] + len(term))
+    rows = [(ids[s], ids[p], ids[o]) for s, p, o in unique]
+
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, source_sha256, len(terms), len(rows), offsets[-1])]
+    parts.append(_le_bytes(offsets))
+    parts.extend(encoded)
+    for order in _PERMUTATIONS.values():
+        flat = array("I")
+        for row in sorted(tuple(row[i] for i in order) for row in rows):
+            flat.extend(row)
+        parts.append(_le_bytes(flat))
+
+    temp_path = index_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(b"".join(parts))
+        os.replace(temp_path, index_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class TripleIndex:
+    """
+    A read-only, memory-mapped view of a `.kgi` file.
+
+    Terms are N-Triples strings, e.g. `"<https://schema.org/description>"`.
+    Lookups binary-search the mapped term dictionary and permutation arrays;
+    nothing is loaded into memory up front.
+    """
+
+    def __init__(self, index_path: str):
+        self._file = open(index_path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # An empty file cannot be mapped.
+            self._file.close()
+            raise ValueError(f"{index_path} is not a triple index.")
+        try:
+            self._open_views()
+        except (struct.error, ValueError, TypeError):
+            self.close()
+            raise ValueError(f"{index_path} is not a valid triple index.")
+
+    def _open_views(self):
+        magic, version, self.source_sha256, self.term_count, self.triple_count, blob_len = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("bad header")
+        offset = _HEADER.size
+        self._offsets = self._view(offset, "Q", self.term_count + 1)
+        offset += 8 * (self.term_count + 1)
+        self._blob_start = offset
+        offset += blob_len
+        self._orders = {}
+        for name in _PERMUTATIONS:
+            self._orders[name] = self._view(offset, "I", 3 * self.triple_count)
+            offset += 12 * self.triple_count
+        if offset != len(self._map):
+            raise ValueError("truncated index")
+
+    def _view(self, offset: int, typecode: str, count: int):
+        size = array(typecode).itemsize * count
+        data = memoryview(self._map)[offset:offset + size]
+        if len(data) != size:
+            raise ValueError("truncated index")
+        if sys.byteorder == "little":
+            return data.cast(typecode)
+        arr = array(typecode, data.tobytes())
+        arr.byteswap()
+        return arr
+
+    def close(self):
+        """Releases the views and the mapping."""
+        self._offsets = None
+        self._orders = {}
+        if not self._map.closed:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # Views still exported; the map is released with them.
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.triple_count
+
+    def term(self, term_id: int) -> str:
+        """Returns the N-Triples string of a term id."""
+        start = self._blob_start + self._offsets[term_id]
+        end = self._blob_start + self._offsets[term_id + 1]
+        return self._map[start:end].decode("utf-8")
+
+    def term_id(self, term: str) -> Optional[int]:
+        """Returns the id of a term, or None if the graph does not contain it."""
+        key = term.encode("utf-8")
+        offsets, data, base = self._offsets, self._map, self._blob_start
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = data[base + offsets[mid]:base + offsets[mid + 1]]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def _range(self, rows, prefix: Tuple[int, ...]) -> Tuple[int, int]:
+        """Returns the row range of a permutation whose keys start with `prefix`."""
+        k = len(prefix)
+
+        def bisect(upper: bool) -> int:
+            lo, hi = 0, self.triple_count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                key = tuple(rows[3 * mid:3 * mid + k])
+                if key < prefix or (upper and key == prefix):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+
+        return bisect(False), bisect(True)
+
+    def triples(self, pattern: Pattern = (None, None, None)) -> Iterator[Triple]:
+        """
+        Yields the triples matching a `(subject, predicate, object)` pattern,
+        where `None` is a wildcard. Terms are N-Triples strings.
+        """
+        bound = []
+        for term in pattern:
+            if term is None:
+                bound.append(None)
+                continue
+            term_id = self.term_id(term)
+            if term_id is None:
+                return
+            bound.append(term_id)
+        s, p, o = bound
+
+        # Pick the permutation whose sort key starts with the bound positions.
+        if s is not None and p is not None:
+            name, prefix = "spo", (s, p) if o is None else (s, p, o)
+        elif s is not None and o is not None:
+            name, prefix = "osp", (o, s)
+        elif s is not None:
+            name, prefix = "spo", (s,)
+        elif p is not None:
+            name, prefix = "pos", (p,) if o is None else (p, o)
+        elif o is not None:
+            name, prefix = "osp", (o,)
+        else:
+            name, prefix = "spo", ()
+
+        rows = self._orders[name]
+        order = _PERMUTATIONS[name]
+        start, end = self._range(rows, prefix) if prefix else (0, self.triple_count)
+        term = self.term
+        for i in range(start, end):
+            key = rows[3 * i:3 * i + 3]
+            ids = [0, 0, 0]
+            for position, term_id in zip(order, key):
+                ids[position] = term_id
+            yield term(ids[0]), term(ids[1]), term(ids[2])
+
+    def objects(self, subject: Optional[str] = None, predicate: Optional[str] = None) -> Iterator[str]:
+        """Yields the objects of the triples matching a subject and predicate."""
+        for _, _, obj in self.triples((subject, predicate, None)):
+            yield obj
+
+
+def write_graph_index(graph, graph_path: str) -> str:
+    """Writes the `.kgi` index of an rdflib graph saved at `graph_path`; returns the index path."""
+    from tooling.protocol_triples import parse_ntriples
+
+    index_path = triple_index_path(graph_path)
+    write_triple_index(parse_ntriples(graph.serialize(format="nt")), index_path, source_path=graph_path)
+    return index_path
+
+
+def build_triple_index(graph_path: str) -> str:
+    """Parses a Turtle file with rdflib and writes its `.kgi` index; returns the index path."""
+    from rdflib import Graph
+
+    return write_graph_index(Graph().parse(graph_path, format="turtle"), graph_path)
+
+
+def open_triple_index(graph_path: str) -> TripleIndex:
+    """
+    Opens the index of a Turtle graph file, rebuilding it first if it is
+    missing, unreadable or was built from a different version of the file.
+    """
+    index_path = triple_index_path(graph_path)
+    digest = _file_sha256(graph_path)
+    try:
+        index = TripleIndex(index_path)
+        if index.source_sha256 == digest:
+            return index
+        index.close()
+    except (OSError, ValueError):
+        pass
+    build_triple_index(graph_path)
+    return TripleIndex(index_path)
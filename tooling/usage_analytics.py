@@ -0,0 +1,154 @@
+"""
+Windowed tool-usage aggregates for the protocol auditor.
+
+An all-time `Counter` of tool names cannot show how usage changes over time.
+This module maintains, from a stream of tool executions, a small set of
+aggregates that the auditor persists with its log scan state and updates
+incrementally as entries are appended to the log:
+
+- `total`: all-time counts per tool.
+- `hourly` and `daily`: tumbling windows keyed by the UTC hour
+  (`2025-10-06T04`) or day (`2025-10-06`) of the entry's timestamp.
+- `sessions` and `tasks`: per-session and per-task summaries (first and last
+  timestamp, number of tool executions and counts per tool).
+
+Aggregates from different parts of the log are combined with `merge_usage`,
+so they can be built in parallel shards. `prune_usage` bounds the store by
+keeping only the most recent windows, sessions and tasks, and
+`render_usage_trends` formats the most recent slices for the audit report
+without looking at the log.
+"""
+from typing import List, Optional
+
+from utils.log_segments import utc_timestamp
+
+# How much history the store keeps.
+HOURLY_RETENTION = 14 * 24
+DAILY_RETENTION = 366
+SESSION_RETENTION = 500
+TASK_RETENTION = 500
+
+# How much of it the report shows.
+REPORT_HOURS = 24
+REPORT_DAYS = 7
+REPORT_SESSIONS = 10
+REPORT_TASKS = 10
+REPORT_TOP_TOOLS = 5
+
+
+def new_usage() -> dict:
+    """Returns an empty set of aggregates."""
+    return {"total": {}, "hourly": {}, "daily": {}, "sessions": {}, "tasks": {}}
+
+
+def _count(counts: dict, key: str, n: int = 1):
+    counts[key] = counts.get(key, 0) + n
+
+
+def _add_summary(summaries: dict, key: str, tool_name: str, timestamp: Optional[str]):
+    summary = summaries.get(key)
+    if summary is None:
+        summary = summaries[key] = {"first": timestamp, "last": timestamp, "count": 0, "tools": {}}
+    elif timestamp:
+        if not summary["first"] or timestamp < summary["first"]:
+            summary["first"] = timestamp
+        if not summary["last"] or timestamp > summary["last"]:
+            summary["last"] = timestamp
+    summary["count"] += 1
+    _count(summary["tools"], tool_name)
+
+
+def add_tool_use(usage: dict, tool_name: str, log_entry: dict):
+    """Adds one tool execution, windowed by the timestamp of its log entry."""
+    _count(usage["total"], tool_name)
+    timestamp = utc_timestamp(log_entry.get("timestamp"))
+    if timestamp:
+        _count(usage["hourly"].setdefault(timestamp[:13], {}), tool_name)
+        _count(usage["daily"].setdefault(timestamp[:10], {}), tool_name)
+    session_id = log_entry.get("session_id")
+    if isinstance(session_id, str):
+        _add_summary(usage["sessions"], session_id, tool_name, timestamp)
+    task = log_entry.get("task")
+    task_id = task.get("id") if isinstance(task, dict) else None
+    if isinstance(task_id, str):
+        _add_summary(usage["tasks"], task_id, tool_name, timestamp)
+
+
+def _merge_counts(into: dict, counts: dict):
+    for key, n in counts.items():
+        _count(into, key, n)
+
+
+def merge_usage(into: dict, other: dict) -> dict:
+    """Adds the aggregates of `other` to `into` and returns `into`."""
+    _merge_counts(into["total"], other["total"])
+    for window in ("hourly", "daily"):
+        for key, counts in other[window].items():
+            _merge_counts(into[window].setdefault(key, {}), counts)
+    for kind in ("sessions", "tasks"):
+        for key, summary in other[kind].items():
+            existing = into[kind].get(key)
+            if existing is None:
+                into[kind][key] = {**summary, "tools": dict(summary["tools"])}
+                continue
+            firsts = [t for t in (existing["first"], summary["first"]) if t]
+            lasts = [t for t in (existing["last"], summary["last"]) if t]
+            existing["first"] = min(firsts) if firsts else None
+            existing["last"] = max(lasts) if lasts else None
+            existing["count"] += summary["count"]
+            _merge_counts(existing["tools"], summary["tools"])
+    return into
+
+
+def _keep_latest(items: dict, limit: int, key):
+    if len(items) > limit:
+        for name in sorted(items, key=key)[:len(items) - limit]:
+            del items[name]
+
+
+def prune_usage(usage: dict) -> dict:
+    """Drops the oldest windows, sessions and tasks beyond the retention limits."""
+    _keep_latest(usage["hourly"], HOURLY_RETENTION, key=lambda k: k)
+    _keep_latest(usage["daily"], DAILY_RETENTION, key=lambda k: k)
+    _keep_latest(usage["sessions"], SESSION_RETENTION, key=lambda k: (usage["sessions"][k]["last"] or "", k))
+    _keep_latest(usage["tasks"], TASK_RETENTION, key=lambda k: (usage["tasks"][k]["last"] or "", k))
+    return usage
+
+
+def _top_tools(counts: dict) -> str:
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:REPORT_TOP_TOOLS]
+    return ", ".join(f"`{tool}` ({n})" for tool, n in ranked)
+
+
+def _window_table(title: str, label: str, windows: dict, limit: int) -> List[str]:
+    lines = [f"### {title}"]
+    recent = sorted(windows)[-limit:]
+    if not recent:
+        return lines + ["- ℹ️ No timestamped tool usage was recorded."]
+    lines += [f"| {label} | Tool Uses | Top Tools |", "|------|-----------|-----------|"]
+    for key in reversed(recent):
+        counts = windows[key]
+        lines.append(f"| {key} | {sum(counts.values())} | {_top_tools(counts)} |")
+    return lines
+
+
+def _summary_table(title: str, label: str, summaries: dict, limit: int) -> List[str]:
+    lines = [f"### {title}"]
+    recent = sorted(summaries, key=lambda k: (summaries[k]["last"] or "", k))[-limit:]
+    if not recent:
+        return lines + ["- ℹ️ No tool usage was recorded."]
+    lines += [f"| {label} | Last Activity | Tool Uses | Top Tools |", "|------|------|-----------|-----------|"]
+    for key in reversed(recent):
+        summary = summaries[key]
+        lines.append(f"| `{key}` | {summary['last'] or '-'} | {summary['count']} | {_top_tools(summary['tools'])} |")
+    return lines
+
+
+def render_usage_trends(usage: dict) -> List[str]:
+    """Returns Markdown lines with the most recent windows, sessions and tasks."""
+    lines = []
+    lines += _window_table(f"Last {REPORT_DAYS} Days (UTC)", "Day", usage["daily"], REPORT_DAYS)
+    lines += [""] + _window_table(f"Last {REPORT_HOURS} Active Hours (UTC)", "Hour", usage["hourly"], REPORT_HOURS)
+    lines += [""] + _summary_table("Recent Sessions", "Session", usage["sessions"], REPORT_SESSIONS)
+    lines += [""] + _summary_table("Recent Tasks", "Task", usage["tasks"], REPORT_TASKS)
+    return lines
@@ -0,0 +1,137 @@
+"""
+Appends whole lines to a log shared by several processes.
+
+`fdc_cli.py`, `log_failure.py`, the orchestrator and every `Logger` append to
+`logs/activity.log.jsonl` concurrently. Buffered text-mode appends may split
+a record into several `write` calls, so concurrent writers can interleave or
+tear lines. `LogAppender` writes each record (one or more complete lines)
+with a single `write` on an `O_APPEND` descriptor, which the kernel applies
+at the end of the file in one piece:
+
+- Records of up to `PIPE_BUF` bytes are written under a shared `flock`, so
+  writers do not wait for each other.
+- Larger records, which the kernel may write in several parts, are written
+  under an exclusive `flock`.
+
+Rotation (`utils/log_segments.py`) renames the log under an exclusive lock.
+A writer that opened the file before the rename sees, once it holds its
+lock, that its descriptor no longer refers to the log path, and reopens it,
+so no record is written to a file that is being compressed.
+
+On platforms without `fcntl`, records are still written with one `write`
+call, but without locking.
+"""
+import contextlib
+import os
+import select
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# Largest record written under a shared lock. POSIX guarantees at least 512.
+PIPE_BUF = getattr(select, "PIPE_BUF", 512)
+
+
+def _lock(fd, exclusive):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def exclusive_lock(path, create=True):
+    """
+    Holds an exclusive `flock` on a file while the block runs. Yields False
+    without locking if the file does not exist and `create` is False.
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | (os.O_CREAT if create else 0), 0o644)
+    except FileNotFoundError:
+        if create:
+            raise
+        yield False
+        return
+    try:
+        _lock(fd, exclusive=True)
+        try:
+            yield True
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+class LogAppender:
+    """
+    Appends records to a log through a descriptor that is kept open between
+    calls and reopened when the log is rotated or removed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def _open(self):
+        if self._fd is None:
+            try:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            except FileNotFoundError:
+                # The log directory was removed after the appender was created.
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _is_current(self, fd):
+        try:
+            path_stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        fd_stat = os.fstat(fd)
+        return (fd_stat.st_dev, fd_stat.st_ino) == (path_stat.st_dev, path_stat.st_ino)
+
+    def size(self):
+        """Returns the current size of the log, creating it if needed."""
+        fd = self._open()
+        if not self._is_current(fd):
+            self.close()
+            fd = self._open()
+        return os.fstat(fd).st_size
+
+    def append(self, data: bytes):
+        """Appends a record of complete lines so that no other record interleaves with it."""
+        exclusive = len(data) > PIPE_BUF
+        while True:
+            fd = self._open()
+            _lock(fd, exclusive)
+            try:
+                if self._is_current(fd):
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+                    return
+            finally:
+                _unlock(fd)
+            self.close()  # The log was rotated since it was opened.
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def append_record(path, data: bytes):
+    """Appends one record of complete lines to a log (see `LogAppender.append`)."""
+    with LogAppender(path) as appender:
+        appender.append(data)
@@ -0,0 +1,267 @@
+"""
+Rotates the activity log into compressed segments and reads them back.
+
+`logs/activity.log.jsonl` would otherwise grow without bound, and every
+analyzer would read all of it. A `Logger` created with `rotate_bytes` or
+`rotate_interval` calls `rotate_log` when the active file is due, which
+moves the file's contents into an immutable compressed segment next to it:
+
+    logs/activity.log.jsonl              the active file, appended to
+    logs/activity.log.00001.jsonl.gz     rotated segments, oldest first
+    logs/activity.log.segments.json      the segment index
+
+The index lists every segment with the UTC time range of its entries, the
+number of entries, its uncompressed size, the byte offset (in the
+uncompressed segment) of the first entry of each session, and the identity
+of the file it was rotated from:
+
+    {
+      "version": 1,
+      "segments": [
+        {
+          "sequence": 1,
+          "file": "activity.log.00001.jsonl.gz",
+          "compression": "gzip",
+          "start": "2025-10-06T04:10:00",
+          "end": "2025-10-06T09:12:31",
+          "entries": 1200,
+          "size": 480000,
+          "sessions": {"3f0c...": 0},
+          "source": {"device": 2049, "inode": 131074}
+        }
+      ]
+    }
+
+Readers use the index to open only the segments overlapping a time window
+(`segments_overlapping`) or containing a session (`segments_for_session`).
+`tooling/log_scan.py` builds `scan_log_segments` on top of this module for
+the analyzers.
+"""
+import gzip
+import json
+import lzma
+import os
+import re
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional
+
+from utils.log_append import exclusive_lock
+
+SEGMENT_INDEX_VERSION = 1
+COMPRESSIONS = {"gzip": (".gz", gzip.open), "lzma": (".xz", lzma.open)}
+
+# Extracts the timestamp of a Logger entry without decoding the line.
+_TIMESTAMP = re.compile(rb'"timestamp": ?"([^"]+)"')
+
+
+def parse_timestamp(timestamp) -> Optional[datetime]:
+    """
+    Parses an ISO 8601 timestamp into an aware UTC datetime, or returns None
+    if it is not one. Naive timestamps, as older loggers wrote, are UTC.
+    """
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def utc_timestamp(timestamp) -> Optional[str]:
+    """Normalizes an ISO 8601 timestamp to a naive UTC one, or returns None if it is not one."""
+    if isinstance(timestamp, str) and timestamp.endswith("+00:00") and len(timestamp) >= 19:
+        return timestamp[:-6]  # The common case, without parsing.
+    parsed = parse_timestamp(timestamp)
+    return None if parsed is None else parsed.replace(tzinfo=None).isoformat()
+
+
+def line_timestamp(line: bytes) -> Optional[str]:
+    """Returns the normalized timestamp of a log line, or None if it has none."""
+    match = _TIMESTAMP.search(line)
+    return utc_timestamp(match.group(1).decode("utf-8", "replace")) if match else None
+
+
+def first_entry_time(log_path: str) -> Optional[float]:
+    """Returns the POSIX time of the first entry of a log, or None if it has no timestamped entry."""
+    try:
+        with open(log_path, "rb") as f:
+            timestamp = line_timestamp(f.readline())
+    except OSError:
+        return None
+    if timestamp is None:
+        return None
+    return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+
+
+def segment_index_path(log_path: str) -> str:
+    """Returns the path of the segment index of a log."""
+    return os.path.splitext(log_path)[0] + ".segments.json"
+
+
+def segment_path(log_path: str, segment: dict) -> str:
+    """Returns the path of a segment listed in the index of a log."""
+    return os.path.join(os.path.dirname(log_path), segment["file"])
+
+
+def load_segment_index(log_path: str) -> dict:
+    """Loads the segment index of a log, or returns an empty one if it is missing or unusable."""
+    index_path = segment_index_path(log_path)
+    if not os.path.exists(index_path):
+        return {"version": SEGMENT_INDEX_VERSION, "segments": []}  # The log was never rotated.
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        if isinstance(index, dict) and index.get("version") == SEGMENT_INDEX_VERSION:
+            return index
+    except (OSError, ValueError):
+        pass
+    return {"version": SEGMENT_INDEX_VERSION, "segments": []}
+
+
+def _write_segment_index(log_path: str, index: dict):
+    index_path = segment_index_path(log_path)
+    temp_path = index_path + ".tmp"
+    try:
+        with open(temp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, index_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def split_lines(data: bytes) -> List[bytes]:
+    """Splits log data into lines, without their newlines."""
+    lines = data.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+    return lines
+
+
+def _summarize(data: bytes) -> dict:
+    """Returns the time range, entry count and session offsets of a segment's contents."""
+    start = end = None
+    entries = 0
+    sessions = {}
+    offset = 0
+    for line in split_lines(data):
+        if line.strip():
+            entries += 1
+            timestamp = line_timestamp(line)
+            if timestamp:
+                start = timestamp if start is None or timestamp < start else start
+                end = timestamp if end is None or timestamp > end else end
+            try:
+                session_id = json.loads(line).get("session_id")
+            except (ValueError, AttributeError):
+                session_id = None
+            if isinstance(session_id, str) and session_id not in sessions:
+                sessions[session_id] = offset
+        offset += len(line) + 1
+    return {"start": start, "end": end, "entries": entries, "size": len(data), "sessions": sessions}
+
+
+def _seal(log_path: str, rotating_path: str, compression: str) -> dict:
+    """Compresses a renamed active file into the next segment and adds it to the index."""
+    suffix, opener = COMPRESSIONS[compression]
+    st = os.stat(rotating_path)
+    with open(rotating_path, "rb") as f:
+        data = f.read()
+
+    index = load_segment_index(log_path)
+    sequence = max((s["sequence"] for s in index["segments"]), default=0) + 1
+    base = os.path.basename(os.path.splitext(log_path)[0])
+    segment = {
+        "sequence": sequence,
+        "file": f"{base}.{sequence:05d}.jsonl{suffix}",
+        "compression": compression,
+        **_summarize(data),
+        "source": {"device": st.st_dev, "inode": st.st_ino},
+    }
+    path = segment_path(log_path, segment)
+    with opener(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    index["segments"].append(segment)
+    _write_segment_index(log_path, index)
+    os.remove(rotating_path)
+    return segment
+
+
+def rotate_log(log_path: str, compression: str = "gzip", min_bytes: int = 1) -> Optional[dict]:
+    """
+    Moves the contents of the active log into a new compressed segment and
+    returns its index entry, or None if the log is missing or smaller than
+    `min_bytes` (e.g. because another process has just rotated it).
+
+    The active file is first renamed, so that new entries start a new file;
+    a rename left behind by an interrupted rotation is sealed first.
+    Rotations are serialized by a lock file next to the index, and the
+    rename is done under an exclusive lock on the active file, so that
+    writers using `LogAppender` never append to a file being sealed.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}'; expected one of {', '.join(COMPRESSIONS)}.")
+    rotating_path = log_path + ".rotating"
+    with exclusive_lock(segment_index_path(log_path) + ".lock"):
+        if os.path.exists(rotating_path):
+            _seal(log_path, rotating_path, compression)
+        with exclusive_lock(log_path, create=False) as locked:
+            if not locked or os.path.getsize(log_path) < max(1, min_bytes):
+                return None
+            os.rename(log_path, rotating_path)
+        return _seal(log_path, rotating_path, compression)
+
+
+def read_segment(log_path: str, segment: dict) -> bytes:
+    """Returns the uncompressed contents of a segment."""
+    opener = COMPRESSIONS[segment["compression"]][1]
+    with opener(segment_path(log_path, segment), "rb") as f:
+        return f.read()
+
+
+def segments_overlapping(index: dict, since: Optional[str] = None, until: Optional[str] = None) -> List[dict]:
+    """
+    Returns the segments with entries between `since` and `until` (ISO 8601
+    timestamps, both inclusive and optional). Segments without timestamped
+    entries are always returned.
+    """
+    since, until = utc_timestamp(since), utc_timestamp(until)
+    return [
+        segment for segment in index["segments"]
+        if not (since and segment["end"] and segment["end"] < since)
+        and not (until and segment["start"] and segment["start"] > until)
+    ]
+
+
+def segments_for_session(index: dict, session_id: str) -> List[dict]:
+    """Returns the segments containing entries of a session."""
+    return [segment for segment in index["segments"] if session_id in segment["sessions"]]
+
+
+def filter_lines(lines: Iterable[bytes], since: Optional[str] = None, until: Optional[str] = None) -> Iterator[bytes]:
+    """Yields the lines whose timestamp is between `since` and `until`; lines without one are kept."""
+    since, until = utc_timestamp(since), utc_timestamp(until)
+    for line in lines:
+        timestamp = line_timestamp(line) if since or until else None
+        if timestamp and ((since and timestamp < since) or (until and timestamp > until)):
+            continue
+        yield line
+
+
+def iter_log_lines(log_path: str, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Yields the lines of a log, oldest first: those of the segments
+    overlapping the window, then those of the active file, keeping only
+    entries between `since` and `until`.
+    """
+    for segment in segments_overlapping(load_segment_index(log_path), since, until):
+        yield from filter_lines(split_lines(read_segment(log_path, segment)), since, until)
+    try:
+        with open(log_path, "rb") as f:
+            yield from filter_lines(split_lines(f.read()), since, until)
+    except FileNotFoundError:
+        pass
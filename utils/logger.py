@@ -20,16 +20,147 @@ Key features of the `Logger` class:
   to a specific run.
 - **Automatic Timestamps:** It injects a UTC timestamp into every log entry,
   providing a precise timeline of events.
+- **Asynchronous Mode:** With `async_mode=True`, `log` only builds the entry
+  and puts it on a bounded queue. A background thread validates the queued
+  entries and appends them in batches to a file handle it keeps open,
+  flushing when a batch is full, when the oldest buffered entry is older
+  than `flush_interval`, on `flush()` and at interpreter exit.
+- **Process-Safe Appends:** Each entry (or batch, in async mode) is appended
+  as one `O_APPEND` write under a file lock, so entries from concurrent
+  processes never interleave (see `utils/log_append.py`).
+- **Rotation:** With `rotate_bytes` and/or `rotate_interval`, the active log
+  is moved into a gzip- or lzma-compressed segment when it reaches that size
+  or age, and a sidecar index records each segment's time range and sessions
+  (see `utils/log_segments.py`).
+- **Compiled Validation:** The schema is parsed and its validator compiled
+  once per process, cached by the hash of the schema file. Entries are first
+  checked by a fast validator generated from the schema; only entries it
+  cannot accept are validated by `jsonschema`, which reports the error.
 
 This centralized logger is the sole mechanism by which the agent should record
 its activities, ensuring a single source of truth for all post-mortem analysis
 and self-improvement activities.
 """
+import atexit
+import hashlib
 import json
+import queue
+import threading
+import time
 import uuid
 import os
 from datetime import datetime, timezone
-from jsonschema import validate
+from jsonschema import ValidationError, validators
+
+from utils import log_segments
+from utils.log_append import LogAppender
+
+# Keywords the fast validator understands. Schemas using any other keyword
+# are only validated by jsonschema. `format` is an annotation here, as
+# jsonschema does not check formats without a format checker.
+_FAST_KEYWORDS = {"type", "properties", "required", "enum", "description", "format", "title", "$schema"}
+_FAST_TYPES = {
+    "object": lambda v: isinstance(v, dict),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "null": lambda v: v is None,
+}
+
+
+def compile_fast_validator(schema):
+    """
+    Generates a predicate for a schema that uses only simple keywords (`type`,
+    `properties`, `required` and string `enum`s), or returns None if the
+    schema uses anything else.
+
+    The predicate returns True only for instances the schema accepts. It may
+    return False for valid instances (e.g. an integer written as `1.0`), so
+    False means "validate with jsonschema", not "invalid".
+    """
+    if not isinstance(schema, dict) or not set(schema) <= _FAST_KEYWORDS:
+        return None
+    checks = []
+
+    schema_type = schema.get("type")
+    if schema_type is not None:
+        if not isinstance(schema_type, str) or schema_type not in _FAST_TYPES:
+            return None
+        checks.append(_FAST_TYPES[schema_type])
+
+    if "enum" in schema:
+        if not all(isinstance(value, str) for value in schema["enum"]):
+            return None
+        allowed = frozenset(schema["enum"])
+        checks.append(lambda v: isinstance(v, str) and v in allowed)
+
+    object_checks = []
+    required = tuple(schema.get("required", ()))
+    if required:
+        object_checks.append(lambda v: all(key in v for key in required))
+    for name, subschema in schema.get("properties", {}).items():
+        check = compile_fast_validator(subschema)
+        if check is None:
+            return None
+        object_checks.append(lambda v, name=name, check=check: name not in v or check(v[name]))
+    if object_checks:
+        checks.append(lambda v: not isinstance(v, dict) or all(check(v) for check in object_checks))
+
+    return lambda v: all(check(v) for check in checks)
+
+
+class CompiledSchema:
+    """
+    A logging schema with its validators, built once per schema file content.
+
+    The jsonschema validator is created (and the schema checked) on first
+    use, so that an invalid schema raises on the first `log` call.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.fast_validate = compile_fast_validator(schema)
+        self._validator = None
+
+    @property
+    def validator(self):
+        if self._validator is None:
+            cls = validators.validator_for(self.schema)
+            cls.check_schema(self.schema)
+            self._validator = cls(self.schema)
+        return self._validator
+
+    def validate(self, instance):
+        """Raises `ValidationError` if `instance` does not conform to the schema."""
+        if self.fast_validate is None or not self.fast_validate(instance):
+            self.validator.validate(instance)
+
+
+# Compiled schemas by SHA-256 of the schema file.
+_SCHEMA_CACHE = {}
+
+# What an asynchronous logger does when its queue is full: wait for the
+# writer thread, drop the entry (counting it in `Logger.dropped`), or raise
+# `queue.Full` to the caller.
+BACKPRESSURE_POLICIES = ("block", "drop", "raise")
+
+# Queued by `close` to stop the writer thread.
+_STOP = object()
+
+# Asynchronous loggers that have not been closed, flushed at exit.
+_ASYNC_LOGGERS = set()
+
+
+def _close_async_loggers():
+    for logger in list(_ASYNC_LOGGERS):
+        try:
+            logger.close()
+        except (ValidationError, OSError, TypeError, ValueError) as e:
+            print(f"Warning: Failed to write all log entries to {logger.log_path}. Error: {e}")
+
+
+atexit.register(_close_async_loggers)
 
 
 class Logger:
@@ -38,7 +169,17 @@ class Logger:
     """
 
     def __init__(
-        self, schema_path="LOGGING_SCHEMA.md", log_path="logs/activity.log.jsonl"
+        self,
+        schema_path="LOGGING_SCHEMA.md",
+        log_path="logs/activity.log.jsonl",
+        async_mode=False,
+        queue_size=10000,
+        batch_size=256,
+        flush_interval=0.5,
+        backpressure="block",
+        rotate_bytes=None,
+        rotate_interval=None,
+        compression="gzip",
     ):
         """
         Initializes the Logger, loading the schema and setting up the session.
@@ -46,12 +187,97 @@ class Logger:
         Args:
             schema_path (str): The path to the Markdown file containing the logging schema.
             log_path (str): The path to the log file to be written.
+            async_mode (bool, optional): Write entries from a background thread. Defaults to False.
+            queue_size (int, optional): Maximum number of queued entries in async mode.
+            batch_size (int, optional): Number of buffered entries that triggers a write in async mode.
+            flush_interval (float, optional): Maximum time in seconds an entry stays buffered in async mode.
+            backpressure (str, optional): One of `BACKPRESSURE_POLICIES`, applied when the queue is full.
+            rotate_bytes (int, optional): Rotate the log once it reaches this size.
+            rotate_interval (float, optional): Rotate the log once its first entry is this many seconds old.
+            compression (str, optional): Segment compression, "gzip" or "lzma". Defaults to "gzip".
         """
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(
+                f"Unknown backpressure policy '{backpressure}'; expected one of {', '.join(BACKPRESSURE_POLICIES)}."
+            )
+        if compression not in log_segments.COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression '{compression}'; expected one of {', '.join(log_segments.COMPRESSIONS)}."
+            )
         self.log_path = log_path
-        self.schema = self._load_schema(schema_path)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval
+        self.compression = compression
+        self._active_since = None
+        self._compiled_schema = self._load_compiled_schema(schema_path)
+        self.schema = self._compiled_schema.schema if self._compiled_schema else None
         self.session_id = str(uuid.uuid4())
         # Ensure the log directory exists
-        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        self._make_log_dir()
+
+        self.async_mode = async_mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.dropped = 0
+        if async_mode:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._lock = threading.Lock()
+            self._errors = []
+            self._closed = False
+            self._writer = threading.Thread(target=self._write_batches, name="logger-writer", daemon=True)
+            self._writer.start()
+            _ASYNC_LOGGERS.add(self)
+
+    def _make_log_dir(self):
+        log_dir = os.path.dirname(self.log_path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    def _rotation_due(self, size):
+        if size == 0:
+            return False
+        if self.rotate_bytes and size >= self.rotate_bytes:
+            return True
+        if self.rotate_interval:
+            if self._active_since is None:
+                self._active_since = log_segments.first_entry_time(self.log_path) or time.time()
+            if time.time() - self._active_since >= self.rotate_interval:
+                # Another process may have rotated the log since it was last checked.
+                self._active_since = log_segments.first_entry_time(self.log_path) or self._active_since
+                return time.time() - self._active_since >= self.rotate_interval
+        return False
+
+    def _append(self, appender, data):
+        """Appends lines to the log through `appender`, rotating the log first if it is due."""
+        if self.rotate_bytes or self.rotate_interval:
+            size = appender.size()
+            if self._rotation_due(size):
+                min_bytes = self.rotate_bytes if self.rotate_bytes and size >= self.rotate_bytes else 1
+                log_segments.rotate_log(self.log_path, self.compression, min_bytes=min_bytes)
+                self._active_since = None
+                size = appender.size()
+            if size == 0:
+                self._active_since = time.time()
+        appender.append(data.encode("utf-8"))
+
+    def _load_compiled_schema(self, schema_path):
+        """
+        Returns the compiled schema of a schema file, parsing and compiling
+        it only if no file with the same content was loaded before.
+        """
+        try:
+            with open(schema_path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            digest = None
+        if digest in _SCHEMA_CACHE:
+            return _SCHEMA_CACHE[digest]
+        schema = self._load_schema(schema_path)
+        compiled = CompiledSchema(schema) if schema else None
+        if digest and compiled:
+            _SCHEMA_CACHE[digest] = compiled
+        return compiled
 
     def _load_schema(self, schema_path):
         """
@@ -107,6 +333,12 @@ class Logger:
 
         Raises:
             ValidationError: If the generated log entry does not conform to the schema.
+                In async mode, the error is raised by the next `flush` or `close`
+                instead, and the entry is not written.
+            queue.Full: In async mode with the "raise" policy, if the queue is full.
+
+        In async mode the entry is serialized on the writer thread, so
+        `action_details` and `error_details` must not be modified afterwards.
         """
         log_entry = {
             "log_id": str(uuid.uuid4()),
@@ -122,13 +354,146 @@ class Logger:
         if error_details and outcome_status == "FAILURE":
             log_entry["outcome"]["error"] = error_details
 
-        if self.schema:
-            validate(instance=log_entry, schema=self.schema)
+        if self.async_mode:
+            self._enqueue(log_entry)
+            return
 
-        # Ensure the log directory exists before writing
-        log_dir = os.path.dirname(self.log_path)
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+        if self._compiled_schema:
+            self._compiled_schema.validate(log_entry)
+
+        with LogAppender(self.log_path) as appender:
+            self._append(appender, json.dumps(log_entry) + "\n")
+
+    # --- Asynchronous mode ---
+
+    def _enqueue(self, log_entry):
+        if self._closed:
+            raise RuntimeError(f"Logger for {self.log_path} is closed.")
+        if self.backpressure == "block":
+            self._queue.put(log_entry)
+            return
+        try:
+            self._queue.put_nowait(log_entry)
+        except queue.Full:
+            if self.backpressure == "raise":
+                raise
+            with self._lock:
+                self.dropped += 1
+
+    def _serialize(self, log_entry):
+        """Validates and serializes a queued entry, recording the error if it fails."""
+        try:
+            if self._compiled_schema:
+                self._compiled_schema.validate(log_entry)
+            return json.dumps(log_entry) + "\n"
+        except (ValidationError, TypeError, ValueError) as e:
+            self._record_error(e)
+            return None
+
+    def _record_error(self, error):
+        with self._lock:
+            self._errors.append(error)
+
+    def _write_batches(self):
+        """
+        The writer thread: buffers serialized entries and appends them in
+        one write when the buffer is full, when its oldest entry is due, or
+        when a flush or close is requested.
+        """
+        appender = LogAppender(self.log_path)
+        pending = []
+        oldest = None
+        waiters = []
+        stopping = False
+        try:
+            while not stopping:
+                timeout = None if oldest is None else max(0.0, oldest + self.flush_interval - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None  # The oldest buffered entry is due.
+                if isinstance(item, dict):
+                    line = self._serialize(item)
+                    if line is not None:
+                        pending.append(line)
+                        if oldest is None:
+                            oldest = time.monotonic()
+                    if len(pending) < self.batch_size:
+                        continue
+                elif item is _STOP:
+                    stopping = True
+                elif item is not None:
+                    waiters.append(item)
+
+                try:
+                    if pending:
+                        try:
+                            self._append(appender, "".join(pending))
+                        except Exception as e:  # Also rotation and compression errors.
+                            self._record_error(e)
+                            appender.close()
+                        pending = []
+                        oldest = None
+                finally:
+                    for waiter in waiters:
+                        waiter.set()
+                    waiters = []
+        except BaseException as e:
+            # The writer is dying: close the logger so that later calls fail
+            # fast instead of waiting for it; `flush` raises the error.
+            self._record_error(e)
+            self._closed = True
+            _ASYNC_LOGGERS.discard(self)
+            for waiter in waiters:
+                waiter.set()
+            self._release_waiters()
+        finally:
+            appender.close()
+
+    def _release_waiters(self):
+        """Empties the queue after the writer died, waking flushes and blocked producers."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+    def _raise_errors(self):
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def flush(self, timeout=None):
+        """
+        Waits until every entry logged so far has been written. In async mode,
+        re-raises the first error (e.g. a `ValidationError`) raised by an
+        entry since the last flush; those entries were not written.
+        """
+        if not self.async_mode:
+            return
+        if not self._closed:
+            done = threading.Event()
+            self._queue.put(done)
+            if self._closed:  # The writer died after the check above.
+                self._release_waiters()
+            done.wait(timeout)
+        self._raise_errors()
+
+    def close(self):
+        """Writes the queued entries and stops the writer thread. Called at exit."""
+        if not self.async_mode or self._closed:
+            return
+        self._closed = True
+        _ASYNC_LOGGERS.discard(self)
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._raise_errors()
+
+    def __enter__(self):
+        return self
 
-        with open(self.log_path, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,116 @@
+"""
+Unit tests for log rotation into compressed segments and the segment reader.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from tooling import log_scan
+from tooling.self_improvement_cli import analyze_planning_efficiency
+from utils import log_segments
+from utils import logger as logger_module
+from utils.log_segments import iter_log_lines, load_segment_index, rotate_log, segments_for_session
+from utils.logger import Logger
+
+
+def _entry(hour, session="session-a", task="task-1"):
+    return {
+        "session_id": session,
+        "timestamp": f"2025-10-06T{hour:02d}:00:00+00:00",
+        "task": {"id": task},
+        "action": {"type": "PLAN_UPDATE"},
+    }
+
+
+class TestLogSegments(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.test_dir, "activity.log.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _append(self, *entries):
+        with open(self.log_path, "a") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+    def _rotate_hours(self):
+        """Writes three segments (hours 0-1, 2-3, 4-5) and an active file (hour 6)."""
+        for hour in (0, 2, 4):
+            self._append(_entry(hour), _entry(hour + 1, session=f"session-{hour}"))
+            rotate_log(self.log_path, compression="lzma" if hour == 2 else "gzip")
+        self._append(_entry(6))
+
+    def test_index_records_time_ranges_and_sessions(self):
+        self._rotate_hours()
+        segments = load_segment_index(self.log_path)["segments"]
+        self.assertEqual([s["sequence"] for s in segments], [1, 2, 3])
+        self.assertEqual((segments[1]["start"], segments[1]["end"]), ("2025-10-06T02:00:00", "2025-10-06T03:00:00"))
+        self.assertTrue(segments[1]["file"].endswith(".jsonl.xz"))
+        self.assertEqual(segments[1]["sessions"]["session-2"], len(json.dumps(_entry(2))) + 1)
+        sessions = segments_for_session(load_segment_index(self.log_path), "session-a")
+        self.assertEqual([s["sequence"] for s in sessions], [1, 2, 3])
+        self.assertIsNone(rotate_log(os.path.join(self.test_dir, "missing.jsonl")))
+
+    def test_reader_opens_only_overlapping_segments(self):
+        self._rotate_hours()
+        with patch.object(log_segments, "read_segment", wraps=log_segments.read_segment) as read:
+            lines = list(iter_log_lines(self.log_path, since="2025-10-06T03:00:00Z", until="2025-10-06T04:30:00+00:00"))
+        self.assertEqual([json.loads(line)["timestamp"][11:13] for line in lines], ["03", "04"])
+        self.assertEqual([call.args[1]["sequence"] for call in read.call_args_list], [2, 3])
+        self.assertEqual(len(list(iter_log_lines(self.log_path))), 7)
+
+    def test_analyzers_read_segments_and_windows(self):
+        self._rotate_hours()
+        self.assertEqual(analyze_planning_efficiency(self.log_path, max_workers=1), {"task-1": 7})
+        self.assertEqual(
+            analyze_planning_efficiency(self.log_path, max_workers=1, since="2025-10-06T05:00:00+00:00"),
+            {"task-1": 2},
+        )
+        os.remove(self.log_path)
+        self.assertEqual(analyze_planning_efficiency(self.log_path, max_workers=1), {"task-1": 6})
+        with patch.object(log_scan, "load_segment_index", return_value={"segments": []}):
+            self.assertEqual(analyze_planning_efficiency(self.log_path), {})
+
+    def _logger(self, log_path, **kwargs):
+        schema_path = os.path.join(os.path.dirname(__file__), "..", "LOGGING_SCHEMA.md")
+        return Logger(schema_path=schema_path, log_path=log_path, **kwargs)
+
+    def _log(self, logger, step):
+        logger.log("Phase 5", "task", step, "TOOL_EXEC", {"tool_name": "ls"}, "SUCCESS")
+
+    def test_logger_rotates_by_size(self):
+        for async_mode in (False, True):
+            with self.subTest(async_mode=async_mode):
+                log_path = os.path.join(self.test_dir, f"async-{async_mode}", "activity.log.jsonl")
+                with self._logger(log_path, async_mode=async_mode, batch_size=1, rotate_bytes=2000) as logger:
+                    for step in range(30):
+                        self._log(logger, step)
+                segments = load_segment_index(log_path)["segments"]
+                self.assertGreater(len(segments), 1)
+                self.assertTrue(all(s["size"] < 2000 + s["size"] / s["entries"] for s in segments))
+                steps = [json.loads(line)["task"]["plan_step"] for line in iter_log_lines(log_path)]
+                self.assertEqual(steps, list(range(30)))
+                self.assertEqual(list(segments[0]["sessions"]), [logger.session_id])
+
+    def test_logger_rotates_by_age(self):
+        self._append(_entry(0))  # Written long ago.
+        logger = self._logger(self.log_path, rotate_interval=60)
+        self._log(logger, 1)
+        self._log(logger, 2)
+        later = time.time() + 61
+        with patch.object(logger_module, "time", wraps=time) as clock:
+            clock.time.return_value = later
+            self._log(logger, 3)
+        self.assertEqual([s["entries"] for s in load_segment_index(self.log_path)["segments"]], [1, 2])
+        self.assertEqual(len(list(iter_log_lines(self.log_path))), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,9 +19,13 @@ The suite covers two primary scenarios:
 import unittest
 import os
 import json
+import queue
 import shutil
-from jsonschema import ValidationError
-from utils.logger import Logger
+import threading
+from unittest.mock import patch
+from jsonschema import ValidationError, validate
+from utils import logger as logger_module
+from utils.logger import Logger, compile_fast_validator
 
 
 class TestLogger(unittest.TestCase):
@@ -130,6 +134,175 @@ class TestLogger(unittest.TestCase):
 
         self.assertFalse(os.path.exists(self.log_path))
 
+    def test_schema_is_compiled_once_per_content(self):
+        """Loggers sharing a schema file reuse one compiled schema."""
+        with patch.object(Logger, "_load_schema", wraps=Logger._load_schema, autospec=True) as load:
+            first = Logger(schema_path=self.schema_path, log_path=self.log_path)
+            second = Logger(schema_path=self.schema_path, log_path=self.log_path)
+        self.assertIs(first._compiled_schema, second._compiled_schema)
+        self.assertLessEqual(load.call_count, 1)
+
+        with open(self.schema_path, "w") as f:
+            f.write("```json\n" + json.dumps({"type": "object"}) + "\n```")
+        third = Logger(schema_path=self.schema_path, log_path=self.log_path)
+        self.assertEqual(third.schema, {"type": "object"})
+
+
+class TestAsyncLogger(unittest.TestCase):
+    """Asynchronous mode: queued entries written by a background thread."""
+
+    setUp = TestLogger.setUp
+    tearDown = TestLogger.tearDown
+
+    def _log(self, logger, step, phase="Phase 5"):
+        logger.log(phase, "async-task", step, "TOOL_EXEC", {"tool_name": "ls"}, "SUCCESS")
+
+    def _read_steps(self):
+        if not os.path.exists(self.log_path):
+            return []
+        with open(self.log_path) as f:
+            return [json.loads(line)["task"]["plan_step"] for line in f]
+
+    def test_entries_are_written_in_order(self):
+        with Logger(schema_path=self.schema_path, log_path=self.log_path, async_mode=True) as logger:
+            for step in range(1000):
+                self._log(logger, step)
+            logger.flush()
+            self.assertEqual(self._read_steps(), list(range(1000)))
+
+    def test_invalid_entries_raise_on_flush(self):
+        """Invalid entries are skipped and their error is raised by `flush`."""
+        logger = Logger(schema_path=self.schema_path, log_path=self.log_path, async_mode=True)
+        self._log(logger, 1)
+        self._log(logger, 2, phase=123)
+        self._log(logger, 3)
+        with self.assertRaises(ValidationError):
+            logger.flush()
+        logger.flush()  # The error is raised once.
+        logger.close()
+        self.assertEqual(self._read_steps(), [1, 3])
+
+    def test_entries_are_written_in_batches_on_thresholds(self):
+        """A full batch is written at once; a partial one when it is due."""
+        logger = Logger(schema_path=self.schema_path, log_path=self.log_path, async_mode=True,
+                        batch_size=5, flush_interval=0.2)
+        for step in range(7):
+            self._log(logger, step)
+        for _ in range(100):
+            if self._read_steps():
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self._read_steps(), [0, 1, 2, 3, 4])
+        threading.Event().wait(0.5)
+        self.assertEqual(self._read_steps(), list(range(7)))
+        logger.close()
+
+    def test_backpressure_policies(self):
+        """With the writer stalled, a full queue drops or raises as configured."""
+        with patch.object(Logger, "_write_batches"):
+            dropping = Logger(schema_path=self.schema_path, log_path=self.log_path, async_mode=True,
+                              queue_size=2, backpressure="drop")
+            raising = Logger(schema_path=self.schema_path, log_path=self.log_path, async_mode=True,
+                             queue_size=2, backpressure="raise")
+        for step in range(5):
+            self._log(dropping, step)
+        self.assertEqual(dropping.dropped, 3)
+        self._log(raising, 0)
+        self._log(raising, 1)
+        with self.assertRaises(queue.Full):
+            self._log(raising, 2)
+        for logger in (dropping, raising):
+            logger._closed = True
+            logger_module._ASYNC_LOGGERS.discard(logger)
+        with self.assertRaises(ValueError):
+            Logger(schema_path=self.schema_path, log_path=self.log_path, backpressure="wait")
+
+    def test_pending_entries_are_written_at_exit(self):
+        logger = Logger(schema_path=self.schema_path, log_path=self.log_path, async_mode=True,
+                        flush_interval=60)
+        self._log(logger, 1)
+        self.assertIn(logger, logger_module._ASYNC_LOGGERS)
+        logger_module._close_async_loggers()
+        self.assertEqual(self._read_steps(), [1])
+        self.assertNotIn(logger, logger_module._ASYNC_LOGGERS)
+        with self.assertRaises(RuntimeError):
+            self._log(logger, 2)
+
+    def test_write_errors_do_not_stop_the_writer(self):
+        """Any write error is raised by `flush`, and later entries are still written."""
+        logger = Logger(schema_path=self.schema_path, log_path=self.log_path, async_mode=True)
+        with patch.object(Logger, "_append", side_effect=RuntimeError("rotation failed")):
+            self._log(logger, 1)
+            with self.assertRaises(RuntimeError):
+                logger.flush()
+        self._log(logger, 2)
+        logger.flush()
+        logger.close()
+        self.assertEqual(self._read_steps(), [2])
+
+    def test_dead_writer_fails_fast(self):
+        """If the writer thread dies, `flush` returns and logging raises instead of hanging."""
+        logger = Logger(schema_path=self.schema_path, log_path=self.log_path, async_mode=True,
+                        queue_size=1)
+        with patch.object(Logger, "_serialize", side_effect=SystemError("writer bug")):
+            self._log(logger, 1)
+            with self.assertRaises(SystemError):
+                logger.flush()
+        self.assertNotIn(logger, logger_module._ASYNC_LOGGERS)
+        with self.assertRaises(RuntimeError):
+            self._log(logger, 2)
+        logger.flush()
+        logger.close()
+
+
+class TestFastValidator(unittest.TestCase):
+    """The generated fast validator never accepts what jsonschema rejects."""
+
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(__file__), "..", "LOGGING_SCHEMA.md")) as f:
+            self.schema = json.loads(f.read().split("```json\n")[1].split("\n```")[0])
+        self.valid = {
+            "log_id": "id",
+            "session_id": "session",
+            "timestamp": "2025-10-06T04:10:00+00:00",
+            "phase": "Phase 5",
+            "task": {"id": "task", "plan_step": 1},
+            "action": {"type": "TOOL_EXEC", "details": {"tool_name": "ls"}},
+            "outcome": {"status": "FAILURE", "message": "", "error": {"message": "boom"}},
+            "evidence_citation": "",
+        }
+
+    def _mutations(self):
+        yield self.valid
+        for key in self.valid:
+            yield {k: v for k, v in self.valid.items() if k != key}
+            for bad in (None, 1, True, 1.0, "Phase 9", [], {}):
+                yield dict(self.valid, **{key: bad})
+        for section, field in (("task", "plan_step"), ("task", "id"), ("action", "type"), ("outcome", "status")):
+            for bad in (None, "1", True, 1.0, "UNKNOWN"):
+                yield dict(self.valid, **{section: dict(self.valid[section], **{field: bad})})
+            yield dict(self.valid, **{section: {k: v for k, v in self.valid[section].items() if k != field}})
+
+    def test_fast_validator_agrees_with_jsonschema(self):
+        fast = compile_fast_validator(self.schema)
+        self.assertIsNotNone(fast)
+        self.assertTrue(fast(self.valid))
+        for instance in self._mutations():
+            try:
+                validate(instance=instance, schema=self.schema)
+                valid = True
+            except ValidationError:
+                valid = False
+            if fast(instance):
+                self.assertTrue(valid, instance)
+            elif valid:
+                # Only values jsonschema treats as integers are deferred to it.
+                self.assertIn(1.0, [instance.get("task", {}).get("plan_step")])
+
+    def test_unsupported_keywords_disable_the_fast_path(self):
+        self.assertIsNone(compile_fast_validator({"type": "string", "pattern": "^a"}))
+        self.assertIsNone(compile_fast_validator({"properties": {"a": {"type": ["string", "null"]}}}))
+
 
 if __name__ == "__main__":
     unittest.main()